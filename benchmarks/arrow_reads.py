@@ -0,0 +1,59 @@
+"""Compare reading compress output as Parquet with memory-mapping it as uncompressed Arrow IPC.
+
+python benchmarks/arrow_reads.py [--rows 2000000] [--repeat 5]
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import polars as pl
+
+
+def sample_frame(rows: int) -> pl.DataFrame:
+    row = pl.int_range(rows)
+    return pl.select(
+        class_id=(row % 50).cast(pl.Utf8),
+        student_id=(row % 500).cast(pl.Utf8),
+        chapter=row % 12,
+        page=row % 40,
+        attempt=row % 3,
+        points_earned=(row % 7).cast(pl.Float64),
+        response=(row % 1000).cast(pl.Utf8),
+    )
+
+
+def best_of(repeat: int, read: Callable[[], pl.DataFrame]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = sample_frame(args.rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        parquet = Path(temp_dir, "responses.parquet")
+        arrow = Path(temp_dir, "responses.arrow")
+        data.write_parquet(parquet)
+        data.write_ipc(arrow, compression="uncompressed")
+
+        # the first read of each warms the page cache, and best_of keeps the fastest
+        for name, read in (
+            ("parquet", lambda: pl.read_parquet(parquet)),
+            ("arrow", lambda: pl.read_ipc(arrow, memory_map=True)),
+        ):
+            print(f"{name:>8}: {best_of(args.repeat, read) * 1000:7.2f} ms for {args.rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the memory and construction time of FileMetadata with the pydantic model it replaced.
+
+python benchmarks/file_metadata.py [--count 200000]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import cached_property
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+
+from mo.domain.data_types import DataType, LegacyDataType
+from mo.domain.file_metadata import FileMetadata
+
+
+class PydanticFileMetadata(BaseModel):
+    """FileMetadata as it was before it became a slotted dataclass."""
+
+    path: Path
+    type: DataType | LegacyDataType | Literal["supplementary"]
+    class_id: str | None = None
+
+    @cached_property
+    def name(self) -> str:
+        return str(self.path)
+
+
+def measure(create: Callable[..., object], count: int) -> tuple[float, float]:
+    """Return the bytes per object and the microseconds per construction of `count` objects."""
+    paths = [Path(f"class-{i % 500}/responses-{i}.csv") for i in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [create(path=path, type=DataType.RESPONSES, class_id="class") for path in paths]
+    size = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+    del kept
+
+    start = time.perf_counter()
+    for path in paths:
+        create(path=path, type=DataType.RESPONSES, class_id="class")
+    elapsed = (time.perf_counter() - start) / count * 1e6
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for name, create in (("dataclass", FileMetadata), ("pydantic", PydanticFileMetadata)):
+        size, elapsed = measure(create, args.count)
+        print(f"{name:>10}: {size:6.0f} B/object, {elapsed:5.1f} us/construction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare identifying data types with the file name table against the enum loop it replaced.
+
+python benchmarks/file_names.py [--count 1000000]
+"""
+
+import argparse
+import time
+from itertools import chain
+from pathlib import Path
+
+from mo.domain.data_types import DataType, LegacyDataType
+from mo.domain.file_names import FILE_NAMES
+
+
+def identify_type_by_loop(path: Path | str) -> DataType | LegacyDataType | None:
+    """DataParsingService.identify_type as it was before the name table."""
+    for data_type in chain(DataType, LegacyDataType):
+        if Path(path).stem.lower() == data_type.value.lower():
+            return data_type
+
+
+def member_names(count: int) -> list[str]:
+    """Return `count` names like those of zip members, a fifth of which are not data files."""
+    stems = [data_type.value for data_type in chain(DataType, LegacyDataType)] + ["README"]
+    return [
+        f"exports/class-{i % 500}/{stems[i % len(stems)]}.{'csv' if i % 5 else 'txt'}"
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    names = member_names(args.count)
+    results = {}
+    for method, identify in (
+        ("name table", FILE_NAMES.identify_type),
+        ("enum loop", identify_type_by_loop),
+    ):
+        start = time.perf_counter()
+        results[method] = [identify(name) for name in names]
+        print(f"{method:>10}: {time.perf_counter() - start:6.2f} s for {args.count} names")
+
+    assert results["name table"] == results["enum loop"], "the methods identified different types"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare the sync and async I/O backends on a stand-in for a high-latency network file system.
+
+Every directory listing, stat and file copy is delayed by `--latency` milliseconds, which is what
+makes walks and copies slow on NFS or SMB mounts.
+
+python benchmarks/io_backend.py [--classes 300] [--latency 2] [--concurrency 64]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from mo.domain.data_types import DataType
+from mo.domain.file_metadata import FileMetadata
+from mo.domain.io_backend import IoBackend
+from mo.domain.plan import Plan
+from mo.services.file_index import FileIndex
+from mo.usecases.actions import CopyFile
+
+
+class SlowEntry:
+    """A directory entry whose stat takes as long as a round trip to the file server."""
+
+    def __init__(self, entry: os.DirEntry[str], latency: float) -> None:
+        self._entry = entry
+        self._latency = latency
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        time.sleep(self._latency)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+
+@contextmanager
+def network_latency(latency: float) -> Iterator[None]:
+    real_scandir, real_stat, real_copyfileobj = os.scandir, os.stat, shutil.copyfileobj
+
+    @contextmanager
+    def scandir(path: Any) -> Iterator[list[SlowEntry]]:
+        time.sleep(latency)
+        with real_scandir(path) as entries:
+            yield [SlowEntry(entry, latency) for entry in entries]
+
+    def stat(path: Any, *args: Any, **kwargs: Any) -> os.stat_result:
+        time.sleep(latency)
+        return real_stat(path, *args, **kwargs)
+
+    def copyfileobj(*args: Any, **kwargs: Any) -> None:
+        time.sleep(latency)
+        real_copyfileobj(*args, **kwargs)
+
+    os.scandir, os.stat, shutil.copyfileobj = scandir, stat, copyfileobj  # type: ignore[assignment]
+    try:
+        yield
+    finally:
+        os.scandir, os.stat, shutil.copyfileobj = real_scandir, real_stat, real_copyfileobj
+
+
+def make_inputs(root: Path, classes: int) -> None:
+    for i in range(classes):
+        folder = root / f"class-{i}"
+        folder.mkdir(parents=True)
+        for data_type in (DataType.RESPONSES, DataType.PAGE_VIEWS, DataType.MEDIA_VIEWS):
+            (folder / f"{data_type.value}.csv").write_text(f"class_id\nclass-{i}\n")
+
+
+def run(backend: IoBackend, inputs: Path, output: Path, concurrency: int) -> tuple[float, float]:
+    """Return the seconds it takes to walk the inputs and to copy their files to `output`."""
+    index = FileIndex(backend, concurrency)
+    start = time.perf_counter()
+    entries = index.walk([inputs])
+    walked = time.perf_counter() - start
+
+    actions = [
+        CopyFile(
+            FileMetadata(path=entry.path, type=DataType.RESPONSES),
+            output / entry.path.relative_to(inputs),
+            index=index,
+        )
+        for entry in entries
+        if not entry.is_dir
+    ]
+    start = time.perf_counter()
+    Plan(actions).execute(backend, concurrency)
+    return walked, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--classes", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=2.0, help="Milliseconds per call.")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        inputs = Path(temp_dir, "inputs")
+        make_inputs(inputs, args.classes)
+        print(f"{args.classes} class folders, {args.classes * 3} files")
+        for backend in IoBackend:
+            output = Path(temp_dir, f"output-{backend}")
+            with network_latency(args.latency / 1000):
+                walked, copied = run(backend, inputs, output, args.concurrency)
+            print(f"{backend:>6}: walk {walked:5.2f} s, copy {copied:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compare logging through the queue listener with the handlers it replaced on the root logger.
+
+Each plan has `--actions` actions whose description stats a file, as moves and copies do. The old
+setup put a RichHandler and a FileHandler on the root logger, and described every action whether
+or not its description was logged. Verbose runs write the console output to /dev/null.
+
+python benchmarks/log_output.py [--actions 100000]
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from rich.console import Console
+from rich.logging import RichHandler
+
+import mo.logging
+from mo.domain.plan import Plan, PlannedAction
+
+
+class StatAction(PlannedAction):
+    """An action that does nothing, with a description that stats its file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def execute(self) -> None:
+        pass
+
+    def describe(self) -> str:
+        return f"Checking {str(self.path)} ({self.path.stat().st_size} bytes)"
+
+
+@contextlib.contextmanager
+def old_logging(level: int, log_file: Path | None) -> Iterator[None]:
+    """Log like before the queue listener: handlers on the root logger, every action described."""
+
+    def execute_action(self: Plan, action: PlannedAction) -> None:
+        self.log.debug(action.describe())
+        action.execute()
+
+    console = Console(file=open(os.devnull, "w"), soft_wrap=True)  # noqa: SIM115
+    handlers: list[logging.Handler] = [RichHandler(console=console, show_level=False)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format="%(message)s", datefmt="[%X]", handlers=handlers)
+    real_execute_action = Plan._execute_action
+    Plan._execute_action = execute_action  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        Plan._execute_action = real_execute_action  # type: ignore[method-assign]
+        reset_logging()
+        console.file.close()
+
+
+@contextlib.contextmanager
+def new_logging(level: int, log_file: Path | None) -> Iterator[None]:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mo.logging.setup_logging(level, log_file)
+        try:
+            yield
+        finally:
+            reset_logging()
+
+
+def reset_logging() -> None:
+    """Write out the records still queued and remove the root logger's handlers."""
+    mo.logging._stop_listener()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_plan(actions: list[PlannedAction]) -> float:
+    """Return the seconds it takes the plan's execute() to return."""
+    start = time.perf_counter()
+    Plan(actions).execute()
+    return time.perf_counter() - start
+
+
+def run_file_handler(handler: logging.Handler, records: int) -> float:
+    """Return the seconds it takes `handler` alone to write `records` records."""
+    logger = logging.getLogger("benchmark")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    start = time.perf_counter()
+    for i in range(records):
+        logger.debug("Checking record %d", i)
+    handler.flush()
+    elapsed = time.perf_counter() - start
+    logger.removeHandler(handler)
+    handler.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--actions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir, "data.csv")
+        path.write_text("class_id\n")
+        actions: list[PlannedAction] = [StatAction(path) for _ in range(args.actions)]
+        log_file = Path(temp_dir, "mo.log")
+        print(f"{args.actions} actions")
+
+        for name, setup in (("old", old_logging), ("new", new_logging)):
+            with setup(logging.WARNING, None):
+                elapsed = run_plan(actions)
+            print(f"{name:>3}: WARNING level, execute() {elapsed * 1000:7.0f} ms")
+
+        for name, setup in (("old", old_logging), ("new", new_logging)):
+            start = time.perf_counter()
+            with setup(logging.DEBUG, log_file):
+                elapsed = run_plan(actions)
+            written = time.perf_counter() - start
+            print(
+                f"{name:>3}: verbose with a log file, execute() {elapsed:6.2f} s, "
+                f"all output written {written:6.2f} s"
+            )
+
+        for name, handler in (
+            ("old", logging.FileHandler(log_file)),
+            ("new", mo.logging.BatchedFileHandler(log_file)),
+        ):
+            elapsed = run_file_handler(handler, args.actions)
+            print(f"{name:>3}: file handler alone, {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
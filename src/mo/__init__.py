@@ -1 +1,3 @@
 "MO: Methodically organize CourseKata Data."
+
+__version__ = "0.4.2"
@@ -0,0 +1,18 @@
+import sys
+
+from mo import __version__
+
+
+def main() -> None:
+    # importing typer takes most of the startup time, so `mo --version` is answered without it
+    if sys.argv[1:] in (["--version"], ["-v"]):
+        print(f"{__package__} v{__version__}")
+        return
+
+    from mo.cli import app
+
+    app()
+
+
+if __name__ == "__main__":
+    main()
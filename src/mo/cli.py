@@ -1,32 +1,51 @@
-import importlib.metadata
 import logging
+from enum import StrEnum
 from pathlib import Path
-from types import TracebackType
-from typing import Annotated, cast
-from uuid import UUID
+from typing import TYPE_CHECKING, Annotated
 
 import typer
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.progress import Progress, TaskID
 
-from mo.domain.observer import Observer, ProgressEvent
-from mo.usecases.compress_usecase import CompressUseCase
-from mo.usecases.organize_usecase import OrganizeUseCase
+from mo import __version__
+from mo.domain.data_format import Compression, DataFormat, IpcCompression
+from mo.domain.io_backend import IoBackend
+from mo.domain.shard import Shard
+from mo.logging import setup_logging
+from mo.profiling import ProfileMode, profile_command
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# command implementations pull in polars, pydantic and rich, so they are imported on first use to
+# keep `mo --version` and `mo --help` fast
 app = typer.Typer(
     name=__package__,
-    help=importlib.metadata.metadata(cast(str, __package__))["Summary"],
+    help="Methodically organize CourseKata Data.",
     no_args_is_help=True,
 )
 
 
+class CompressFormat(StrEnum):
+    PARQUET = DataFormat.PARQUET.value
+    ARROW = DataFormat.ARROW.value
+
+
 def version(value: bool):
     if value:
-        print(f"{__package__} v{importlib.metadata.version(cast(str, __package__))}")
+        print(f"{__package__} v{__version__}")
         raise typer.Exit()
 
 
+def writable_compression(value: Compression | None) -> Compression | None:
+    from mo.services.compression import check_compression
+
+    if value:
+        try:
+            check_compression(value)
+        except ValueError as exc:
+            raise typer.BadParameter(str(exc)) from exc
+    return value
+
+
 @app.callback()
 def main(
     version: Annotated[
@@ -68,20 +87,114 @@ def organize(
         bool,
         typer.Option("--ignore-duplicates", help="Don't delete duplicate input files."),
     ] = False,
+    compression: Annotated[
+        Compression | None,
+        typer.Option(
+            "--compression",
+            callback=writable_compression,
+            help="Compress the organized CSV files.",
+        ),
+    ] = None,
+    io_backend: Annotated[
+        IoBackend,
+        typer.Option(
+            "--io-backend",
+            help="Issue file system calls one at a time (sync) or many at once (async, for "
+            "network file systems).",
+        ),
+    ] = IoBackend.SYNC,
+    watch: Annotated[
+        bool,
+        typer.Option("--watch", "-w", help="Keep running and process new files as they land."),
+    ] = False,
+    settle: Annotated[
+        float,
+        typer.Option(
+            "--settle", help="Seconds a new file must stay unchanged before it is processed."
+        ),
+    ] = 2.0,
+    consistency_report: Annotated[
+        Path | None,
+        typer.Option(
+            "--consistency-report",
+            help="File to write a JSON report of the classes without data, and vice versa, to.",
+        ),
+    ] = None,
+    dedup: Annotated[
+        bool,
+        typer.Option(
+            "--dedup",
+            help="Store identical supplementary files once, as hardlinks to each other. Editing "
+            "one of them in place then changes all of them.",
+        ),
+    ] = False,
+    class_id_check_every: Annotated[
+        int | None,
+        typer.Option(
+            "--class-id-check-every",
+            help="Parse every Nth file whose class ID is taken from its folder name, to check the "
+            "folder names (20 by default). 0 never parses them.",
+        ),
+    ] = None,
+    shard: Annotated[
+        Shard | None,
+        typer.Option(
+            "--shard",
+            metavar="K/N",
+            parser=Shard.parse,
+            help="Only process the classes of shard K of N, to split the work between machines.",
+        ),
+    ] = None,
+    plan_out: Annotated[
+        Path | None,
+        typer.Option(
+            "--plan-out",
+            help="Write the plan to this file instead of executing it, to run it with `mo apply`.",
+        ),
+    ] = None,
     log_file: Annotated[
         Path | None,
         typer.Option("--log-file", help="File to write logs to."),
     ] = None,
+    profile: Annotated[
+        ProfileMode | None,
+        typer.Option(
+            "--profile",
+            help="Profile the command and write a report bundle next to the log file.",
+        ),
+    ] = None,
 ) -> None:
+    from mo.progress import rich_progress
+    from mo.usecases.organize_usecase import OrganizeUseCase
+
     config = OrganizeUseCase.Input(inputs=inputs, output=output)
     config.move = not copy
     config.ignore_duplicates = ignore or ignore_duplicates
     config.ignore_legacy = ignore or ignore_legacy
     config.dry_run = dry_run
+    config.compression = compression
+    config.io_backend = io_backend
+    config.consistency_report = consistency_report
+    config.shard = shard
+    if class_id_check_every is not None:
+        config.class_id_check_every = class_id_check_every
+    config.dedup_supplementary = dedup
+    config.plan_out = plan_out
 
     console = setup_logging(logging.DEBUG if verbose else logging.WARNING, log_file)
-    with RichProgressObserver(console) as progress_observer:
-        OrganizeUseCase(config, [progress_observer]).execute()
+    with (
+        profile_command("organize", profile, log_file),
+        rich_progress(console) as progress_observer,
+    ):
+
+        def run(inputs: list[Path]) -> None:
+            batch = config.model_copy(update={"inputs": inputs})
+            OrganizeUseCase(batch, [progress_observer]).execute()
+
+        if watch:
+            watch_inputs(inputs, output, settle, run)
+        else:
+            run(inputs)
 
 
 @app.command()
@@ -107,65 +220,286 @@ def compress(
         bool,
         typer.Option("--verbose", "-v", help="Enable verbose logging."),
     ] = False,
+    output_format: Annotated[
+        CompressFormat,
+        typer.Option("--format", "-f", help="Format to compress the data to."),
+    ] = CompressFormat.PARQUET,
+    ipc_compression: Annotated[
+        IpcCompression,
+        typer.Option(
+            "--ipc-compression",
+            help="Compression for Arrow output. Only uncompressed output can be memory-mapped.",
+        ),
+    ] = IpcCompression.UNCOMPRESSED,
+    io_backend: Annotated[
+        IoBackend,
+        typer.Option(
+            "--io-backend",
+            help="Issue file system calls one at a time (sync) or many at once (async, for "
+            "network file systems).",
+        ),
+    ] = IoBackend.SYNC,
+    watch: Annotated[
+        bool,
+        typer.Option("--watch", "-w", help="Keep running and process new files as they land."),
+    ] = False,
+    settle: Annotated[
+        float,
+        typer.Option(
+            "--settle", help="Seconds a new file must stay unchanged before it is processed."
+        ),
+    ] = 2.0,
+    consistency_report: Annotated[
+        Path | None,
+        typer.Option(
+            "--consistency-report",
+            help="File to write a JSON report of the classes without data, and vice versa, to.",
+        ),
+    ] = None,
+    dedup: Annotated[
+        bool,
+        typer.Option(
+            "--dedup",
+            help="Store identical supplementary files once, as hardlinks to each other. Editing "
+            "one of them in place then changes all of them.",
+        ),
+    ] = False,
+    class_id_check_every: Annotated[
+        int | None,
+        typer.Option(
+            "--class-id-check-every",
+            help="Parse every Nth file whose class ID is taken from its folder name, to check the "
+            "folder names (20 by default). 0 never parses them.",
+        ),
+    ] = None,
+    shard: Annotated[
+        Shard | None,
+        typer.Option(
+            "--shard",
+            metavar="K/N",
+            parser=Shard.parse,
+            help="Only process the classes of shard K of N, to split the work between machines.",
+        ),
+    ] = None,
+    normalize: Annotated[
+        bool,
+        typer.Option(
+            "--normalize",
+            help="Move repeated text values, like prompts and traces, into dictionary tables.",
+        ),
+    ] = False,
+    emit_delta: Annotated[
+        Path | None,
+        typer.Option(
+            "--emit-delta",
+            help="Directory to also write the rows that were not in the output yet to, as a "
+            "numbered batch.",
+        ),
+    ] = None,
+    rollups: Annotated[
+        bool,
+        typer.Option(
+            "--rollups",
+            help="Also keep per class, student, chapter and page totals of responses and page "
+            "views up to date.",
+        ),
+    ] = False,
+    key_filter: Annotated[
+        bool,
+        typer.Option(
+            "--key-filter",
+            help="Keep a Bloom filter of the keys in the output, so that later runs only compare "
+            "the new rows it can't rule out with the output instead of deduplicating all of it.",
+        ),
+    ] = False,
+    key_filter_fp_rate: Annotated[
+        float,
+        typer.Option(
+            "--key-filter-fp-rate",
+            help="Rate of new rows that the key filter can't rule out and compares anyway.",
+        ),
+    ] = 0.01,
+    key_filter_max_mb: Annotated[
+        float | None,
+        typer.Option(
+            "--key-filter-max-mb",
+            help="Most memory, in MiB, that a key filter of one type may use. A smaller filter "
+            "rules out fewer rows.",
+        ),
+    ] = None,
+    plan_out: Annotated[
+        Path | None,
+        typer.Option(
+            "--plan-out",
+            help="Write the plan to this file instead of executing it, to run it with `mo apply`.",
+        ),
+    ] = None,
     log_file: Annotated[
         Path | None,
         typer.Option("--log-file", help="File to write logs to."),
     ] = None,
+    profile: Annotated[
+        ProfileMode | None,
+        typer.Option(
+            "--profile",
+            help="Profile the command and write a report bundle next to the log file.",
+        ),
+    ] = None,
 ):
+    from mo.progress import rich_progress
+    from mo.usecases.compress_usecase import CompressUseCase
+
     config = CompressUseCase.Input(inputs=inputs, output=output)
     config.move = move
     config.skip_validation = skip_validation
     config.dry_run = dry_run
+    config.output_format = DataFormat(output_format)
+    config.ipc_compression = ipc_compression
+    config.io_backend = io_backend
+    config.consistency_report = consistency_report
+    config.shard = shard
+    if class_id_check_every is not None:
+        config.class_id_check_every = class_id_check_every
+    config.dedup_supplementary = dedup
+    config.normalize = normalize
+    config.emit_delta = emit_delta
+    config.rollups = rollups
+    config.key_filter = key_filter
+    config.key_filter_fp_rate = key_filter_fp_rate
+    config.key_filter_max_mb = key_filter_max_mb
+    config.plan_out = plan_out
 
     console = setup_logging(logging.DEBUG if verbose else logging.WARNING, log_file)
-    with RichProgressObserver(console) as progress_observer:
-        CompressUseCase(config, [progress_observer]).execute()
+    with (
+        profile_command("compress", profile, log_file),
+        rich_progress(console) as progress_observer,
+    ):
+
+        def run(inputs: list[Path]) -> None:
+            batch = config.model_copy(update={"inputs": inputs})
+            CompressUseCase(batch, [progress_observer]).execute()
+
+        if watch:
+            watch_inputs(inputs, output, settle, run)
+        else:
+            run(inputs)
+
+
+@app.command()
+def merge_shards(
+    shards: Annotated[
+        list[Path], typer.Argument(..., help="Output directories of the `--shard` workers.")
+    ],
+    output: Annotated[
+        Path,
+        typer.Option("--output", "-o", help="Directory where the merged data should be written."),
+    ],
+    move: Annotated[
+        bool,
+        typer.Option("--move", "-m", help="Delete the shard files after merging."),
+    ] = False,
+    dry_run: Annotated[
+        bool,
+        typer.Option("--dry-run", "-d", help="Perform a dry run without affecting any files."),
+    ] = False,
+    verbose: Annotated[
+        bool,
+        typer.Option("--verbose", "-v", help="Enable verbose logging."),
+    ] = False,
+    log_file: Annotated[
+        Path | None,
+        typer.Option("--log-file", help="File to write logs to."),
+    ] = None,
+) -> None:
+    """Combine the outputs of organize or compress workers that each ran with `--shard`."""
+    from mo.usecases.merge_shards_usecase import MergeShardsUseCase
+
+    config = MergeShardsUseCase.Input(shards=shards, output=output)
+    config.move = move
+    config.dry_run = dry_run
 
+    setup_logging(logging.DEBUG if verbose else logging.WARNING, log_file)
+    MergeShardsUseCase(config).execute()
 
-def setup_logging(level: int | str = logging.DEBUG, log_file: Path | None = None) -> Console:
-    console = Console(soft_wrap=True)
 
-    handlers: list[logging.Handler] = [RichHandler(console=console, show_level=False)]
-    if log_file:
-        handlers.append(logging.FileHandler(log_file))
+@app.command()
+def apply(
+    plan: Annotated[
+        Path, typer.Argument(..., help="Plan written by `mo organize` or `mo compress --plan-out`.")
+    ],
+    verbose: Annotated[
+        bool,
+        typer.Option("--verbose", "-v", help="Enable verbose logging."),
+    ] = False,
+    log_file: Annotated[
+        Path | None,
+        typer.Option("--log-file", help="File to write logs to."),
+    ] = None,
+    profile: Annotated[
+        ProfileMode | None,
+        typer.Option(
+            "--profile",
+            help="Profile the command and write a report bundle next to the log file.",
+        ),
+    ] = None,
+) -> None:
+    """Run a plan written with `--plan-out`, if the files it reads have not changed since."""
+    from mo.progress import rich_progress
+    from mo.usecases.apply_usecase import ApplyUseCase
 
-    logging.basicConfig(
-        level=level,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=handlers,
-    )
+    config = ApplyUseCase.Input(plan=plan)
 
-    return console
+    console = setup_logging(logging.DEBUG if verbose else logging.WARNING, log_file)
+    with profile_command("apply", profile, log_file), rich_progress(console) as progress_observer:
+        ApplyUseCase(config, [progress_observer]).execute()
 
 
-class RichProgressObserver(Observer[ProgressEvent]):
-    def __init__(self, console: Console) -> None:
-        self.progress = Progress(console=console, transient=True)
-        self.tasks: dict[UUID, TaskID] = {}
+@app.command()
+def serve(
+    host: Annotated[
+        str,
+        typer.Option("--host", help="Address to serve the job API on."),
+    ] = "127.0.0.1",
+    port: Annotated[
+        int,
+        typer.Option("--port", "-p", help="Port to serve the job API on."),
+    ] = 8765,
+    socket: Annotated[
+        Path | None,
+        typer.Option("--socket", help="Serve on this Unix socket instead of a TCP port."),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option("--concurrency", "-j", help="Maximum number of jobs to run at once."),
+    ] = 2,
+    keep_jobs: Annotated[
+        int,
+        typer.Option("--keep-jobs", help="Number of finished jobs to keep the results of."),
+    ] = 100,
+    verbose: Annotated[
+        bool,
+        typer.Option("--verbose", "-v", help="Enable verbose logging."),
+    ] = False,
+    log_file: Annotated[
+        Path | None,
+        typer.Option("--log-file", help="File to write logs to."),
+    ] = None,
+) -> None:
+    """Keep a process warm and run organize, compress and query jobs submitted over HTTP."""
+    from mo.server import serve
 
-    def __enter__(self):
-        """Start the Rich progress display."""
-        self.progress.__enter__()
-        return self
+    setup_logging(logging.DEBUG if verbose else logging.INFO, log_file)
+    serve(host, port, socket, concurrency, keep_jobs)
 
-    def __exit__(
-        self,
-        exc_type: type[BaseException] | None,
-        exc_val: BaseException | None,
-        exc_tb: TracebackType | None,
-    ):
-        """Stop the Rich progress display."""
-        self.progress.__exit__(exc_type, exc_val, exc_tb)
 
-    def __call__(self, event: ProgressEvent) -> None:
-        """Handle a ProgressEvent by updating the appropriate task."""
-        if event.task_id not in self.tasks:
-            self.tasks[event.task_id] = self.progress.add_task(
-                event.message, total=event.total, completed=event.current
-            )
+def watch_inputs(
+    inputs: list[Path], output: Path, settle: float, run: "Callable[[list[Path]], None]"
+) -> None:
+    from mo.usecases.watch_usecase import WatchUseCase
 
-        self.progress.update(self.tasks[event.task_id], completed=event.current)
+    config = WatchUseCase.Input(inputs=inputs, output=output)
+    config.settle = settle
+    WatchUseCase(config, run).execute()
 
 
 if __name__ == "__main__":
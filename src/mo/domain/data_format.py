@@ -1,6 +1,37 @@
 from enum import StrEnum
+from pathlib import Path
 
 
 class DataFormat(StrEnum):
     CSV = "csv"
     PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class IpcCompression(StrEnum):
+    """Arrow IPC buffer compression; only uncompressed files can be memory-mapped zero-copy."""
+
+    UNCOMPRESSED = "uncompressed"
+    LZ4 = "lz4"
+
+
+class Compression(StrEnum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+    @property
+    def suffix(self) -> str:
+        return COMPRESSION_SUFFIXES[self]
+
+    @classmethod
+    def from_path(cls, path: Path | str) -> "Compression | None":
+        name = str(path).lower()
+        for compression, suffix in COMPRESSION_SUFFIXES.items():
+            if name.endswith(suffix):
+                return compression
+
+
+COMPRESSION_SUFFIXES: dict[Compression, str] = {
+    Compression.GZIP: ".gz",
+    Compression.ZSTD: ".zst",
+}
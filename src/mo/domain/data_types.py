@@ -134,6 +134,15 @@ SCHEMAS: dict[DataType, SchemaDict] = {
     },
 }
 
+# the columns that identify a row of each type, which merges deduplicate on
+UNIQUE_KEYS: dict[DataType, list[str]] = {
+    DataType.MANIFEST: ["class_id"],
+    DataType.CLASSES: ["class_id"],
+    DataType.RESPONSES: ["student_id", "item_id", "lrn_question_position", "dt_submitted"],
+    DataType.PAGE_VIEWS: ["class_id", "student_id", "chapter", "page", "dt_accessed"],
+    DataType.MEDIA_VIEWS: ["class_id", "student_id", "chapter", "page", "media_id"],
+}
+
 
 class LegacyDataType(StrEnum):
     TAGS = "tags"
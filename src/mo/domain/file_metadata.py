@@ -1,26 +1,39 @@
-from functools import cached_property
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Literal
 
-from pydantic import BaseModel
-
 from mo.domain.data_types import DataType, LegacyDataType
 
+# the class ID of a file that holds the data of several classes, e.g. an earlier `mo compress`
+# output; such files can be merged but not organized into a class folder
+MULTIPLE_CLASSES = "*"
+
 
-class FileMetadata(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class FileMetadata:
     path: Path
     type: DataType | LegacyDataType | Literal["supplementary"]
     class_id: str | None = None
+    size: int | None = None
+    mtime: float | None = None
 
-    @cached_property
+    @property
     def name(self) -> str:
         return str(self.path)
 
+    @property
+    def multi_class(self) -> bool:
+        """Whether the file lists classes or holds the data of several, not one class's data."""
+        return (
+            self.type in (DataType.CLASSES, DataType.MANIFEST) or self.class_id == MULTIPLE_CLASSES
+        )
+
 
+@dataclass(slots=True, kw_only=True)
 class ZipFileMetadata(FileMetadata):
     member_path: str
     archive_path: Path
 
-    @cached_property
+    @property
     def name(self) -> str:
         return f"{self.archive_path}::{self.member_path}"
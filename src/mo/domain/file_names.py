@@ -0,0 +1,70 @@
+from collections.abc import Iterable
+from itertools import chain
+from pathlib import Path
+
+from mo.domain.data_format import Compression, DataFormat
+from mo.domain.data_types import DataType, LegacyDataType
+
+
+class FileNameTable:
+    """Identify the data type and format of a file from its name with constant-time lookups.
+
+    Names are matched case-insensitively. The stem is looked up as a data type and the suffix as a
+    data format, where a suffix may be compound (e.g. `.csv.gz`) if it was registered as an alias.
+    """
+
+    def __init__(self) -> None:
+        self._types: dict[str, DataType | LegacyDataType] = {
+            data_type.value.lower(): data_type for data_type in chain(DataType, LegacyDataType)
+        }
+        self._formats: dict[str, DataFormat] = {
+            f".{data_format.value}".lower(): data_format for data_format in DataFormat
+        }
+        self.register_alias(".feather", DataFormat.ARROW)
+        self.register_alias(".ipc", DataFormat.ARROW)
+        # polars decompresses CSV input transparently, so compressed CSVs are just CSVs
+        for compression in Compression:
+            self.register_alias(f".{DataFormat.CSV.value}{compression.suffix}", DataFormat.CSV)
+
+    def register_alias(self, suffix: str, data_format: DataFormat) -> None:
+        """Recognize files ending in `suffix` (e.g. `.csv.gz`) as `data_format`."""
+        if not suffix.startswith("."):
+            raise ValueError(f"Suffix must start with a dot: {suffix}")
+        self._formats[suffix.lower()] = data_format
+
+    def suffixes(self, data_format: DataFormat) -> list[str]:
+        """Return every registered suffix for `data_format`, including aliases."""
+        return [suffix for suffix, fmt in self._formats.items() if fmt is data_format]
+
+    def file_names(
+        self, data_types: Iterable[DataType | LegacyDataType], formats: Iterable[DataFormat]
+    ) -> list[str]:
+        """Return every file name that would be identified as one of the types and formats."""
+        suffixes = [suffix for data_format in formats for suffix in self.suffixes(data_format)]
+        return [f"{data_type.value}{suffix}" for data_type in data_types for suffix in suffixes]
+
+    def split(self, path: Path | str) -> tuple[str, str]:
+        """Split the lower-cased file name into a stem and a (possibly compound) suffix."""
+        if isinstance(path, Path):
+            name = path.name.lower()
+        else:
+            name = path.rstrip("/").rpartition("/")[2].lower()
+
+        # a leading dot marks a hidden file, not a suffix
+        first_dot = name.find(".", 1)
+        if first_dot > 0 and name[first_dot:] in self._formats:
+            return name[:first_dot], name[first_dot:]
+
+        last_dot = name.rfind(".")
+        if last_dot > 0:
+            return name[:last_dot], name[last_dot:]
+        return name, ""
+
+    def identify_type(self, path: Path | str) -> DataType | LegacyDataType | None:
+        return self._types.get(self.split(path)[0])
+
+    def identify_format(self, path: Path | str) -> DataFormat | None:
+        return self._formats.get(self.split(path)[1])
+
+
+FILE_NAMES = FileNameTable()
@@ -0,0 +1,34 @@
+from collections.abc import Coroutine
+from enum import StrEnum
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class IoBackend(StrEnum):
+    """How file system metadata operations (walks, stats, moves) are issued.
+
+    `sync` issues them one at a time. `async` keeps up to `io_concurrency` of them in flight at
+    once, which hides the per-call latency of network file systems (NFS, SMB).
+    """
+
+    SYNC = "sync"
+    ASYNC = "async"
+
+
+def run_io(coroutine: Coroutine[Any, Any, T], concurrency: int) -> T:
+    """Run `coroutine` on a new event loop that offloads blocking calls to `concurrency` threads.
+
+    `asyncio.to_thread` calls made by the coroutine share the loop's thread pool, so at most
+    `concurrency` system calls are in flight at once.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def main() -> T:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(concurrency, thread_name_prefix="mo-io")
+        )
+        return await coroutine
+
+    return asyncio.run(main())
@@ -1,10 +1,14 @@
+import copy
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
 from collections.abc import Iterable
+from dataclasses import dataclass, field
+from types import TracebackType
 from typing import Generic, Self, TypeVar
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field
-
 EventType = TypeVar("EventType")
 
 
@@ -26,13 +30,103 @@ class Observable(Generic[EventType]):
             observe(event)
 
 
-class ProgressEvent(BaseModel):
+@dataclass(slots=True)
+class ProgressEvent:
     current: int
     total: int | None = None
     message: str = "Processing..."
-    task_id: UUID = Field(default_factory=uuid4)
+    task_id: UUID = field(default_factory=uuid4)
 
     def advance(self, by: int = 1, message: str | None = None) -> Self:
-        self.message = message if message is not None else self.message
+        if message is not None:
+            self.message = message
         self.current += by
         return self
+
+    @property
+    def finished(self) -> bool:
+        return self.total is not None and self.current >= self.total
+
+
+class ThrottledObserver(Observer[ProgressEvent]):
+    """Coalesce progress events so that `observer` only sees a fraction of them.
+
+    An event is forwarded when it is the first or last one for its task, when `interval` seconds
+    have passed since the last forwarded event for the task, or when the task has advanced by
+    `every` since then. Forwarded events are copies, so observers may keep them.
+    """
+
+    def __init__(
+        self,
+        observer: Observer[ProgressEvent],
+        interval: float = 0.1,
+        every: int | None = None,
+    ) -> None:
+        self.observer = observer
+        self.interval = interval
+        self.every = every
+        self._last: dict[UUID, tuple[float, int]] = {}
+        self._pending: dict[UUID, ProgressEvent] = {}
+
+    def __call__(self, event: ProgressEvent) -> None:
+        now = time.monotonic()
+        last = self._last.get(event.task_id)
+        if (
+            last is None
+            or event.finished
+            or now - last[0] >= self.interval
+            or (self.every is not None and event.current - last[1] >= self.every)
+        ):
+            self._forward(event, now)
+        else:
+            self._pending[event.task_id] = event
+
+    def flush(self) -> None:
+        """Forward the latest coalesced event of every task."""
+        now = time.monotonic()
+        for event in list(self._pending.values()):
+            self._forward(event, now)
+
+    def _forward(self, event: ProgressEvent, now: float) -> None:
+        self._last[event.task_id] = (now, event.current)
+        self._pending.pop(event.task_id, None)
+        self.observer(copy.copy(event))
+
+
+class BackgroundObserver(Observer[EventType]):
+    """Dispatch events to `observer` on a background thread.
+
+    Events are copied before they are queued, so they can be mutated after notification. Use as a
+    context manager, or call `close` to drain the queue and stop the thread.
+    """
+
+    _STOP = object()
+
+    def __init__(self, observer: Observer[EventType]) -> None:
+        self.observer = observer
+        self._queue: queue.SimpleQueue[object] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="mo-observer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __call__(self, event: EventType) -> None:
+        self._queue.put(copy.copy(event))
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while (event := self._queue.get()) is not self._STOP:
+            self.observer(event)  # type: ignore[arg-type]
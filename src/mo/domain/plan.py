@@ -2,10 +2,14 @@ import logging
 from abc import ABC, abstractmethod
 from typing import final
 
+from mo.domain.io_backend import IoBackend, run_io
 from mo.domain.observer import Observable, ProgressEvent
 
 
 class PlannedAction(ABC):
+    # whether the action can run at the same time as the other concurrent-safe actions around it
+    concurrent_safe: bool = False
+
     @abstractmethod
     def execute(self) -> None:
         """Execute the action."""
@@ -26,20 +30,67 @@ class Plan(Observable[ProgressEvent]):
         self.log = logger or logging.getLogger(__name__)
         self._actions: list[PlannedAction] = actions or []
 
+    @property
+    def actions(self) -> list[PlannedAction]:
+        return list(self._actions)
+
     def add(self, action: PlannedAction) -> None:
         self._actions.append(action)
 
-    def execute(self) -> None:
+    def execute(self, io_backend: IoBackend = IoBackend.SYNC, concurrency: int = 32) -> None:
         self.log.info("Executing plan")
 
         event = ProgressEvent(current=0, total=len(self._actions), message="Executing plan")
         self.notify(event)
 
+        if io_backend is IoBackend.ASYNC:
+            run_io(self._execute_async(event), concurrency)
+            return
+
         for action in self._actions:
-            self.log.debug(action.describe())
-            action.execute()
+            self._execute_action(action)
             self.notify(event.advance())
 
+    async def _execute_async(self, event: ProgressEvent) -> None:
+        import asyncio
+
+        # runs of concurrent-safe actions execute together; any other action waits for the run
+        # before it to finish and finishes before the run after it starts
+        batch: list[PlannedAction] = []
+
+        async def execute(action: PlannedAction) -> None:
+            await asyncio.to_thread(self._execute_action, action)
+            self.notify(event.advance())
+
+        async def execute_batch() -> None:
+            # every action of the run finishes, even after one failed, so none is left running
+            # unobserved and every failure is reported
+            results = await asyncio.gather(*map(execute, batch), return_exceptions=True)
+            batch.clear()
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if not errors:
+                return
+            first, *others = errors
+            for error in others:
+                self.log.error(f"Another action failed as well: {error!r}", exc_info=error)
+                first.add_note(f"Another action failed as well: {error!r}")
+            raise first
+
+        for action in self._actions:
+            if action.concurrent_safe:
+                batch.append(action)
+                continue
+            await execute_batch()
+            await asyncio.to_thread(self._execute_action, action)
+            self.notify(event.advance())
+        await execute_batch()
+
+    def _execute_action(self, action: PlannedAction) -> None:
+        # describing an action can stat its files, so it's skipped unless it will be logged
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(action.describe())
+        action.execute()
+
     def describe(self) -> None:
         self.log.info(f"Planned actions: {self.format_plan()}")
 
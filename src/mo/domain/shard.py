@@ -0,0 +1,36 @@
+import zlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """One of `count` disjoint parts of the classes, numbered from 1.
+
+    Classes are assigned by the CRC-32 of their ID, which is the same on every machine, Python
+    version, and run, so workers given `1/N` through `N/N` split the classes between them without
+    coordinating and every class ends up in exactly one shard.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.index <= self.count:
+            raise ValueError(f"Shard must be between 1/{self.count} and {self.count}/{self.count}")
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        """Parse a shard written as `K/N`, e.g. `2/4`."""
+        index, sep, count = text.partition("/")
+        try:
+            if not sep:
+                raise ValueError
+            return cls(int(index), int(count))
+        except ValueError as exc:
+            raise ValueError(f"Invalid shard (expected K/N, e.g. 2/4): {text}") from exc
+
+    def contains(self, class_id: str) -> bool:
+        return zlib.crc32(class_id.encode()) % self.count == self.index - 1
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
@@ -1,5 +1,13 @@
+import atexit
 import logging
+import queue
 from enum import StrEnum
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 
 class LogLevel(StrEnum):
@@ -10,52 +18,96 @@ class LogLevel(StrEnum):
     CRITICAL = "CRITICAL"
 
 
-class ColoredFormatter(logging.Formatter):
-    # ANSI escape codes for colors
-    RESET = "\x1b[0m"
-    COLORS = {
-        "D": "\x1b[90m",  # Grey for DEBUG
-        "I": "\x1b[34m",  # Blue for INFO
-        "W": "\x1b[33m",  # Yellow for WARNING
-        "E": "\x1b[31m",  # Red for ERROR
-        "C": "\x1b[31;1m",  # Bright Red for CRITICAL
-    }
-
-    level_to_letter = {
-        logging.DEBUG: "D",
-        logging.INFO: "I",
-        logging.WARNING: "W",
-        logging.ERROR: "E",
-        logging.CRITICAL: "C",
-    }
-
-    def format(self, record: logging.LogRecord) -> str:
-        level_letter = self.level_to_letter.get(record.levelno, "?")
-        color = self.COLORS.get(level_letter, self.RESET)
-        record.levelletter = level_letter
-        message = super().format(record)
-        return f"{color}{message}{self.RESET}"
-
-
-def setup_logging(level: int | str = logging.DEBUG) -> logging.Logger:
-    logger = logging.getLogger()
-    logger.setLevel(level)
-
-    # Remove existing handlers to prevent duplicate logs
-    if logger.hasHandlers():
-        logger.handlers.clear()
-
-    # Create console handler
-    handler = logging.StreamHandler()
-    handler.setLevel(level)
-
-    # Define formatter with custom format
-    formatter = ColoredFormatter(
-        "[%(levelletter)s] %(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    handler.setFormatter(formatter)
-
-    # Add handler to the logger
-    logger.addHandler(handler)
-
-    return logger
+class BatchedFileHandler(logging.FileHandler):
+    """A file handler that collects records and writes them to the file together.
+
+    The pending records are written once `capacity` of them have been collected, and whenever the
+    handler is flushed, which the listener of `setup_logging` does each time it runs out of records.
+    """
+
+    def __init__(self, filename: Path, capacity: int = 1024) -> None:
+        super().__init__(filename)
+        self.capacity = capacity
+        self._pending: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._pending.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._pending) >= self.capacity:
+            self.flush()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._pending and self.stream is not None:
+                self.stream.write("".join(self._pending))
+                self._pending.clear()
+            super().flush()
+        finally:
+            self.release()
+
+
+class _BatchingListener(QueueListener):
+    """A queue listener that flushes its handlers whenever the queue runs empty."""
+
+    def dequeue(self, block: bool) -> Any:
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return super().dequeue(block)
+
+
+class _ThreadQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the records stay in this process, so the listener's handlers format them on its thread,
+        # and can still render their exceptions themselves
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def setup_logging(level: int | str = logging.DEBUG, log_file: Path | None = None) -> "Console":
+    """Log to the console, and to `log_file` if given, and return the console.
+
+    Logging calls only put their records on a queue. A listener thread formats them and writes
+    them to the console and the file, so slow output never holds up the thread that logs.
+    """
+    from rich.console import Console
+    from rich.logging import RichHandler
+
+    global _listener
+    console = Console(soft_wrap=True)
+    formatter = logging.Formatter("%(message)s", datefmt="[%X]")
+    handlers: list[logging.Handler] = [RichHandler(console=console, show_level=False)]
+    if log_file:
+        handlers.append(BatchedFileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    if _listener is not None:
+        # set up again, e.g. by another command in the same process
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root.addHandler(_ThreadQueueHandler(records))
+    root.setLevel(level)
+    _listener = _BatchingListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return console
+
+
+@atexit.register
+def _stop_listener() -> None:
+    # registered after the logging module's own exit handler, so it runs first, and the records
+    # still on the queue are written before the handlers are closed
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,121 @@
+import logging
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime
+from enum import StrEnum
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+    import polars as pl
+
+
+class ProfileMode(StrEnum):
+    CPU = "cpu"
+    MEMORY = "memory"
+
+
+class Profiler:
+    """Profile a block of code and write a report bundle when it exits.
+
+    While a profiler is active, query plans passed to `record_plan` are collected and written to
+    the bundle alongside the CPU or memory report.
+    """
+
+    def __init__(self, mode: ProfileMode, report_dir: Path, top: int = 50) -> None:
+        self.mode = mode
+        self.report_dir = report_dir
+        self.top = top
+        self.plans: list[tuple[str, str]] = []
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._profile: cProfile.Profile | None = None
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        _active = self
+        # the profilers are only imported when requested to keep CLI startup fast
+        if self.mode is ProfileMode.CPU:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode is ProfileMode.MEMORY:
+            import tracemalloc
+
+            tracemalloc.start(25)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        global _active
+        _active = None
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        if self._profile is not None:
+            self._profile.disable()
+            self._write_cpu_report(self._profile)
+        elif self.mode is ProfileMode.MEMORY:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._write_memory_report(snapshot, peak)
+        self._write_plans()
+        self.log.warning(f"Wrote {self.mode} profile to {str(self.report_dir)}")
+
+    def record_plan(self, label: str, df: "pl.LazyFrame") -> None:
+        try:
+            plan = df.explain()
+        except Exception as exc:
+            plan = f"<could not explain plan: {exc}>"
+        self.plans.append((label, plan))
+
+    def _write_cpu_report(self, profile: "cProfile.Profile") -> None:
+        import pstats
+
+        profile.dump_stats(self.report_dir / "cpu.pstats")
+        with open(self.report_dir / "cpu.txt", "w") as file:
+            stats = pstats.Stats(profile, stream=file)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+    def _write_memory_report(self, snapshot: "tracemalloc.Snapshot", peak: int) -> None:
+        snapshot.dump(str(self.report_dir / "memory.snapshot"))
+        with open(self.report_dir / "memory.txt", "w") as file:
+            file.write(f"Peak traced memory: {peak / 1024**2:.1f} MiB\n\n")
+            file.write(f"Top {self.top} allocators by line:\n")
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                file.write(f"{stat}\n")
+
+    def _write_plans(self) -> None:
+        if not self.plans:
+            return
+        with open(self.report_dir / "plans.txt", "w") as file:
+            for label, plan in self.plans:
+                file.write(f"== {label} ==\n{plan}\n\n")
+
+
+_active: Profiler | None = None
+
+
+def record_plan(label: str, df: "pl.LazyFrame") -> None:
+    """Record the query plan of `df` if a profiler is active, otherwise do nothing."""
+    if _active is not None:
+        _active.record_plan(label, df)
+
+
+def profile_command(
+    command: str, mode: ProfileMode | None, log_file: Path | None
+) -> AbstractContextManager[Profiler | None]:
+    """Profile a CLI command, writing the report bundle next to the log file (if any)."""
+    if mode is None:
+        return nullcontext()
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    report_root = log_file.parent if log_file else Path.cwd()
+    return Profiler(mode, report_root / f"mo-{command}-profile-{timestamp}")
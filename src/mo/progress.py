@@ -0,0 +1,50 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import TracebackType
+from uuid import UUID
+
+from rich.console import Console
+from rich.progress import Progress, TaskID
+
+from mo.domain.observer import BackgroundObserver, Observer, ProgressEvent, ThrottledObserver
+
+
+class RichProgressObserver(Observer[ProgressEvent]):
+    def __init__(self, console: Console) -> None:
+        self.progress = Progress(console=console, transient=True)
+        self.tasks: dict[UUID, TaskID] = {}
+
+    def __enter__(self):
+        """Start the Rich progress display."""
+        self.progress.__enter__()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ):
+        """Stop the Rich progress display."""
+        self.progress.__exit__(exc_type, exc_val, exc_tb)
+
+    def __call__(self, event: ProgressEvent) -> None:
+        """Handle a ProgressEvent by updating the appropriate task."""
+        if event.task_id not in self.tasks:
+            self.tasks[event.task_id] = self.progress.add_task(
+                event.message, total=event.total, completed=event.current
+            )
+
+        self.progress.update(self.tasks[event.task_id], completed=event.current)
+
+
+@contextmanager
+def rich_progress(console: Console, interval: float = 0.1) -> Iterator[Observer[ProgressEvent]]:
+    """Display progress with Rich, throttled and updated off the calling thread."""
+    with (
+        RichProgressObserver(console) as rich_observer,
+        BackgroundObserver(rich_observer) as background_observer,
+    ):
+        throttled_observer = ThrottledObserver(background_observer, interval=interval)
+        yield throttled_observer
+        throttled_observer.flush()
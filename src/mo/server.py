@@ -0,0 +1,325 @@
+import contextlib
+import json
+import logging
+import os
+import signal
+import socketserver
+import stat
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from enum import StrEnum
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from pydantic import ValidationError
+
+from mo.domain.observer import Observer, ProgressEvent, ThrottledObserver
+from mo.services.file_access import FileInfoCache
+from mo.usecases.compress_usecase import CompressUseCase
+from mo.usecases.organize_usecase import OrganizeUseCase
+from mo.usecases.query_usecase import QueryUseCase
+
+
+class JobCommand(StrEnum):
+    ORGANIZE = "organize"
+    COMPRESS = "compress"
+    QUERY = "query"
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass(kw_only=True)
+class Job:
+    command: JobCommand
+    config: Any
+    id: str = field(default_factory=lambda: uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    result: Any = None
+    error: str | None = None
+    events: list[dict[str, Any]] = field(default_factory=list)
+    changed: threading.Condition = field(default_factory=threading.Condition)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def update(self, **changes: Any) -> None:
+        with self.changed:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.changed.notify_all()
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobObserver(Observer[ProgressEvent]):
+    """Record the progress events of a job so that clients can stream them."""
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+
+    def __call__(self, event: ProgressEvent) -> None:
+        record = asdict(event)
+        record["task_id"] = str(event.task_id)
+        with self.job.changed:
+            self.job.events.append(record)
+            self.job.changed.notify_all()
+
+
+class JobQueue:
+    """Run jobs in the background, at most `concurrency` at a time.
+
+    Every job shares the same `FileInfoCache`, so files that were already validated by an earlier
+    job are not parsed again unless they changed. Jobs that write the same output run one after
+    the other, in the order they were submitted. A job's progress events are dropped once it
+    finishes, and only the last `keep_finished` finished jobs, with their results, are kept.
+    """
+
+    def __init__(self, concurrency: int = 2, keep_finished: int = 100) -> None:
+        self.cache = FileInfoCache()
+        self.jobs: dict[str, Job] = {}
+        self.keep_finished = keep_finished
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="mo-job")
+        self._finished: deque[str] = deque()
+        # output -> the jobs writing it, the first of which is in the pool
+        self._writers: dict[Path, deque[Job]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, command: JobCommand, config: dict[str, Any]) -> Job:
+        """Validate the config of a job and queue it."""
+        match command:
+            case JobCommand.ORGANIZE:
+                job = Job(command=command, config=OrganizeUseCase.Input(**config))
+            case JobCommand.COMPRESS:
+                job = Job(command=command, config=CompressUseCase.Input(**config))
+            case JobCommand.QUERY:
+                job = Job(command=command, config=QueryUseCase.Input(**config))
+        output = _output_of(job)
+        with self._lock:
+            self.jobs[job.id] = job
+            if output:
+                writers = self._writers.setdefault(output, deque())
+                writers.append(job)
+                if len(writers) > 1:
+                    self.log.info(f"Queued {command} job {job.id} after {writers[-2].id}")
+                    return job
+        self._pool.submit(self._run, job)
+        self.log.info(f"Queued {command} job {job.id}")
+        return job
+
+    def list_jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job: Job) -> None:
+        job.update(status=JobStatus.RUNNING)
+        observer = ThrottledObserver(JobObserver(job))
+        try:
+            match job.command:
+                case JobCommand.ORGANIZE:
+                    OrganizeUseCase(job.config, [observer], cache=self.cache).execute()
+                    result = None
+                case JobCommand.COMPRESS:
+                    CompressUseCase(job.config, [observer], cache=self.cache).execute()
+                    result = None
+                case JobCommand.QUERY:
+                    result = QueryUseCase(job.config).execute()
+            observer.flush()
+            job.update(status=JobStatus.SUCCEEDED, result=result, events=[])
+            self.log.info(f"Finished {job.command} job {job.id}")
+        except Exception as exc:
+            observer.flush()
+            job.update(status=JobStatus.FAILED, error=f"{type(exc).__name__}: {exc}", events=[])
+            self.log.exception(f"Failed {job.command} job {job.id}")
+        self._retire(job)
+
+    def _retire(self, job: Job) -> None:
+        next_writer = None
+        # the oldest finished jobs are forgotten first; queued and running jobs are always kept
+        with self._lock:
+            self._finished.append(job.id)
+            while len(self._finished) > self.keep_finished:
+                del self.jobs[self._finished.popleft()]
+            if output := _output_of(job):
+                writers = self._writers[output]
+                writers.popleft()
+                if writers:
+                    next_writer = writers[0]
+                else:
+                    del self._writers[output]
+        if next_writer:
+            # the pool refuses new jobs once it is shutting down, which cancels queued jobs anyway
+            with contextlib.suppress(RuntimeError):
+                self._pool.submit(self._run, next_writer)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _output_of(job: Job) -> Path | None:
+    output = getattr(job.config, "output", None)
+    return output.resolve() if output else None
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """The job API.
+
+    - `POST /jobs` with `{"command": "organize" | "compress" | "query", ...config}` queues a job,
+      where the config fields are those of the command's use case `Input`.
+    - `GET /jobs` lists the jobs and `GET /jobs/<id>` returns one of them.
+    - `GET /jobs/<id>/events` streams the job's progress events as newline-delimited JSON until
+      the job is done, ending with the job itself. A finished job has only the job itself to send.
+    """
+
+    server: "JobServer | UnixJobServer"
+
+    def do_GET(self) -> None:
+        parts = self.path.strip("/").split("/")
+        # finished jobs are forgotten by the queue's threads, so each job is looked up only once
+        queue = self.server.queue
+        if parts == ["jobs"]:
+            self._send_json([job.summary() for job in queue.list_jobs()])
+        elif len(parts) in (2, 3) and parts[0] == "jobs" and (job := queue.get(parts[1])):
+            if len(parts) == 2:
+                self._send_json(job.summary())
+            elif parts[2] == "events":
+                self._stream_events(job)
+            else:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Unknown resource: {self.path}")
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown resource: {self.path}")
+
+    def do_POST(self) -> None:
+        if self.path.strip("/") != "jobs":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown resource: {self.path}")
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            command = JobCommand(body.pop("command"))
+            job = self.server.queue.submit(command, body)
+        except (ValueError, KeyError, TypeError, AttributeError, ValidationError) as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"Invalid job: {exc}")
+            return
+        self._send_json(job.summary(), HTTPStatus.ACCEPTED)
+
+    def _stream_events(self, job: Job) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        # the job drops its events when it finishes, but this stream still sends the rest of them
+        events = job.events
+        sent = 0
+        while True:
+            with job.changed:
+                job.changed.wait_for(lambda sent=sent: len(events) > sent or job.done)
+                unsent = events[sent:]
+                done = job.done
+            for event in unsent:
+                self._write_line(event)
+            sent += len(unsent)
+            if done:
+                self._write_line(job.summary())
+                return
+
+    def _write_line(self, record: Any) -> None:
+        self.wfile.write(json.dumps(record, default=str).encode() + b"\n")
+        self.wfile.flush()
+
+    def _send_json(self, record: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+        body = json.dumps(record, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json({"error": message}, status)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.getLogger(self.__class__.__name__).debug(f"{self.address_string()} {format % args}")
+
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], queue: JobQueue) -> None:
+        super().__init__(address, JobRequestHandler)
+        self.queue = queue
+
+
+class UnixJobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, queue: JobQueue) -> None:
+        # a socket left behind by a server that was killed is replaced, but nothing else is
+        try:
+            mode = path.lstat().st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"Not replacing {str(path)}, which is not a socket")
+            path.unlink()
+        super().__init__(os.fspath(path), JobRequestHandler)
+        self.queue = queue
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Path | None = None,
+    concurrency: int = 2,
+    keep_finished: int = 100,
+) -> None:
+    """Serve the job API until interrupted, on a Unix socket if one is given."""
+    log = logging.getLogger(__name__)
+    queue = JobQueue(concurrency, keep_finished)
+    if socket_path:
+        server: JobServer | UnixJobServer = UnixJobServer(socket_path, queue)
+        log.info(f"Serving mo jobs on {str(socket_path)}")
+    else:
+        server = JobServer((host, port), queue)
+        log.info(f"Serving mo jobs on http://{host}:{port}")
+    # shut down cleanly when stopped by a service manager, too
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down")
+    finally:
+        server.server_close()
+        queue.shutdown()
+        if socket_path:
+            socket_path.unlink(missing_ok=True)
+
+
+def _interrupt(signum: int, frame: object) -> None:
+    raise KeyboardInterrupt
@@ -0,0 +1,219 @@
+import io
+import logging
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import IO
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+@dataclass(slots=True, kw_only=True)
+class ArchiveMember:
+    archive_path: Path
+    member_path: str
+    extracted_path: Path
+    size: int
+    mtime: float
+
+
+def is_archive(path: Path | str) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class ArchiveReader:
+    """Extract the interesting members of zip and tar archives, including nested archives.
+
+    Each archive's directory is read once and the members accepted by `select` are decompressed in
+    a thread pool (zlib releases the GIL while inflating). Archives nested inside archives are read
+    in memory rather than written to disk, and their members are reported with a `::`-joined
+    member path, e.g. `inner.zip::class/responses.csv`.
+    """
+
+    def __init__(
+        self,
+        extraction_dir: Path,
+        select: Callable[[str], bool],
+        max_workers: int | None = None,
+    ) -> None:
+        self.extraction_dir = extraction_dir
+        self.select = select
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._extractions = 0
+
+    def extract(self, path: Path) -> list[ArchiveMember]:
+        # every archive gets its own directory so that identically named members don't collide
+        self._extractions += 1
+        root = self.extraction_dir / str(self._extractions)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            futures: list[Future[None]] = []
+            members = self._read(path, path, path.name, "", root, pool, futures)
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        size = sum(member.size for member in members)
+        rate = size / elapsed / 1024**2 if elapsed > 0 else 0.0
+        self.log.info(
+            f"Extracted {len(members)} members ({size / 1024**2:.1f} MiB) from {str(path)} "
+            f"in {elapsed:.2f}s ({rate:.1f} MiB/s)"
+        )
+        return members
+
+    def _read(
+        self,
+        archive_path: Path,
+        source: Path | IO[bytes],
+        name: str,
+        prefix: str,
+        root: Path,
+        pool: ThreadPoolExecutor,
+        futures: list[Future[None]],
+    ) -> list[ArchiveMember]:
+        if name.lower().endswith(".zip"):
+            return self._read_zip(archive_path, source, prefix, root, pool, futures)
+        return self._read_tar(archive_path, source, prefix, root, pool, futures)
+
+    def _read_zip(
+        self,
+        archive_path: Path,
+        source: Path | IO[bytes],
+        prefix: str,
+        root: Path,
+        pool: ThreadPoolExecutor,
+        futures: list[Future[None]],
+    ) -> list[ArchiveMember]:
+        members: list[ArchiveMember] = []
+        # the zip file is closed by the pool's worker once all of its members are written
+        zip_file = zipfile.ZipFile(source, "r")
+        zip_futures: list[Future[None]] = []
+        for info in zip_file.infolist():
+            if info.is_dir() or not (member := _safe_member(info.filename)):
+                continue
+            if is_archive(member):
+                nested = io.BytesIO(zip_file.read(info))
+                members.extend(
+                    self._read(
+                        archive_path,
+                        nested,
+                        member,
+                        f"{prefix}{member}::",
+                        root / member,
+                        pool,
+                        futures,
+                    )
+                )
+            elif self.select(member):
+                target = root / member
+                zip_futures.append(pool.submit(_write_zip_member, zip_file, info, target))
+                members.append(
+                    ArchiveMember(
+                        archive_path=archive_path,
+                        member_path=f"{prefix}{member}",
+                        extracted_path=target,
+                        size=info.file_size,
+                        mtime=time.mktime((*info.date_time, 0, 0, -1)),
+                    )
+                )
+        futures.append(pool.submit(_close_when_done, zip_file, zip_futures))
+        return members
+
+    def _read_tar(
+        self,
+        archive_path: Path,
+        source: Path | IO[bytes],
+        prefix: str,
+        root: Path,
+        pool: ThreadPoolExecutor,
+        futures: list[Future[None]],
+    ) -> list[ArchiveMember]:
+        members: list[ArchiveMember] = []
+        from_path = isinstance(source, Path)
+        # compressed tar files can only be read sequentially, so their members are not parallelized
+        with tarfile.open(
+            name=source if from_path else None,
+            fileobj=None if from_path else source,
+            mode="r:*",
+        ) as tar_file:
+            for info in tar_file:
+                if not info.isfile() or not (member := _safe_member(info.name)):
+                    continue
+                if not is_archive(member) and not self.select(member):
+                    continue
+                if (extracted := tar_file.extractfile(info)) is None:
+                    continue
+                if is_archive(member):
+                    nested = io.BytesIO(extracted.read())
+                    members.extend(
+                        self._read(
+                            archive_path,
+                            nested,
+                            member,
+                            f"{prefix}{member}::",
+                            root / member,
+                            pool,
+                            futures,
+                        )
+                    )
+                else:
+                    target = root / member
+                    _write_stream(extracted, target)
+                    members.append(
+                        ArchiveMember(
+                            archive_path=archive_path,
+                            member_path=f"{prefix}{member}",
+                            extracted_path=target,
+                            size=info.size,
+                            mtime=info.mtime,
+                        )
+                    )
+        return members
+
+
+def find_supplementary_dirs(members: Iterable[ArchiveMember]) -> dict[Path, str]:
+    """Map the extracted `supplementary` directories of the members to their member paths."""
+    dirs: dict[Path, str] = {}
+    for member in members:
+        head, sep, tail = member.member_path.rpartition("::")
+        parts = PurePosixPath(tail).parts
+        if "supplementary" in parts[:-1]:
+            index = parts.index("supplementary")
+            extracted = member.extracted_path.parents[len(parts) - index - 2]
+            dirs.setdefault(extracted, f"{head}{sep}{'/'.join(parts[: index + 1])}")
+    return dirs
+
+
+def _write_zip_member(zip_file: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path) -> None:
+    with zip_file.open(info) as source:
+        _write_stream(source, target)
+
+
+def _close_when_done(zip_file: zipfile.ZipFile, futures: list[Future[None]]) -> None:
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        zip_file.close()
+
+
+def _write_stream(source: IO[bytes], target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "wb") as destination:
+        shutil.copyfileobj(source, destination, 1024 * 1024)
+
+
+def _safe_member(name: str) -> str | None:
+    """Return the member name if it is safe to extract (relative and without `..`)."""
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        return None
+    return str(path)
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from mo.services.file_index import FileIndex, IndexEntry
+
+# files are told apart by their size and a hash of their start, and only compared byte for byte if
+# those match, which is cheaper than hashing every file whole
+HEAD_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(slots=True)
+class DedupReport:
+    files: int = 0
+    linked: int = 0
+    bytes_copied: int = 0
+    bytes_saved: int = 0
+    copy_seconds: float = 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        """The time the linked files would have taken to copy, at the speed of the actual copies."""
+        if not self.bytes_copied:
+            return 0.0
+        return self.bytes_saved * self.copy_seconds / self.bytes_copied
+
+    def __str__(self) -> str:
+        summary = (
+            f"Placed {self.files} supplementary files, {self.linked} of them as hardlinks to "
+            f"identical files: saved {self.bytes_saved / 2**20:.1f} MiB"
+        )
+        if self.bytes_copied:
+            summary += f" and about {self.seconds_saved:.1f}s of copying"
+        return summary
+
+
+class BlobStore:
+    """Place supplementary files in the output so that each distinct content is stored once.
+
+    The first file with some content is copied (or moved) as usual, and every later file with the
+    same content becomes a hardlink to it. Files are only looked at if another expected file has
+    the same size, which the index already knows, and then compared byte for byte with the placed
+    files that start the same way. The files of a folder are placed in parallel.
+
+    Hardlinked files share their data, so editing one of them in place edits all of them.
+    """
+
+    def __init__(self, index: FileIndex | None = None, concurrency: int = 8) -> None:
+        self.index = index or FileIndex()
+        self.concurrency = concurrency
+        self.report = DedupReport()
+        self._sizes: Counter[int] = Counter()
+        # the distinct contents placed so far, by size and hash of the start
+        self._blobs: dict[tuple[int, bytes], list[Future[Path]]] = {}
+        self._lock = threading.Lock()
+
+    def expect(self, dirs: Iterable[Path]) -> None:
+        """Note the files under `dirs`, which are about to be placed."""
+        self._sizes.update(entry.size for entry in self.index.walk(dirs) if not entry.is_dir)
+
+    def place_tree(self, src: Path, dst: Path, move: bool = False) -> None:
+        """Copy (or move) everything under `src` to the same place under `dst`."""
+        entries = self.index.walk([src])
+        self.index.make_dir(dst)
+        for entry in entries:
+            if entry.is_dir:
+                (dst / entry.path.relative_to(src)).mkdir(parents=True, exist_ok=True)
+        files = [entry for entry in entries if not entry.is_dir]
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="mo-blob") as pool:
+            # consume the results so that errors are raised here
+            for _ in pool.map(
+                lambda entry: self.place(entry, dst / entry.path.relative_to(src), move), files
+            ):
+                pass
+        if move:
+            shutil.rmtree(src)
+            self.index.invalidate(src)
+        self.index.invalidate(dst)
+
+    def place(self, entry: IndexEntry, dst: Path, move: bool = False) -> None:
+        """Copy (or move) the file of `entry` to `dst`, linking it if its content is placed."""
+        with self._lock:
+            self.report.files += 1
+        if self._sizes[entry.size] < 2:
+            # no other file can have the same content
+            self._transfer(entry, dst, move)
+            return
+
+        key = (entry.size, _head_digest(entry.path))
+        with self._lock:
+            candidates = self._blobs.setdefault(key, [])
+            seen = list(candidates)
+            if not seen:
+                candidates.append(claim := Future())
+        for candidate in seen:
+            try:
+                original = candidate.result()
+            except Exception:
+                continue
+            if _same_content(entry.path, original) and self._link(entry, original, dst, move):
+                return
+        if seen:
+            with self._lock:
+                self._blobs[key].append(claim := Future())
+
+        try:
+            self._transfer(entry, dst, move)
+        except BaseException as exc:
+            claim.set_exception(exc)
+            raise
+        claim.set_result(dst)
+
+    def _link(self, entry: IndexEntry, original: Path, dst: Path, move: bool) -> bool:
+        try:
+            dst.unlink(missing_ok=True)
+            os.link(original, dst)
+        except OSError:
+            # the file system has no hardlinks (or not across the two)
+            return False
+        if move:
+            entry.path.unlink()
+        with self._lock:
+            self.report.linked += 1
+            self.report.bytes_saved += entry.size
+        return True
+
+    def _transfer(self, entry: IndexEntry, dst: Path, move: bool) -> None:
+        # dst may be a hardlink from an earlier run, which must not be overwritten in place
+        dst.unlink(missing_ok=True)
+        if move:
+            try:
+                os.rename(entry.path, dst)
+                return
+            except OSError:
+                # across file systems
+                pass
+        start = time.perf_counter()
+        shutil.copy2(entry.path, dst)
+        elapsed = time.perf_counter() - start
+        if move:
+            entry.path.unlink()
+        with self._lock:
+            self.report.bytes_copied += entry.size
+            self.report.copy_seconds += elapsed
+
+
+def _head_digest(path: Path) -> bytes:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read(HEAD_SIZE)).digest()
+
+
+def _same_content(a: Path, b: Path) -> bool:
+    with open(a, "rb") as file_a, open(b, "rb") as file_b:
+        while True:
+            chunk = file_a.read(CHUNK_SIZE)
+            if chunk != file_b.read(CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
@@ -0,0 +1,66 @@
+import logging
+import re
+from pathlib import Path
+
+from mo.domain.file_metadata import FileMetadata
+
+# CourseKata class IDs are UUIDs
+DEFAULT_CLASS_ID_PATTERN = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+
+class ClassIdResolver:
+    """Infer the class ID of a data file from the folder it is in, without parsing it.
+
+    CourseKata downloads put the files for a class in a folder named with the class ID. When the
+    parent folder's name looks like a class ID it is used as the class ID, and every
+    `check_every`-th file is parsed anyway to cross-check it. After a mismatch the folder names are
+    no longer trusted: every file resolved since the last check that passed is parsed again, and so
+    is every remaining file.
+    """
+
+    def __init__(
+        self, pattern: str = DEFAULT_CLASS_ID_PATTERN, check_every: int | None = 20
+    ) -> None:
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.check_every = check_every
+        self.trusted = True
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._resolved = 0
+        self._unverified: list[FileMetadata] = []
+
+    def resolve(self, path: Path) -> str | None:
+        """Return the class ID implied by the folder of `path`, or None if it is ambiguous."""
+        name = path.parent.name
+        if self.trusted and self.pattern.fullmatch(name):
+            return name
+
+    def needs_check(self) -> bool:
+        """Return whether the next structurally resolved file should be parsed to cross-check."""
+        self._resolved += 1
+        if not self.check_every:
+            return False
+        return (self._resolved - 1) % self.check_every == 0
+
+    def trust(self, metadata: FileMetadata) -> None:
+        """Record a file whose class ID was resolved from its folder without parsing it."""
+        self._unverified.append(metadata)
+
+    def check(self, path: Path, resolved: str, parsed: list[str]) -> list[FileMetadata]:
+        """Cross-check a resolved class ID with the class IDs parsed from the file.
+
+        Returns the files resolved since the last check that passed when this one fails, since
+        their folders can no longer be trusted either. A file without class IDs proves nothing.
+        """
+        if not parsed:
+            return []
+        if parsed == [resolved]:
+            self._unverified.clear()
+            return []
+        self.trusted = False
+        self.log.warning(
+            f"Class IDs in {str(path)} ({', '.join(parsed)}) do not match its folder ({resolved}); "
+            f"parsing the class ID of the {len(self._unverified)} files resolved since the last "
+            "check and of every remaining file"
+        )
+        unverified, self._unverified = self._unverified, []
+        return unverified
@@ -0,0 +1,79 @@
+import gzip
+import shutil
+from pathlib import Path
+from types import ModuleType
+from typing import BinaryIO
+
+import polars as pl
+
+from mo.domain.data_format import Compression
+
+
+def zstd_module() -> ModuleType | None:
+    """Return the module that reads and writes zstd streams, or None if there is none."""
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found]
+
+        return zstandard
+    except ImportError:
+        return None
+
+
+def check_compression(compression: Compression) -> None:
+    """Raise a ValueError if files can't be compressed with `compression` here."""
+    if compression is Compression.ZSTD and zstd_module() is None:
+        raise ValueError(
+            "Writing zstd files requires Python 3.14+ or the `zstandard` package, "
+            "e.g. `pip install mo[zstd]`"
+        )
+
+
+def open_compressed(path: Path, compression: Compression) -> BinaryIO:
+    """Open `path` for writing a stream compressed with `compression`."""
+    check_compression(compression)
+    match compression:
+        case Compression.GZIP:
+            # the caller closes the stream it gets
+            return gzip.open(path, "wb")  # type: ignore[return-value]  # noqa: SIM115
+        case Compression.ZSTD:
+            return zstd_module().open(path, "wb")  # type: ignore[union-attr]
+
+
+def open_decompressed(file: BinaryIO, compression: Compression) -> BinaryIO | None:
+    """Return a stream of the decompressed contents of `file`, or None if zstd can't be read here.
+
+    The contents are decompressed as they are read, so reading the first line of a large file only
+    decompresses its first block.
+    """
+    match compression:
+        case Compression.GZIP:
+            return gzip.GzipFile(fileobj=file, mode="rb")  # type: ignore[return-value]
+        case Compression.ZSTD:
+            module = zstd_module()
+            return module.open(file, "rb") if module else None
+
+
+def write_csv(df: pl.DataFrame, path: Path) -> None:
+    """Write `df` as CSV, compressing it if the file name ends in a compression suffix."""
+    if compression := Compression.from_path(path):
+        with open_compressed(path, compression) as file:
+            df.write_csv(file)
+    else:
+        df.write_csv(path)
+
+
+def compress_file(src: Path, dst: Path, compression: Compression) -> None:
+    """Stream `src` into `dst`, compressing with `compression`, without loading it into memory."""
+    partial = dst.with_name(f".{dst.name}.partial")
+    try:
+        with open(src, "rb") as infile, open_compressed(partial, compression) as outfile:
+            shutil.copyfileobj(infile, outfile, 1024 * 1024)
+        partial.replace(dst)
+    finally:
+        partial.unlink(missing_ok=True)
@@ -0,0 +1,151 @@
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import polars as pl
+
+from mo.domain.data_types import DataType
+from mo.services.file_index import FileIndex
+from mo.services.parsing import DataParsingService
+
+# the types that list classes rather than belong to one
+LISTING_TYPES = (DataType.CLASSES, DataType.MANIFEST)
+# how many classes the logged warnings name; the report has all of them
+LOGGED_CLASSES = 10
+
+
+@dataclass(slots=True, kw_only=True)
+class ConsistencyReport:
+    output: Path
+    listed_classes: int
+    classes_with_data: int
+    classes_without_data: list[str] = field(default_factory=list)
+    data_without_classes: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def consistent(self) -> bool:
+        return not self.classes_without_data and not self.data_without_classes
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str, indent=2)
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.to_json())
+
+    def log(self, log: logging.Logger) -> None:
+        if self.listed_classes == 0:
+            log.warning(f"No classes or manifest file in {str(self.output)} to check against")
+            return
+        if self.classes_without_data:
+            log.warning(
+                f"{len(self.classes_without_data)} classes have no data: "
+                f"{_abbreviate(self.classes_without_data)}"
+            )
+        if self.data_without_classes:
+            log.warning(
+                f"{len(self.data_without_classes)} classes with data are not in the classes or "
+                f"manifest files: {_abbreviate(self.data_without_classes)}"
+            )
+        if self.consistent:
+            log.info(f"All {self.listed_classes} listed classes have data and vice versa")
+
+
+def _abbreviate(classes: list[str] | dict[str, list[str]]) -> str:
+    if len(classes) <= LOGGED_CLASSES:
+        return str(classes)
+    if isinstance(classes, dict):
+        shown = str(dict(list(classes.items())[:LOGGED_CLASSES]))
+    else:
+        shown = str(classes[:LOGGED_CLASSES])
+    return f"{shown} and {len(classes) - LOGGED_CLASSES} more"
+
+
+class ConsistencyService:
+    """Check the classes listed in `classes` and `manifest` files against the classes with data.
+
+    Works on both output layouts: organized (`<class_id>/<type>.csv`, where the class is known from
+    the folder) and compressed (`<type>.parquet` with a `class_id` column, and
+    `supplementary/<class_id>`). Folder structure comes from a single walk of the output, data
+    files are only scanned lazily for their `class_id` column, and both set differences are
+    computed with anti-joins in a single query.
+    """
+
+    def __init__(
+        self, index: FileIndex | None = None, parser: DataParsingService | None = None
+    ) -> None:
+        self.index = index or FileIndex()
+        self.parser = parser or DataParsingService()
+
+    def check(self, output: Path) -> ConsistencyReport:
+        listed_frames: list[pl.LazyFrame] = []
+        data_frames: list[pl.LazyFrame] = []
+        structural: dict[str, list[str]] = {"class_id": [], "data_type": []}
+
+        def add_structural(class_id: str, data_type: str) -> None:
+            structural["class_id"].append(class_id)
+            structural["data_type"].append(data_type)
+
+        for entry in self.index.walk([output]):
+            path = entry.path
+            parent = path.parent
+            in_root = parent == output
+            in_folder = not in_root and parent.parent == output
+            if entry.is_dir:
+                if in_folder and path.name == "supplementary":
+                    add_structural(parent.name, "supplementary")
+                elif in_folder and parent.name == "supplementary":
+                    add_structural(path.name, "supplementary")
+                continue
+
+            data_type = self.parser.identify_type(path)
+            if data_type in LISTING_TYPES and in_root:
+                listed_frames.append(self._class_ids(path))
+            elif data_type in DataType and in_root:
+                data_frames.append(
+                    self._class_ids(path).with_columns(data_type=pl.lit(str(data_type)))
+                )
+            elif data_type in DataType and in_folder:
+                add_structural(parent.name, str(data_type))
+
+        data_frames.append(
+            pl.LazyFrame(structural, schema={"class_id": pl.Utf8, "data_type": pl.Utf8})
+        )
+        data = pl.concat(data_frames).unique()
+        listed = (
+            pl.concat(listed_frames).unique()
+            if listed_frames
+            else pl.LazyFrame(schema={"class_id": pl.Utf8})
+        )
+        data_classes = data.select("class_id").unique()
+
+        listed_count, data_count, without_data, unlisted = pl.collect_all(
+            [
+                listed.select(pl.len()),
+                data_classes.select(pl.len()),
+                listed.join(data_classes, on="class_id", how="anti").sort("class_id"),
+                data.join(listed, on="class_id", how="anti")
+                .group_by("class_id")
+                .agg(pl.col("data_type").sort())
+                .sort("class_id"),
+            ]
+        )
+        return ConsistencyReport(
+            output=output,
+            listed_classes=listed_count.item(),
+            classes_with_data=data_count.item(),
+            classes_without_data=without_data.get_column("class_id").to_list(),
+            data_without_classes=dict(
+                zip(
+                    unlisted.get_column("class_id").to_list(),
+                    unlisted.get_column("data_type").to_list(),
+                    strict=True,
+                )
+            ),
+        )
+
+    def _class_ids(self, path: Path) -> pl.LazyFrame:
+        return (
+            self.parser.parse(path).select(pl.col("class_id").cast(pl.Utf8)).drop_nulls().unique()
+        )
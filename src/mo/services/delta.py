@@ -0,0 +1,94 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+
+from mo.domain.data_types import DataType
+
+LOG_NAME = "batches.jsonl"
+# the column whose latest value is a type's watermark
+EVENT_TIME_COLUMNS: dict[DataType, str] = {
+    DataType.RESPONSES: "dt_submitted",
+    DataType.PAGE_VIEWS: "dt_accessed",
+    DataType.MEDIA_VIEWS: "dt_last_event",
+}
+
+
+class DeltaBatch:
+    """The rows that one compress run added to its output, as one numbered batch of changes.
+
+    Each type's new rows are written to `batch-<id>/<type>.parquet` in the delta directory, and the
+    batch is committed by appending a line to `batches.jsonl` once all of them are written, so
+    consumers should only read the batches listed there. Batch IDs increase by one per committed
+    batch. A type's watermark is the latest event time (e.g. `dt_submitted`) of all the rows
+    delivered so far, so it never decreases, even when a batch only has older rows.
+
+    A type's rows are written before its table is replaced, so a run that fails before committing
+    leaves rows behind that may already be in the output. The next run takes them over into its
+    own batch, which makes delivery at-least-once: a row is in a committed batch at least once, and
+    more than once only if a run failed in between.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        previous = self._last_entry()
+        self.batch_id: int = previous["batch_id"] + 1 if previous else 1
+        self.watermarks: dict[str, str | None] = dict(previous["watermarks"]) if previous else {}
+        self.rows: dict[str, int] = {}
+        if self.path.exists():
+            # left over from a run that failed before committing this batch
+            for pending in sorted(self.path.glob("*.parquet")):
+                self._record(DataType(pending.stem), pl.read_parquet(pending))
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"batch-{self.batch_id:06d}"
+
+    def add(self, data_type: DataType, rows: pl.LazyFrame) -> None:
+        """Write the new rows of `data_type` to the batch."""
+        data = rows.collect(streaming=True)
+        if data.is_empty():
+            return
+        path = self.path / f"{data_type.value}.parquet"
+        if data_type.value in self.rows:
+            # rows left over for the type, or added by the same run again
+            data = pl.concat([pl.read_parquet(path), data], how="diagonal_relaxed").unique(
+                maintain_order=True
+            )
+        self.path.mkdir(parents=True, exist_ok=True)
+        # written aside first, so a failure never leaves a partial file in the batch
+        temp = path.with_suffix(".tmp")
+        data.write_parquet(temp)
+        temp.replace(path)
+        self._record(data_type, data)
+
+    def _record(self, data_type: DataType, data: pl.DataFrame) -> None:
+        self.rows[data_type.value] = len(data)
+        if (column := EVENT_TIME_COLUMNS.get(data_type)) and column in data.columns:
+            latest = data.get_column(column).cast(pl.Utf8).max()
+            previous = self.watermarks.get(data_type.value)
+            self.watermarks[data_type.value] = max(filter(None, (latest, previous)), default=None)
+
+    def commit(self) -> bool:
+        """Record the batch in the log, unless it has no rows. Return whether it was recorded."""
+        if not self.rows:
+            return False
+        entry = {
+            "batch_id": self.batch_id,
+            "created_at": datetime.now(UTC).isoformat(),
+            "path": self.path.name,
+            "rows": self.rows,
+            "watermarks": self.watermarks,
+        }
+        with open(self.directory / LOG_NAME, "a") as log:
+            log.write(json.dumps(entry) + "\n")
+        return True
+
+    def _last_entry(self) -> dict[str, Any] | None:
+        try:
+            lines = (self.directory / LOG_NAME).read_text().splitlines()
+        except FileNotFoundError:
+            return None
+        return next((json.loads(line) for line in reversed(lines) if line.strip()), None)
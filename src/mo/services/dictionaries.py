@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import polars as pl
+
+from mo.domain.data_format import DataFormat
+from mo.domain.data_types import DataType
+from mo.services.parsing import DataParsingService
+
+DICTIONARY_DIR = "dictionaries"
+# text columns whose values repeat across many rows, like the prompt of every response to an item
+DICTIONARY_COLUMNS: dict[DataType, list[str]] = {
+    DataType.RESPONSES: [
+        "prompt",
+        "user_agent",
+        "lrn_activity_reference",
+        "lrn_question_reference",
+        *(f"lrn_option_{i}" for i in range(12)),
+    ],
+    DataType.PAGE_VIEWS: ["trace"],
+    DataType.MEDIA_VIEWS: ["log_json"],
+}
+ID_SUFFIX = "_id"
+ID_TYPE = pl.UInt32
+# only the columnar formats are written normalized
+NORMALIZED_FORMATS = (DataFormat.PARQUET, DataFormat.ARROW)
+
+
+class DictionaryService:
+    """Move the repeated text values of merged tables into lookup tables, and join them back in.
+
+    A normalized `<type>.parquet` has an integer `<column>_id` column in place of each of the type's
+    dictionary columns, and `dictionaries/<type>.<column>.parquet` next to it maps the IDs to the
+    values. IDs are only ever added to a dictionary, so those in the table stay valid when more data
+    is merged into it later.
+    """
+
+    def __init__(self, parser: DataParsingService | None = None) -> None:
+        self.parser = parser or DataParsingService()
+
+    def columns(self, path: Path) -> list[str]:
+        """Return the dictionary columns of the type of the table at `path`."""
+        if self.parser.identify_format(path) not in NORMALIZED_FORMATS:
+            return []
+        return DICTIONARY_COLUMNS.get(self.parser.identify_type(path), [])
+
+    def dictionary_path(self, path: Path, column: str) -> Path:
+        data_type = self.parser.identify_type(path)
+        return path.parent / DICTIONARY_DIR / f"{data_type}.{column}{path.suffix}"
+
+    def load(self, path: Path) -> pl.LazyFrame:
+        """Lazily read a data file, with the values of a normalized table joined back in."""
+        return self.decode(self.parser.parse(path), path)
+
+    def decode(self, data: pl.LazyFrame, path: Path) -> pl.LazyFrame:
+        """Replace the dictionary IDs in `data`, as read from `path`, with their values.
+
+        The dictionaries are read right away, but the values are only looked up for the columns
+        that a query ends up using.
+        """
+        columns = self.columns(path)
+        if not columns:
+            return data
+        names = data.collect_schema().names()
+        encoded = {column + ID_SUFFIX: column for column in columns if column + ID_SUFFIX in names}
+        values = [
+            _lookup(self._read(self.dictionary_path(path, column)).collect(), id_column, column)
+            for id_column, column in encoded.items()
+        ]
+        # the values take the place of their IDs
+        return data.with_columns(values).select([encoded.get(name, name) for name in names])
+
+    def encode(
+        self, data: pl.LazyFrame, path: Path
+    ) -> tuple[pl.LazyFrame, dict[Path, pl.DataFrame]]:
+        """Return `data`, to be written to `path`, with IDs in place of its dictionary values.
+
+        The dictionaries of `path` are extended with the new values, and returned by their paths
+        to be written along with the table. `data` is scanned once per dictionary column, so it
+        should be cheap to scan, e.g. a scan of a Parquet file.
+        """
+        names = data.collect_schema().names()
+        columns = [column for column in self.columns(path) if column in names]
+        dictionaries: dict[Path, pl.DataFrame] = {}
+        ids: list[pl.Expr] = []
+        for column in columns:
+            dictionary_path = self.dictionary_path(path, column)
+            dictionary, extended = self._extend(data, dictionary_path, column)
+            if extended:
+                dictionaries[dictionary_path] = dictionary
+            ids.append(_lookup(dictionary, column, column + ID_SUFFIX))
+        encoded = data.with_columns(ids).select(
+            [name + ID_SUFFIX if name in columns else name for name in names]
+        )
+        return encoded, dictionaries
+
+    def _extend(self, data: pl.LazyFrame, path: Path, column: str) -> tuple[pl.DataFrame, bool]:
+        """Return the dictionary at `path` with the new values of `column`, and whether it grew."""
+        id_column = column + ID_SUFFIX
+        existing = (
+            self._read(path).collect()
+            if path.exists()
+            else pl.DataFrame(schema={id_column: ID_TYPE, column: pl.Utf8})
+        )
+        next_id = existing.get_column(id_column).max()
+        new = (
+            data.select(pl.col(column).cast(pl.Utf8))
+            .drop_nulls()
+            .unique(maintain_order=True)
+            .join(existing.lazy(), on=column, how="anti")
+            .with_row_index(id_column, offset=0 if next_id is None else next_id + 1)
+            .collect(streaming=True)
+        )
+        if new.is_empty() and path.exists():
+            return existing, False
+        return pl.concat([existing, new.cast({id_column: ID_TYPE})]), True
+
+    def _read(self, path: Path) -> pl.LazyFrame:
+        if self.parser.identify_format(path) is DataFormat.ARROW:
+            return pl.read_ipc(path, memory_map=True).lazy()
+        return pl.scan_parquet(path)
+
+
+def _lookup(dictionary: pl.DataFrame, source: str, target: str) -> pl.Expr:
+    """Map the values of the `source` column to the `target` column of `dictionary`."""
+    return (
+        pl.col(source)
+        .cast(dictionary.schema[source])
+        .replace_strict(
+            dictionary.get_column(source),
+            dictionary.get_column(target),
+            default=None,
+            return_dtype=dictionary.schema[target],
+        )
+        .alias(target)
+    )
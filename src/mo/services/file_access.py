@@ -0,0 +1,166 @@
+import csv
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self, TypeVar
+
+import polars as pl
+
+from mo.domain.data_format import Compression, DataFormat
+from mo.domain.file_names import FILE_NAMES
+from mo.services.compression import open_decompressed
+from mo.services.parquet_footer import column_values
+
+T = TypeVar("T")
+
+
+class FileInfoCache:
+    """Keep what was learned about files across runs, for as long as the files don't change.
+
+    Entries are keyed by path and checked against the file's size and modification time on every
+    lookup, so a file that is rewritten in place is read again. The least recently used entries
+    are dropped beyond `max_entries` (files extracted from archives get new paths every run).
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, Path], tuple[tuple[int, int], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, path: Path, compute: Callable[[], T]) -> T:
+        """Return the cached `kind` of information about `path`, computing it if needed."""
+        stat = path.stat()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        key = (kind, path)
+        with self._lock:
+            if (entry := self._entries.get(key)) and entry[0] == signature:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+class FileAccessService:
+    """Share access to data files between everything that reads them during a run.
+
+    Each file is memory-mapped at most once and its header and class IDs are cached, so probing the
+    schema reads the first line straight from the OS page cache and only the `class_id` column is
+    ever parsed while validating. Polars memory-maps files itself when given a path (handing it a
+    Python buffer would make it copy the data), so full reads still go through the path and reuse
+    the same cached pages. Compressed CSV files can't be mapped, so their header is read from the
+    first line of a streaming decompressor, and like plain files they are only decompressed in full
+    to parse their `class_id` column.
+
+    Parquet and Arrow files are answered from their metadata instead: the schema in the footer
+    (or the Arrow IPC schema) and, for Parquet files whose row groups each hold a single class,
+    the `class_id` statistics of the row groups, so no data is decoded.
+
+    Pass a `FileInfoCache` to keep headers and class IDs beyond the run, e.g. in `mo serve`.
+    """
+
+    def __init__(self, cache: FileInfoCache | None = None) -> None:
+        self.cache = cache
+        self._maps: dict[Path, mmap.mmap] = {}
+        self._headers: dict[Path, list[str]] = {}
+        self._class_ids: dict[Path, list[str]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def map(self, path: Path) -> mmap.mmap:
+        """Return a read-only memory map of the file, opening it only once per run."""
+        if path not in self._maps:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    raise pl.exceptions.NoDataError(f"empty CSV: {str(path)}")
+                self._maps[path] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[path]
+
+    def header(self, path: Path) -> list[str]:
+        """Return the column names of a data file without parsing its contents."""
+        if path not in self._headers:
+            if self.cache:
+                self._headers[path] = self.cache.get(
+                    "header", path, lambda: self._read_header(path)
+                )
+            else:
+                self._headers[path] = self._read_header(path)
+        return self._headers[path]
+
+    def class_ids(self, path: Path) -> list[str]:
+        """Return the unique, non-null class IDs in a data file, parsing only that column."""
+        if path not in self._class_ids:
+            if self.cache:
+                self._class_ids[path] = self.cache.get(
+                    "class_ids", path, lambda: self._read_class_ids(path)
+                )
+            else:
+                self._class_ids[path] = self._read_class_ids(path)
+        return self._class_ids[path]
+
+    def _read_header(self, path: Path) -> list[str]:
+        match FILE_NAMES.identify_format(path):
+            case DataFormat.PARQUET:
+                return list(pl.read_parquet_schema(path))
+            case DataFormat.ARROW:
+                return list(pl.read_ipc_schema(path))
+        if compression := Compression.from_path(path):
+            with open(path, "rb") as file:
+                stream = open_decompressed(file, compression)
+                if stream is not None:
+                    with stream:
+                        # only the blocks up to the end of the first line are decompressed
+                        first = stream.readline()
+                    return self._parse_header(first)
+            # without a zstd module, polars has to decompress the whole file
+            return pl.read_csv(path, n_rows=0).columns
+        buffer = self.map(path)
+        end = buffer.find(b"\n")
+        return self._parse_header(buffer[: end if end >= 0 else len(buffer)])
+
+    @staticmethod
+    def _parse_header(line: bytes) -> list[str]:
+        return next(csv.reader([line.decode("utf-8-sig").rstrip("\r\n")]), [])
+
+    def _read_class_ids(self, path: Path) -> list[str]:
+        match FILE_NAMES.identify_format(path):
+            case DataFormat.PARQUET:
+                if (class_ids := column_values(path, "class_id")) is not None:
+                    return class_ids
+                data = pl.scan_parquet(path)
+            case DataFormat.ARROW:
+                data = pl.read_ipc(path, columns=["class_id"], memory_map=True).lazy()
+            case _:
+                data = pl.scan_csv(path, schema_overrides={"class_id": pl.Utf8})
+        return (
+            data.select(pl.col("class_id").cast(pl.Utf8))
+            .drop_nulls()
+            .unique()
+            .collect()
+            .get_column("class_id")
+            .to_list()
+        )
+
+    def close(self) -> None:
+        for buffer in self._maps.values():
+            buffer.close()
+        self._maps.clear()
@@ -1,12 +1,21 @@
 import itertools
-import zipfile
 from collections.abc import Iterable
-from pathlib import Path
+from dataclasses import replace
+from pathlib import Path, PurePosixPath
 from typing import TypeVar, final
 
 from mo.domain.data_types import DataType
-from mo.domain.file_metadata import FileMetadata, ZipFileMetadata
+from mo.domain.file_metadata import MULTIPLE_CLASSES, FileMetadata, ZipFileMetadata
 from mo.domain.observer import Observable, ProgressEvent
+from mo.domain.shard import Shard
+from mo.services.archives import (
+    ArchiveMember,
+    ArchiveReader,
+    find_supplementary_dirs,
+    is_archive,
+)
+from mo.services.class_ids import ClassIdResolver
+from mo.services.file_index import FileIndex, IndexEntry, keep_newest
 from mo.services.parsing import DataParsingService
 from mo.services.validation import ValidationService
 
@@ -21,35 +30,49 @@ class FileDiscoveryService(Observable[ProgressEvent]):
         parser_svc: DataParsingService,
         validation_svc: ValidationService,
         extraction_dir: Path,
+        class_id_resolver: ClassIdResolver | None = None,
+        index: FileIndex | None = None,
+        shard: Shard | None = None,
     ) -> None:
         super().__init__()
         self.dirs = list(dirs)
         self.parser_svc = parser_svc
         self.validation_svc = validation_svc
         self.extraction_dir = extraction_dir
+        self.class_id_resolver = class_id_resolver
+        self.index = index or FileIndex()
+        self.shard = shard
+        self.archive_reader = ArchiveReader(extraction_dir, self.is_archive_member_of_interest)
 
     def discover(self) -> Iterable[FileMetadata]:
-        targets = list(itertools.chain.from_iterable(dir.rglob("*") for dir in self.dirs))
-        zip_targets = list(itertools.chain.from_iterable(dir.rglob("*.zip") for dir in self.dirs))
-        total_targets = len(targets) + len(zip_targets)
+        targets = self.index.walk(self.dirs)
+        total_targets = len(targets)
 
         progress = ProgressEvent(current=0, total=total_targets, message="Discovering files")
         self.notify(progress)
 
         metadatas: list[FileMetadata] = []
         supplementary_dirs: list[FileMetadata] = []
-        for path in targets:
-            self.notify(progress.advance())
-            if path.is_dir() and path.name == "supplementary":
+        archive_targets: list[IndexEntry] = []
+        for entry in targets:
+            path = entry.path
+            if entry.is_dir and path.name == "supplementary":
                 # we have to wait until we have all the file metadata to properly evaluate these
                 supplementary_dirs.append(FileMetadata(path=path, type="supplementary"))
-            elif path.is_file() and (processed := self.process_data_file(path)):
+            elif is_archive(path) and not entry.is_dir:
+                # archives are processed last, so they only advance the progress then
+                archive_targets.append(entry)
+                continue
+            elif not entry.is_dir and (
+                processed := self.process_data_file(path, size=entry.size, mtime=entry.mtime)
+            ):
                 metadatas.append(processed)
+            self.notify(progress.advance())
 
         extracted_files: list[FileMetadata] = []
-        for path in zip_targets:
+        for entry in archive_targets:
+            extracted_files.extend(self.process_archive(entry.path))
             self.notify(progress.advance())
-            extracted_files.extend(self.process_zip_file(path))
 
         return self.remove_duplicates_and_unidentifiables(
             itertools.chain(
@@ -62,58 +85,112 @@ class FileDiscoveryService(Observable[ProgressEvent]):
     def remove_duplicates_and_unidentifiables(
         self, metadatas: Iterable[FileMetadata]
     ) -> Iterable[FileMetadata]:
-        seen: set[tuple[str, str]] = set()
+        """Drop files without a class ID or outside the shard, keeping the newest type per class."""
+        shared: list[FileMetadata] = []
+        per_class: list[FileMetadata] = []
         for metadata in metadatas:
-            if metadata.type in (DataType.CLASSES, DataType.MANIFEST):
+            if metadata.multi_class:
                 # these have many class IDs not one, so we don't filter them
-                yield metadata
-                continue
+                shared.append(metadata)
+            elif metadata.class_id and (not self.shard or self.shard.contains(metadata.class_id)):
+                # everything else must belong to a class (of this worker's shard)
+                per_class.append(metadata)
+
+        newest = keep_newest(
+            per_class,
+            key=lambda metadata: (str(metadata.type), metadata.class_id),
+            mtime=lambda metadata: metadata.mtime,
+        )
+        return [*shared, *newest]
 
-            if not metadata.class_id:
-                # everything else must belong to a class
-                continue
+    def is_archive_member_of_interest(self, name: str) -> bool:
+        parts = PurePosixPath(name).parts
+        return "supplementary" in parts[:-1] or self.parser_svc.identify_type(name) is not None
 
-            key = (str(metadata.type), metadata.class_id)
-            if key not in seen:
-                seen.add(key)
-                yield metadata
-
-    def process_zip_file(self, path: Path) -> Iterable[ZipFileMetadata]:
-        metadatas: list[ZipFileMetadata] = []
-        supplementary_dirs: list[ZipFileMetadata] = []
-        with zipfile.ZipFile(path, "r") as zip_file:
-            for name in zip_file.namelist():
-                if name.endswith("supplementary/"):
-                    zip_file.extract(name, self.extraction_dir)
-                    extracted_path = self.extraction_dir / name
-                    metadata = ZipFileMetadata(
-                        path=extracted_path,
-                        type="supplementary",
-                        class_id=extracted_path.parent.name,
-                        archive_path=path.parent,
-                        member_path=name,
-                    )
-                    # we have to wait until we have all the file metadata to properly evaluate these
-                    supplementary_dirs.append(metadata)
-                elif self.parser_svc.identify_type(name):
-                    zip_file.extract(name, self.extraction_dir)
-                    extracted_path = self.extraction_dir / name
-                    if processed := self.process_data_file(extracted_path):
-                        metadata = ZipFileMetadata(
-                            **dict(processed),
-                            archive_path=path.parent,
-                            member_path=name,
-                        )
-                        metadatas.append(metadata)
+    def process_archive(self, path: Path) -> Iterable[FileMetadata]:
+        members = self.archive_reader.extract(path)
+
+        metadatas: list[FileMetadata] = []
+        for member in members:
+            if not self.parser_svc.identify_type(member.member_path):
+                continue
+            if processed := self.process_data_file(
+                member.extracted_path, size=member.size, mtime=member.mtime, member=member
+            ):
+                metadatas.append(processed)
 
-        return itertools.chain(metadatas, self.process_supplementary(supplementary_dirs, metadatas))
+        # we have to wait until we have all the file metadata to properly evaluate these
+        supplementary = [
+            ZipFileMetadata(
+                path=extracted_path,
+                type="supplementary",
+                class_id=extracted_path.parent.name,
+                archive_path=path,
+                member_path=member_path,
+            )
+            for extracted_path, member_path in find_supplementary_dirs(members).items()
+        ]
+        return itertools.chain(metadatas, self.process_supplementary(supplementary, metadatas))
 
-    def process_data_file(self, path: Path) -> FileMetadata | None:
-        if data_type := self.parser_svc.identify_type(path):
-            strategy = self.validation_svc.get_strategy(data_type)
+    def process_data_file(
+        self,
+        path: Path,
+        size: int | None = None,
+        mtime: float | None = None,
+        member: ArchiveMember | None = None,
+    ) -> FileMetadata | None:
+        if not (data_type := self.parser_svc.identify_type(path)):
+            return None
+        strategy = self.validation_svc.get_strategy(data_type)
+        resolver = self.class_id_resolver
+        resolved = resolver.resolve(path) if resolver else None
+        # a file that its folder gives to another worker's shard is parsed, since it is this
+        # shard's if the folder is wrong. `discover` drops it by the class ID it turns out to have
+        elsewhere = bool(self.shard and resolved and not self.shard.contains(resolved))
+        trusted = False
+        if resolver and resolved and not elsewhere and not resolver.needs_check():
+            is_valid, class_id = strategy.validate(path, class_id=resolved)
+            trusted = True
+        else:
             is_valid, class_id = strategy.validate(path)
-            if is_valid:
-                return FileMetadata(path=path, type=data_type, class_id=class_id)
+            if resolver and resolved and class_id != MULTIPLE_CLASSES:
+                if is_valid:
+                    parsed = [class_id] if class_id else []
+                elif strategy.validate(path, class_id=resolved)[0]:
+                    # the folder vouches for a file that isn't of one class, e.g. of several
+                    parsed = self.validation_svc.files.class_ids(path)
+                else:
+                    parsed = []
+                for unverified in resolver.check(path, resolved, parsed):
+                    self.revalidate(unverified)
+        if not is_valid:
+            return None
+
+        if member:
+            metadata: FileMetadata = ZipFileMetadata(
+                path=path,
+                type=data_type,
+                class_id=class_id,
+                size=size,
+                mtime=mtime,
+                archive_path=member.archive_path,
+                member_path=member.member_path,
+            )
+        else:
+            metadata = FileMetadata(
+                path=path, type=data_type, class_id=class_id, size=size, mtime=mtime
+            )
+        if resolver and trusted:
+            resolver.trust(metadata)
+        return metadata
+
+    def revalidate(self, metadata: FileMetadata) -> None:
+        """Replace the class ID of a file that was resolved from its folder with the parsed one."""
+        if metadata.type == "supplementary":
+            return
+        is_valid, class_id = self.validation_svc.get_strategy(metadata.type).validate(metadata.path)
+        # without a class ID the file is dropped with the other unidentifiable ones
+        metadata.class_id = class_id if is_valid else None
 
     def process_supplementary(
         self,
@@ -133,10 +210,32 @@ class FileDiscoveryService(Observable[ProgressEvent]):
             if parent in supplementary_by_parent:
                 metadata_by_parent.setdefault(parent, []).append(metadata)
 
-        # now we can evaluate whether the supplementary directories have any data files as siblings
+        # now we can evaluate whether the supplementary directories have data files of a single
+        # class as siblings, which is the class the supplementary files belong to
         for supplementary in supplementary_dirs:
-            siblings = metadata_by_parent.get(supplementary.path, [])
-            if any(sibling.type in DataType for sibling in siblings) and all(
-                sibling.class_id == supplementary.class_id for sibling in siblings
-            ):
+            siblings = metadata_by_parent.get(supplementary.path.parent, [])
+            class_ids = {
+                sibling.class_id
+                for sibling in siblings
+                if sibling.type in DataType and sibling.class_id
+            }
+            # a supplementary directory is as recent as the download it came with
+            mtime = max(
+                (sibling.mtime for sibling in siblings if sibling.mtime is not None),
+                default=None,
+            )
+            if class_ids == {MULTIPLE_CLASSES}:
+                # next to merged data (an earlier `mo compress` output), there is a directory per
+                # class inside the supplementary directory
+                for entry in self.index.walk([supplementary.path]):
+                    if entry.is_dir and entry.path.parent == supplementary.path:
+                        per_class = replace(
+                            supplementary, path=entry.path, class_id=entry.path.name, mtime=mtime
+                        )
+                        if isinstance(per_class, ZipFileMetadata):
+                            per_class.member_path = f"{per_class.member_path}/{entry.path.name}"
+                        yield per_class
+            elif len(class_ids) == 1 and supplementary.class_id in (None, *class_ids):
+                supplementary.class_id = class_ids.pop()
+                supplementary.mtime = mtime
                 yield supplementary
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import threading
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from stat import S_ISDIR
+from typing import TypeVar
+
+from mo.domain.io_backend import IoBackend, run_io
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True, frozen=True)
+class IndexEntry:
+    path: Path
+    is_dir: bool
+    size: int
+    mtime: float
+
+
+class FileIndex:
+    """Record the size and modification time of every path under a set of directories.
+
+    Each directory is walked once with `os.scandir`, which gets the entry types from the
+    directory listing itself, so each file costs a single `stat()` and nothing downstream has to
+    stat it again. Walking the same directory again returns the recorded entries.
+
+    The index is also the stat cache of a run: `get` answers from the walks where it can (a path
+    missing from a walked directory does not exist) and stats any other path at most once.
+    Actions that create, move or delete a path `invalidate` it, after which it and everything
+    under it are looked up again.
+
+    With the `async` I/O backend, the directory listings and stats are issued concurrently instead
+    of one after the other, which is much faster on high-latency (network) file systems.
+    """
+
+    def __init__(self, io_backend: IoBackend = IoBackend.SYNC, concurrency: int = 32) -> None:
+        self.io_backend = io_backend
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        # every record carries the generation it was made in; a record is stale when the path or
+        # one of its parents was invalidated in a later generation
+        self._generation = 0
+        self._entries: dict[Path, tuple[IndexEntry | None, int]] = {}
+        self._listed: dict[Path, int] = {}
+        # keyed by the paths' strings, see `_lineage`
+        self._invalidated: dict[str, int] = {}
+        self._walks: dict[str, list[IndexEntry]] = {}
+
+    def walk(self, dirs: Iterable[Path]) -> list[IndexEntry]:
+        """Index everything under `dirs` (like `rglob("*")`, without following symlinked dirs).
+
+        Paths in `dirs` that are files are indexed as themselves.
+        """
+        dirs = list(dirs)
+        todo = list(dict.fromkeys(dir for dir in dirs if str(dir) not in self._walks))
+        if todo and self.io_backend is IoBackend.ASYNC:
+            walked = run_io(self._walk_all_async(todo), self.concurrency)
+        else:
+            walked = [
+                list(self._walk(dir)) if self.stat(dir).is_dir else [self.stat(dir)] for dir in todo
+            ]
+        self._walks.update(zip(map(str, todo), walked, strict=True))
+        return [entry for dir in dirs for entry in self._walks[str(dir)]]
+
+    def _walk(self, dir: Path) -> Iterator[IndexEntry]:
+        stack = [dir]
+        while stack:
+            current = stack.pop()
+            generation = self._generation
+            with os.scandir(current) as it:
+                for dir_entry in it:
+                    if indexed := self._index(dir_entry, generation):
+                        entry, recurse = indexed
+                        yield entry
+                        if recurse:
+                            stack.append(entry.path)
+            self._listed[current] = generation
+
+    async def _walk_all_async(self, dirs: list[Path]) -> list[list[IndexEntry]]:
+        return await asyncio.gather(*(self._walk_async(dir) for dir in dirs))
+
+    async def _walk_async(self, dir: Path) -> list[IndexEntry]:
+        # every directory listing and every stat is a separate blocking call, so they are all
+        # issued at once and the thread pool of `run_io` bounds how many are in flight
+        root = await asyncio.to_thread(self.stat, dir)
+        if not root.is_dir:
+            return [root]
+
+        entries: list[IndexEntry] = []
+
+        async def visit(dir: Path) -> None:
+            generation = self._generation
+            dir_entries = await asyncio.to_thread(_list_dir, dir)
+            indexed = await asyncio.gather(
+                *(
+                    asyncio.to_thread(self._index, dir_entry, generation)
+                    for dir_entry in dir_entries
+                )
+            )
+            self._listed[dir] = generation
+            subdirs: list[Path] = []
+            for item in indexed:
+                if item:
+                    entry, recurse = item
+                    entries.append(entry)
+                    if recurse:
+                        subdirs.append(entry.path)
+            await asyncio.gather(*(visit(subdir) for subdir in subdirs))
+
+        await visit(dir)
+        return entries
+
+    def _index(
+        self, dir_entry: os.DirEntry[str], generation: int
+    ) -> tuple[IndexEntry, bool] | None:
+        """Index a directory entry, returning it and whether the walk should descend into it."""
+        try:
+            stat = dir_entry.stat()
+        except OSError:
+            # broken symlinks and files removed while walking
+            return None
+        is_dir = dir_entry.is_dir()
+        entry = IndexEntry(
+            path=Path(dir_entry.path), is_dir=is_dir, size=stat.st_size, mtime=stat.st_mtime
+        )
+        self._entries[entry.path] = (entry, generation)
+        return entry, is_dir and not dir_entry.is_symlink()
+
+    def get(self, path: Path) -> IndexEntry | None:
+        """Return the entry for `path`, or None if it does not exist, stat-ing it at most once."""
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and not self._stale(path, cached[1]):
+                return cached[0]
+            if cached is None:
+                listed = self._listed.get(path.parent)
+                if listed is not None and not self._stale(path, listed):
+                    return None
+                if self._known_missing(path.parent):
+                    return None
+            generation = self._generation
+
+        try:
+            stat = os.stat(path)
+            entry = IndexEntry(
+                path=path,
+                is_dir=S_ISDIR(stat.st_mode),
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+            )
+        except (FileNotFoundError, NotADirectoryError):
+            entry = None
+        with self._lock:
+            self._entries[path] = (entry, generation)
+        return entry
+
+    def stat(self, path: Path) -> IndexEntry:
+        """Return the entry for `path` like `get`, but raise if it does not exist."""
+        if (entry := self.get(path)) is None:
+            raise FileNotFoundError(f"No such file or directory: {str(path)}")
+        return entry
+
+    def exists(self, path: Path) -> bool:
+        return self.get(path) is not None
+
+    def invalidate(self, path: Path) -> None:
+        """Forget what is known about `path` and everything under it, e.g. after moving it."""
+        with self._lock:
+            self._invalidate(path)
+
+    def make_dir(self, path: Path) -> None:
+        """Create `path` and its parents, recording that a newly created directory is empty."""
+        if self.exists(path):
+            return
+        try:
+            path.mkdir(parents=True)
+        except FileExistsError:
+            # created by someone else in the meantime
+            self.invalidate(path)
+            return
+        with self._lock:
+            self._invalidate(path)
+            # parents that were missing were created too
+            for parent in path.parents:
+                if not self._known_missing(parent):
+                    break
+                self._invalidate(parent)
+            self._listed[path] = self._generation
+
+    def _invalidate(self, path: Path) -> None:
+        self._generation += 1
+        self._invalidated[str(path)] = self._generation
+        # a record that is always stale, so that the path is not assumed to be missing because it
+        # was missing from its parent's listing
+        self._entries[path] = (None, -1)
+        # walks that saw the path are out of date now; they were rooted at it or one of its parents
+        if self._walks:
+            for root in _lineage(str(path)):
+                self._walks.pop(root, None)
+
+    def _known_missing(self, path: Path) -> bool:
+        cached = self._entries.get(path)
+        return cached is not None and cached[0] is None and not self._stale(path, cached[1])
+
+    def _stale(self, path: Path, generation: int) -> bool:
+        if generation >= self._generation:
+            # nothing was invalidated since the record was made
+            return False
+        return any(self._invalidated.get(p, -1) > generation for p in _lineage(str(path)))
+
+
+def _lineage(path: str) -> Iterator[str]:
+    """Yield `path` and its parents, which is much cheaper on strings than with `Path.parents`."""
+    while True:
+        yield path
+        parent = os.path.dirname(path) or "."
+        if parent == path:
+            return
+        path = parent
+
+
+def _list_dir(dir: Path) -> list[os.DirEntry[str]]:
+    with os.scandir(dir) as it:
+        return list(it)
+
+
+def keep_newest(
+    items: Iterable[T], key: Callable[[T], Hashable], mtime: Callable[[T], float | None]
+) -> list[T]:
+    """Keep the most recently modified item for each key, in order of each key's first appearance.
+
+    Items without a modification time lose to any item that has one, and ties keep the item seen
+    first.
+    """
+    newest: dict[Hashable, tuple[float, T]] = {}
+    for item in items:
+        k = key(item)
+        item_mtime = mtime(item)
+        item_mtime = float("-inf") if item_mtime is None else item_mtime
+        if k not in newest or item_mtime > newest[k][0]:
+            newest[k] = (item_mtime, item)
+    return [item for _, item in newest.values()]
@@ -0,0 +1,202 @@
+import json
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+
+from mo.services.parsing import DataParsingService
+
+KEY_FILTER_DIR = "key_filters"
+# the filter is sized for this many times the rows of the table it's built for, so that merges
+# can add rows to it for a while before it has to be built again
+GROWTH = 2
+MIN_CAPACITY = 1 << 16
+WORD_BITS = 64
+# word with only bit i set, by i
+_MASKS = pl.Series([1 << i for i in range(WORD_BITS)], dtype=pl.UInt64)
+
+
+@dataclass(frozen=True, slots=True)
+class KeyFilterSettings:
+    # the rate of keys that aren't in a table, but that its filter can't rule out
+    false_positive_rate: float = 0.01
+    # the most memory a filter may use, at the cost of a higher false positive rate
+    max_bytes: int | None = None
+
+    def __post_init__(self) -> None:
+        if not 0 < self.false_positive_rate < 1:
+            raise ValueError(
+                f"False positive rate must be between 0 and 1: {self.false_positive_rate}"
+            )
+        if self.max_bytes is not None and self.max_bytes < WORD_BITS // 8:
+            raise ValueError(f"Key filters need at least {WORD_BITS // 8} bytes: {self.max_bytes}")
+
+
+@dataclass(slots=True, kw_only=True)
+class KeyFilter:
+    """A Bloom filter over the unique keys of a merged table.
+
+    A key that `might_contain` rules out is certainly not in the table, so only the rows it can't
+    rule out have to be compared with the table itself. Each key sets `hashes` bits, found by
+    double hashing the key's values as text.
+    """
+
+    keys: list[str]
+    words: pl.Series
+    hashes: int
+    capacity: int
+    count: int
+    settings: KeyFilterSettings
+    # polars' hashes may change between its versions, which would make the bits meaningless
+    polars_version: str = pl.__version__
+
+    @classmethod
+    def create(cls, keys: list[str], capacity: int, settings: KeyFilterSettings) -> "KeyFilter":
+        bits = math.ceil(-capacity * math.log(settings.false_positive_rate) / math.log(2) ** 2)
+        if settings.max_bytes is not None:
+            bits = min(bits, settings.max_bytes * 8)
+        words = max(1, bits // WORD_BITS)
+        hashes = max(1, round(words * WORD_BITS / capacity * math.log(2)))
+        return cls(
+            keys=keys,
+            words=pl.Series("words", [0] * words, dtype=pl.UInt64),
+            hashes=hashes,
+            capacity=capacity,
+            count=0,
+            settings=settings,
+        )
+
+    @property
+    def bits(self) -> int:
+        return len(self.words) * WORD_BITS
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Return the expected false positive rate with the keys added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def might_contain(self) -> pl.Expr:
+        """Return an expression that is false for the rows whose keys were never added."""
+        words = pl.lit(self.words)
+        masks = pl.lit(_MASKS)
+        return pl.all_horizontal(
+            (words.gather(bit // WORD_BITS) & masks.gather(bit % WORD_BITS)) != 0
+            for bit in self._bits()
+        )
+
+    def add(self, data: pl.LazyFrame) -> None:
+        """Add the keys of the rows of `data`, which are expected to be unique."""
+        bits = (
+            data.select(pl.concat_list(self._bits()).alias("bit"))
+            .explode("bit")
+            .unique()
+            .select(
+                (pl.col("bit") // WORD_BITS).alias("word"),
+                pl.lit(_MASKS).gather(pl.col("bit") % WORD_BITS).alias("mask"),
+            )
+            # the bits of a word are distinct powers of two, so their sum sets them all
+            .group_by("word")
+            .agg(pl.col("mask").sum())
+            .collect(streaming=True)
+        )
+        index = bits.get_column("word")
+        self.words = self.words.scatter(index, self.words.gather(index) | bits.get_column("mask"))
+        self.count += data.select(pl.len()).collect().item()
+
+    def _bits(self) -> list[pl.Expr]:
+        values = pl.struct(pl.col(key).cast(pl.Utf8) for key in self.keys)
+        first, second = (values.hash(seed) % self.bits for seed in (0, 1))
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+
+class KeyFilterService:
+    """Read and write the key filters of merged tables.
+
+    The filter of `<type>.parquet` is `key_filters/<type>.bloom.parquet` next to it, with its
+    settings in `key_filters/<type>.bloom.json`. A filter is only used while it still suits the
+    table: when it holds more keys than it was sized for, or its keys, settings or polars version
+    changed, it is built again from the whole table. Whatever writes the table without updating
+    its filter removes it, as it would lack the keys of the new rows.
+    """
+
+    def __init__(
+        self, parser: DataParsingService | None = None, settings: KeyFilterSettings | None = None
+    ) -> None:
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.parser = parser or DataParsingService()
+        self.settings = settings or KeyFilterSettings()
+
+    def filter_path(self, path: Path) -> Path:
+        data_type = self.parser.identify_type(path)
+        return path.parent / KEY_FILTER_DIR / f"{data_type}.bloom.parquet"
+
+    def load(self, path: Path, keys: list[str]) -> KeyFilter | None:
+        """Return the filter of the table at `path`, unless it is missing or has to be rebuilt."""
+        filter_path = self.filter_path(path)
+        try:
+            params = json.loads(filter_path.with_suffix(".json").read_text())
+        except FileNotFoundError:
+            return None
+        key_filter = KeyFilter(
+            keys=params["keys"],
+            words=pl.read_parquet(filter_path).get_column("words"),
+            hashes=params["hashes"],
+            capacity=params["capacity"],
+            count=params["count"],
+            settings=KeyFilterSettings(**params["settings"]),
+            polars_version=params["polars_version"],
+        )
+        if key_filter.count > key_filter.capacity:
+            reason = f"holds more than the {key_filter.capacity} keys it was sized for"
+        elif key_filter.keys != keys:
+            reason = "is over different keys"
+        elif key_filter.settings != self.settings:
+            reason = "has different settings"
+        elif key_filter.polars_version != pl.__version__:
+            reason = f"was built with polars {key_filter.polars_version}"
+        else:
+            return key_filter
+        self.log.info(f"Rebuilding the key filter of {str(path)}, which {reason}")
+        return None
+
+    def build(self, data: pl.LazyFrame, keys: list[str]) -> KeyFilter:
+        """Return a new filter with the keys of `data`, the unique rows of a table."""
+        rows = data.select(pl.len()).collect().item()
+        key_filter = KeyFilter.create(keys, max(rows * GROWTH, MIN_CAPACITY), self.settings)
+        key_filter.add(data)
+        return key_filter
+
+    def write(self, path: Path, key_filter: KeyFilter) -> None:
+        filter_path = self.filter_path(path)
+        params_path = filter_path.with_suffix(".json")
+        filter_path.parent.mkdir(parents=True, exist_ok=True)
+        params = {
+            "keys": key_filter.keys,
+            "hashes": key_filter.hashes,
+            "capacity": key_filter.capacity,
+            "count": key_filter.count,
+            "settings": {
+                "false_positive_rate": key_filter.settings.false_positive_rate,
+                "max_bytes": key_filter.settings.max_bytes,
+            },
+            "polars_version": key_filter.polars_version,
+            "expected_false_positive_rate": key_filter.false_positive_rate,
+        }
+        partial_filter = filter_path.with_name(f".{filter_path.name}.partial")
+        partial_params = params_path.with_name(f".{params_path.name}.partial")
+        pl.DataFrame({"words": key_filter.words}).write_parquet(partial_filter)
+        partial_params.write_text(json.dumps(params, indent=2))
+        # without its settings the filter counts as missing, so a run that fails between the two
+        # replacements builds it again rather than reading bits that don't match the settings
+        params_path.unlink(missing_ok=True)
+        partial_filter.replace(filter_path)
+        partial_params.replace(params_path)
+
+    def remove(self, path: Path) -> None:
+        """Delete the filter of the table at `path`, if it has one."""
+        filter_path = self.filter_path(path)
+        # the settings go first, so that a filter is never read without all of its bits
+        filter_path.with_suffix(".json").unlink(missing_ok=True)
+        filter_path.unlink(missing_ok=True)
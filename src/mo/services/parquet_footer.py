@@ -0,0 +1,149 @@
+"""Read what a Parquet file's footer says about a column, without decoding any of its data.
+
+The footer is a Thrift struct (`FileMetaData`) in the compact protocol. Only a handful of its fields
+are needed here, so it is decoded generically into nested dicts keyed by field ID, lists, and
+scalars, and the fields are picked out by their IDs in the Parquet format specification.
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Any
+
+MAGIC = b"PAR1"
+
+# FileMetaData.row_groups, RowGroup.columns, ColumnChunk.meta_data, ColumnMetaData.path_in_schema,
+# ColumnMetaData.num_values, ColumnMetaData.statistics, Statistics.null_count/max_value/min_value/
+# is_max_value_exact/is_min_value_exact
+ROW_GROUPS = 4
+COLUMNS = 1
+META_DATA = 3
+PATH_IN_SCHEMA = 3
+NUM_VALUES = 5
+STATISTICS = 12
+NULL_COUNT = 3
+MAX_VALUE = 5
+MIN_VALUE = 6
+IS_MAX_VALUE_EXACT = 7
+IS_MIN_VALUE_EXACT = 8
+
+# compact protocol types
+BOOL_TRUE, BOOL_FALSE, BYTE, I16, I32, I64, DOUBLE, BINARY, LIST, SET, MAP, STRUCT = range(1, 13)
+
+
+def read_footer(path: Path) -> dict[int, Any]:
+    """Return the decoded `FileMetaData` of a Parquet file."""
+    with open(path, "rb") as file:
+        file.seek(-8, os.SEEK_END)
+        length_and_magic = file.read(8)
+        if length_and_magic[4:] != MAGIC:
+            raise ValueError(f"Not a Parquet file: {str(path)}")
+        (length,) = struct.unpack("<I", length_and_magic[:4])
+        file.seek(-8 - length, os.SEEK_END)
+        return _CompactReader(file.read(length)).read_struct()
+
+
+def column_values(path: Path, column: str) -> list[str] | None:
+    """Return the distinct values of a string column if the statistics alone determine them.
+
+    That is the case when every row group holds a single value (its exact minimum equals its
+    exact maximum), as in files written per class or sorted by the column. Otherwise, and when a
+    row group has no statistics for the column, None is returned and the column has to be read.
+    """
+    values: set[str] = set()
+    for row_group in read_footer(path).get(ROW_GROUPS, []):
+        chunk = next(
+            (
+                chunk[META_DATA]
+                for chunk in row_group.get(COLUMNS, [])
+                if META_DATA in chunk
+                and [part.decode() for part in chunk[META_DATA][PATH_IN_SCHEMA]] == [column]
+            ),
+            None,
+        )
+        if chunk is None:
+            return None
+        statistics = chunk.get(STATISTICS, {})
+        minimum, maximum = statistics.get(MIN_VALUE), statistics.get(MAX_VALUE)
+        if minimum is None or maximum is None:
+            # a row group of nulls only has nothing to add; anything else is unknown
+            if statistics.get(NULL_COUNT, -1) == chunk.get(NUM_VALUES):
+                continue
+            return None
+        exact = statistics.get(IS_MIN_VALUE_EXACT, True) and statistics.get(
+            IS_MAX_VALUE_EXACT, True
+        )
+        if minimum != maximum or not exact:
+            return None
+        values.add(minimum.decode())
+    return sorted(values)
+
+
+class _CompactReader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+
+    def read_struct(self) -> dict[int, Any]:
+        fields: dict[int, Any] = {}
+        field_id = 0
+        while True:
+            header = self._byte()
+            if header == 0:
+                return fields
+            delta, field_type = header >> 4, header & 0x0F
+            field_id = field_id + delta if delta else _zigzag(self._varint())
+            fields[field_id] = self._value(field_type)
+
+    def _value(self, field_type: int) -> Any:
+        if field_type in (BOOL_TRUE, BOOL_FALSE):
+            # in struct fields, the type is the value
+            return field_type == BOOL_TRUE
+        if field_type == BYTE:
+            return struct.unpack("<b", self._bytes(1))[0]
+        if field_type in (I16, I32, I64):
+            return _zigzag(self._varint())
+        if field_type == DOUBLE:
+            return struct.unpack("<d", self._bytes(8))[0]
+        if field_type == BINARY:
+            return self._bytes(self._varint())
+        if field_type in (LIST, SET):
+            header = self._byte()
+            size, element_type = header >> 4, header & 0x0F
+            if size == 15:
+                size = self._varint()
+            if element_type in (BOOL_TRUE, BOOL_FALSE):
+                return [self._byte() == BOOL_TRUE for _ in range(size)]
+            return [self._value(element_type) for _ in range(size)]
+        if field_type == MAP:
+            size = self._varint()
+            if not size:
+                return {}
+            types = self._byte()
+            return {self._value(types >> 4): self._value(types & 0x0F) for _ in range(size)}
+        if field_type == STRUCT:
+            return self.read_struct()
+        raise ValueError(f"Unknown Thrift compact type: {field_type}")
+
+    def _byte(self) -> int:
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def _bytes(self, size: int) -> bytes:
+        value = self.data[self.position : self.position + size]
+        self.position += size
+        return value
+
+    def _varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self._byte()
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
@@ -1,13 +1,16 @@
-from itertools import chain
 from pathlib import Path
 
 import polars as pl
 
 from mo.domain.data_format import DataFormat
 from mo.domain.data_types import LEGACY_SCHEMAS, SCHEMAS, DataType, LegacyDataType, SchemaDict
+from mo.domain.file_names import FILE_NAMES, FileNameTable
 
 
 class DataParsingService:
+    def __init__(self, names: FileNameTable | None = None) -> None:
+        self.names = names or FILE_NAMES
+
     def parse(self, file_path: Path) -> pl.LazyFrame:
         data_type = self.identify_type(file_path)
         if not data_type:
@@ -20,19 +23,19 @@ class DataParsingService:
         match data_format:
             case DataFormat.PARQUET:
                 return pl.scan_parquet(file_path)
+            case DataFormat.ARROW:
+                # a memory-mapped read is zero-copy for uncompressed files and, unlike scan_ipc,
+                # can be used in the streaming engine
+                return pl.read_ipc(file_path, memory_map=True).lazy()
             case DataFormat.CSV:
                 schema = self.get_schema(data_type)
                 return pl.scan_csv(file_path, schema_overrides=schema)
 
     def identify_type(self, path: Path | str) -> DataType | LegacyDataType | None:
-        for data_type in chain(DataType, LegacyDataType):
-            if Path(path).stem.lower() == data_type.value.lower():
-                return data_type
-
-    def identify_format(self, path: Path) -> DataFormat | None:
-        for data_format in DataFormat:
-            if path.suffix.lower() == f".{data_format}".lower():
-                return data_format
+        return self.names.identify_type(path)
+
+    def identify_format(self, path: Path | str) -> DataFormat | None:
+        return self.names.identify_format(path)
 
     def get_schema(self, data_type: DataType | LegacyDataType) -> SchemaDict:
         if schema := (
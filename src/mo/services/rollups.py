@@ -0,0 +1,110 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import polars as pl
+
+from mo.domain.data_format import DataFormat
+from mo.domain.data_types import DataType
+from mo.services.parsing import DataParsingService
+
+ROLLUP_SUFFIX = "_rollup"
+ROLLUP_KEYS = ["class_id", "student_id", "chapter", "page"]
+
+
+def _any(*columns: str) -> pl.Expr:
+    # unlike any_horizontal on its own, a missing side is false, the same as any() of no rows
+    return pl.any_horizontal(pl.col(column).fill_null(False) for column in columns)
+
+
+# how two partial aggregates of the same key are combined; each ignores a missing side
+SUM = pl.sum_horizontal
+MAX = pl.max_horizontal
+ANY = _any
+# rollup column -> (its aggregate over rows, how two of its aggregates are combined)
+ROLLUP_COLUMNS: dict[DataType, dict[str, tuple[pl.Expr, Callable[..., pl.Expr]]]] = {
+    DataType.RESPONSES: {
+        "responses": (pl.len().cast(pl.Int64), SUM),
+        "max_attempt": (pl.col("attempt").max(), MAX),
+        "points_earned": (pl.col("points_earned").sum(), SUM),
+        "points_possible": (pl.col("points_possible").sum(), SUM),
+        "completes_page": (pl.col("completes_page").any(), ANY),
+        "last_submitted": (pl.col("dt_submitted").max(), MAX),
+    },
+    DataType.PAGE_VIEWS: {
+        "page_views": (pl.len().cast(pl.Int64), SUM),
+        "engaged": (pl.col("engaged").sum(), SUM),
+        "idle_brief": (pl.col("idle_brief").sum(), SUM),
+        "idle_long": (pl.col("idle_long").sum(), SUM),
+        "off_page_brief": (pl.col("off_page_brief").sum(), SUM),
+        "off_page_long": (pl.col("off_page_long").sum(), SUM),
+        "was_complete": (pl.col("was_complete").any(), ANY),
+        "last_accessed": (pl.col("dt_accessed").max(), MAX),
+    },
+}
+
+
+class RollupService:
+    """Keep per class, student, chapter and page aggregates of merged tables up to date.
+
+    The rollup of `<type>.parquet` is `<type>_rollup.parquet` next to it. Every aggregate can be
+    combined with another one of the same key (sums are added, maximums compared), so a rollup is
+    updated from only the rows that a merge added, instead of from the whole table.
+    """
+
+    def __init__(self, parser: DataParsingService | None = None) -> None:
+        self.parser = parser or DataParsingService()
+
+    def supports(self, path: Path) -> bool:
+        """Return whether the table at `path` is of a type with a rollup."""
+        return self.parser.identify_type(path) in ROLLUP_COLUMNS
+
+    def rollup_path(self, path: Path) -> Path:
+        data_type = self.parser.identify_type(path)
+        # rollups of tables that aren't columnar are still written as Parquet
+        suffix = path.suffix if path.suffix == ".arrow" else ".parquet"
+        return path.with_name(f"{data_type}{ROLLUP_SUFFIX}{suffix}")
+
+    def aggregate(self, data: pl.LazyFrame, path: Path) -> pl.LazyFrame:
+        """Return the rollup of `data`, the rows of the table at `path`."""
+        names = data.collect_schema().names()
+        aggregates = [
+            expr.alias(column)
+            for column, (expr, _) in ROLLUP_COLUMNS[self.parser.identify_type(path)].items()
+            # exports from before a column existed lack it
+            if all(name in names for name in expr.meta.root_names())
+        ]
+        keys = [pl.col(key).cast(pl.Utf8) for key in ROLLUP_KEYS if key in names]
+        return data.group_by(keys).agg(aggregates)
+
+    def update(self, path: Path, data: pl.LazyFrame, added: pl.LazyFrame) -> pl.LazyFrame:
+        """Return the rollup of the table at `path` with the `added` rows aggregated into it.
+
+        `data` is every row of the table, which a missing rollup, e.g. of a table that was merged
+        without one, is built from instead.
+        """
+        rollup_path = self.rollup_path(path)
+        if not rollup_path.exists():
+            return self.aggregate(data, path)
+        new = self.aggregate(added, path)
+        existing = self.read(rollup_path)
+        keys = [key for key in ROLLUP_KEYS if key in new.collect_schema().names()]
+        combined = existing.join(
+            new, on=keys, how="full", coalesce=True, join_nulls=True, suffix="_added"
+        )
+        names = combined.collect_schema().names()
+        columns = ROLLUP_COLUMNS[self.parser.identify_type(path)]
+        return combined.select(
+            *keys,
+            *(
+                columns[name][1](name, f"{name}_added").alias(name)
+                if f"{name}_added" in names
+                else pl.col(name)
+                for name in names
+                if name not in keys and not name.endswith("_added")
+            ),
+        )
+
+    def read(self, path: Path) -> pl.LazyFrame:
+        if self.parser.identify_format(path) is DataFormat.ARROW:
+            return pl.read_ipc(path, memory_map=True).lazy()
+        return pl.scan_parquet(path)
@@ -3,37 +3,54 @@ from pathlib import Path
 
 import polars as pl
 
+from mo.domain.data_format import DataFormat
 from mo.domain.data_types import DataType, LegacyDataType
+from mo.domain.file_metadata import MULTIPLE_CLASSES
+from mo.services.file_access import FileAccessService
 from mo.services.parsing import DataParsingService
 
 ValidationResult = tuple[bool, str | None]
 
+# formats that can hold the data of several classes in one valid file
+MULTI_CLASS_FORMATS = (DataFormat.PARQUET, DataFormat.ARROW)
+
 
 class ValidationStrategy(ABC):
     @abstractmethod
-    def validate(self, file_path: Path) -> ValidationResult:
+    def validate(self, file_path: Path, class_id: str | None = None) -> ValidationResult:
         """
         Validate the file at the given path, ensuring it is an appropriate file to process.
 
         Args:
             file_path (Path): The path to the file to be validated.
+            class_id (str | None): The class ID of the data if it is already known (e.g. from the
+                folder it is in), in which case it is trusted instead of parsed from the file.
 
         Returns:
             ValidationResult: A tuple containing a boolean indicating whether the file is
             valid and a string representing the class ID of the data if it is valid and not empty.
+            Parquet and Arrow files with the data of several classes are valid and have the class
+            ID `MULTIPLE_CLASSES`.
         """
 
 
 class ValidationService:
-    def __init__(self):
+    def __init__(self, files: FileAccessService | None = None):
+        self.files = files or FileAccessService()
         self.strategies: dict[DataType | LegacyDataType, ValidationStrategy] = {
-            DataType.RESPONSES: InteractionDataValidationStrategy(DataType.RESPONSES),
-            DataType.PAGE_VIEWS: InteractionDataValidationStrategy(DataType.PAGE_VIEWS),
-            DataType.MEDIA_VIEWS: InteractionDataValidationStrategy(DataType.MEDIA_VIEWS),
-            DataType.CLASSES: BasicValidationStrategy(DataType.CLASSES),
-            DataType.MANIFEST: BasicValidationStrategy(DataType.MANIFEST),
-            LegacyDataType.ITEMS: BasicValidationStrategy(LegacyDataType.ITEMS),
-            LegacyDataType.TAGS: BasicValidationStrategy(LegacyDataType.TAGS),
+            DataType.RESPONSES: InteractionDataValidationStrategy(
+                DataType.RESPONSES, files=self.files
+            ),
+            DataType.PAGE_VIEWS: InteractionDataValidationStrategy(
+                DataType.PAGE_VIEWS, files=self.files
+            ),
+            DataType.MEDIA_VIEWS: InteractionDataValidationStrategy(
+                DataType.MEDIA_VIEWS, files=self.files
+            ),
+            DataType.CLASSES: BasicValidationStrategy(DataType.CLASSES, files=self.files),
+            DataType.MANIFEST: BasicValidationStrategy(DataType.MANIFEST, files=self.files),
+            LegacyDataType.ITEMS: BasicValidationStrategy(LegacyDataType.ITEMS, files=self.files),
+            LegacyDataType.TAGS: BasicValidationStrategy(LegacyDataType.TAGS, files=self.files),
         }
 
     def get_strategy(self, data_type: DataType | LegacyDataType) -> ValidationStrategy:
@@ -44,7 +61,7 @@ class ValidationService:
 
 class FastValidationService(ValidationService):
     def get_strategy(self, data_type: DataType | LegacyDataType) -> ValidationStrategy:
-        return FastValidationStrategy(data_type=data_type)
+        return FastValidationStrategy(data_type=data_type, files=self.files)
 
 
 class BasicValidationStrategy(ValidationStrategy):
@@ -52,38 +69,41 @@ class BasicValidationStrategy(ValidationStrategy):
         self,
         data_type: DataType | LegacyDataType,
         parser: DataParsingService | None = None,
+        files: FileAccessService | None = None,
     ) -> None:
         self.parser = parser or DataParsingService()
+        self.files = files or FileAccessService()
         self.schema = self.parser.get_schema(data_type)
-        self._df: pl.LazyFrame | None = None
 
-    def validate(self, file_path: Path) -> ValidationResult:
+    def validate(self, file_path: Path, class_id: str | None = None) -> ValidationResult:
         try:
-            self._df = pl.scan_csv(file_path, schema_overrides=self.schema)
-            collected_schema = self._df.collect_schema()
+            columns = self.files.header(file_path)
         except Exception:
             return False, None
 
-        if all(column in self.schema for column in collected_schema):
+        if columns and all(column in self.schema for column in columns):
             return True, None
 
         return False, None
 
 
 class InteractionDataValidationStrategy(BasicValidationStrategy):
-    def validate(self, file_path: Path) -> ValidationResult:
+    def validate(self, file_path: Path, class_id: str | None = None) -> ValidationResult:
         try:
-            valid, class_id = super().validate(file_path)
-            if not valid or self._df is None:
-                return valid, class_id
-
-            # Ensure single unique class_id
-            class_ids = self._df.select("class_id").drop_nulls().unique().collect()
-            if len(class_ids) != 1:
+            valid, _ = super().validate(file_path)
+            if not valid or "class_id" not in self.files.header(file_path):
                 return False, None
 
-            class_id = class_ids.get_column("class_id").cast(str)[0]
-            return True, class_id
+            if class_id is not None:
+                return True, class_id
+
+            # Ensure single unique class_id, unless the format is meant to hold several
+            class_ids = self.files.class_ids(file_path)
+            if len(class_ids) == 1:
+                return True, class_ids[0]
+            if len(class_ids) > 1 and self.parser.identify_format(file_path) in MULTI_CLASS_FORMATS:
+                return True, MULTIPLE_CLASSES
+            return False, None
         except pl.exceptions.NoDataError:
             return True, None  # Empty file is considered valid
 
@@ -93,12 +113,23 @@ class FastValidationStrategy(ValidationStrategy):
         self,
         data_type: DataType | LegacyDataType,
         parser: DataParsingService | None = None,
+        files: FileAccessService | None = None,
     ) -> None:
         self.parser = parser or DataParsingService()
+        self.files = files or FileAccessService()
         self.schema = self.parser.get_schema(data_type)
 
-    def validate(self, file_path: Path) -> ValidationResult:
+    def validate(self, file_path: Path, class_id: str | None = None) -> ValidationResult:
+        if class_id is not None:
+            return True, class_id
         try:
+            if self.parser.identify_format(file_path) in MULTI_CLASS_FORMATS:
+                # the first class ID is not enough to tell a single class from a merged store,
+                # but the metadata usually is, and reading one column is cheap otherwise
+                class_ids = self.files.class_ids(file_path)
+                if not class_ids:
+                    return False, None
+                return True, class_ids[0] if len(class_ids) == 1 else MULTIPLE_CLASSES
             return True, (
                 pl.scan_csv(file_path, schema_overrides=self.schema)
                 .select("class_id")
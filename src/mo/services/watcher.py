@@ -0,0 +1,195 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from mo.services.file_index import FileIndex
+
+# partially written files: browser downloads, editors, and mo's own `.partial` outputs
+PARTIAL_SUFFIXES = (".part", ".partial", ".crdownload", ".download", ".tmp")
+
+
+def is_partial(path: Path) -> bool:
+    return path.name.startswith(".") or path.name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+class Watcher(ABC):
+    """Report the files that are created or changed under a set of directories, or themselves."""
+
+    def __init__(self, dirs: Iterable[Path], ignore: Callable[[Path], bool] | None = None) -> None:
+        self.dirs = list(dirs)
+        self.ignore = ignore or (lambda path: False)
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    @abstractmethod
+    def poll(self, timeout: float) -> set[Path]:
+        """Wait up to `timeout` seconds and return the files that changed in the meantime."""
+
+    def close(self) -> None:
+        return
+
+    def _accept(self, path: Path) -> bool:
+        return not is_partial(path) and not self.ignore(path)
+
+
+class PollingWatcher(Watcher):
+    """Detect changes by comparing the size and modification time of every file between walks."""
+
+    def __init__(
+        self,
+        dirs: Iterable[Path],
+        ignore: Callable[[Path], bool] | None = None,
+        interval: float = 1.0,
+    ) -> None:
+        super().__init__(dirs, ignore)
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def poll(self, timeout: float) -> set[Path]:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._take_snapshot()
+        changed = {path for path, stat in snapshot.items() if self._snapshot.get(path) != stat}
+        self._snapshot = snapshot
+        return changed
+
+    def _take_snapshot(self) -> dict[Path, tuple[int, float]]:
+        return {
+            entry.path: (entry.size, entry.mtime)
+            for entry in FileIndex().walk(self.dirs)
+            if not entry.is_dir and self._accept(entry.path)
+        }
+
+
+class InotifyWatcher(Watcher):
+    """Receive change events from the Linux kernel instead of walking the directories.
+
+    Every directory under the watched directories gets a watch, and directories created later are
+    watched as they appear. A file that is watched itself gets a watch of its own. A file is
+    reported when it is closed after writing or moved into a watched directory, so downloads that
+    are written in place and renamed into place are both seen once they are complete.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    FILE_CHANGES = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+    WATCH_MASK = FILE_CHANGES | IN_CREATE
+
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, dirs: Iterable[Path], ignore: Callable[[Path], bool] | None = None) -> None:
+        super().__init__(dirs, ignore)
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: dict[int, Path] = {}
+        # the watches of files, whose events have no name
+        self._file_watches: set[int] = set()
+        try:
+            for dir in self.dirs:
+                self._watch_tree(dir)
+        except OSError:
+            self.close()
+            raise
+
+    def poll(self, timeout: float) -> set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed: set[Path] = set()
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = self._EVENT.unpack_from(buffer, offset)
+            offset += self._EVENT.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # the kernel dropped events, so everything has to be looked at again
+                self.log.warning("Too many file events at once; rescanning the watched directories")
+                changed.update(self._files(self.dirs))
+                continue
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                self._file_watches.discard(wd)
+                continue
+            if wd not in self._watches or not (name or wd in self._file_watches):
+                continue
+
+            path = self._watches[wd] / os.fsdecode(name) if name else self._watches[wd]
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # files may have landed in the directory before it was watched
+                    self._watch_tree(path)
+                    changed.update(self._files([path]))
+            elif mask & self.FILE_CHANGES and self._accept(path):
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _watch_tree(self, dir: Path) -> None:
+        wd = self._watch(dir)
+        if not dir.is_dir():
+            self._file_watches.add(wd)
+            return
+        for entry in FileIndex().walk([dir]):
+            if entry.is_dir:
+                self._watch(entry.path)
+
+    def _watch(self, dir: Path) -> int:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir), self.WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Could not watch {str(dir)}: {os.strerror(errno)}")
+        self._watches[wd] = dir
+        return wd
+
+    def _files(self, dirs: Iterable[Path]) -> set[Path]:
+        return {
+            entry.path
+            for entry in FileIndex().walk(dirs)
+            if not entry.is_dir and self._accept(entry.path)
+        }
+
+
+def make_watcher(
+    dirs: Iterable[Path],
+    ignore: Callable[[Path], bool] | None = None,
+    polling: bool = False,
+    interval: float = 1.0,
+) -> Watcher:
+    """Watch with inotify where it is available and fall back to polling otherwise."""
+    dirs = list(dirs)
+    if not polling:
+        try:
+            return InotifyWatcher(dirs, ignore)
+        except (OSError, AttributeError) as exc:
+            # AttributeError: the C library has no inotify functions
+            logging.getLogger(__name__).warning(
+                f"Falling back to polling for changes every {interval}s: {exc}"
+            )
+    return PollingWatcher(dirs, ignore, interval)
@@ -1,13 +1,80 @@
+import os
 import shutil
 import tempfile
 from pathlib import Path
 
 import polars as pl
 
-from mo.domain.data_format import DataFormat
-from mo.domain.file_metadata import FileMetadata
+from mo.domain.data_format import Compression, DataFormat, IpcCompression
+from mo.domain.file_metadata import MULTIPLE_CLASSES, FileMetadata
 from mo.domain.plan import PlannedAction
+from mo.domain.shard import Shard
+from mo.profiling import record_plan
+from mo.services.blob_store import BlobStore
+from mo.services.compression import compress_file, write_csv
+from mo.services.delta import DeltaBatch
+from mo.services.dictionaries import DICTIONARY_DIR, DictionaryService
+from mo.services.file_index import FileIndex
+from mo.services.key_filter import KEY_FILTER_DIR, KeyFilter, KeyFilterService, KeyFilterSettings
 from mo.services.parsing import DataParsingService
+from mo.services.rollups import RollupService
+
+
+def write_frame(
+    df: pl.LazyFrame,
+    output_path: Path,
+    output_format: DataFormat,
+    ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED,
+) -> None:
+    if output_format == DataFormat.CSV:
+        write_csv(df.collect(streaming=True), output_path)
+    elif output_format == DataFormat.PARQUET:
+        df.collect(streaming=True).write_parquet(output_path)
+    elif output_format == DataFormat.ARROW:
+        # the existing output may still be memory-mapped, so replace it instead of truncating it
+        # in place
+        partial = output_path.with_name(f".{output_path.name}.partial")
+        df.collect(streaming=True).write_ipc(partial, compression=ipc_compression)
+        partial.replace(output_path)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+
+def write_normalized(
+    df: pl.LazyFrame,
+    output_path: Path,
+    dictionaries: DictionaryService,
+    output_format: DataFormat,
+    ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED,
+) -> pl.LazyFrame:
+    """Write the dictionaries of the table at `output_path`, and return the table to write."""
+    encoded, tables = dictionaries.encode(df, output_path)
+    # the dictionaries come first, so the table never has IDs that they lack
+    for path, table in tables.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_frame(table.lazy(), path, output_format, ipc_compression)
+    record_plan(f"normalize -> {str(output_path)}", encoded)
+    return encoded
+
+
+def write_rollup(
+    rollup: pl.LazyFrame,
+    output_path: Path,
+    rollups: RollupService,
+    ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED,
+) -> None:
+    """Write the rollup of the table at `output_path`."""
+    rollup_path = rollups.rollup_path(output_path)
+    rollup_format = rollups.parser.identify_format(rollup_path) or DataFormat.PARQUET
+    write_frame(rollup, rollup_path, rollup_format, ipc_compression)
+
+
+def invalidate_table(index: FileIndex, output_path: Path, rollups: RollupService) -> None:
+    """Forget what `index` knows of the table at `output_path` and its derived files."""
+    index.invalidate(output_path)
+    index.invalidate(rollups.rollup_path(output_path))
+    index.invalidate(output_path.parent / DICTIONARY_DIR)
+    index.invalidate(output_path.parent / KEY_FILTER_DIR)
 
 
 class MergeFiles(PlannedAction):
@@ -18,54 +85,286 @@ class MergeFiles(PlannedAction):
         unique_by: str | list[str] | None = None,
         parser: DataParsingService | None = None,
         output_format: DataFormat = DataFormat.CSV,
+        ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED,
+        shard: Shard | None = None,
+        normalize: bool = False,
+        delta: DeltaBatch | None = None,
+        rollup: bool = False,
+        key_filter: KeyFilterSettings | None = None,
+        index: FileIndex | None = None,
     ) -> None:
         self.metadatas = metadatas
         self.output_path = output_path
         self.parser = parser or DataParsingService()
+        self.dictionaries = DictionaryService(self.parser)
+        self.rollups = RollupService(self.parser)
         self.unique_by = unique_by
         self.output_format = output_format
+        self.ipc_compression = ipc_compression
+        self.shard = shard
+        self.normalize = normalize
+        self.delta = delta
+        self.rollup = rollup and self.rollups.supports(output_path)
+        self.key_filter = key_filter
+        self.key_filters = KeyFilterService(self.parser, key_filter) if key_filter else None
+        self.index = index or FileIndex()
 
     def execute(self) -> None:
-        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index.make_dir(self.output_path.parent)
 
-        dfs = [self.parser.parse(metadata.path) for metadata in self.metadatas]
+        dfs = [self._parse(metadata) for metadata in self.metadatas]
+        existing = None
+        key_filter = None
         if self.output_path.exists():
-            dfs.append(self.parser.parse(self.output_path))
+            existing = self.dictionaries.load(self.output_path)
+            if self.key_filters:
+                keys = self._keys(existing.collect_schema())
+                key_filter = self.key_filters.load(self.output_path, keys)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            unique = Path(temp_dir) / "unique.parquet"
+            if existing is not None and key_filter is not None:
+                df, added = self._merge_new(dfs, existing, key_filter, Path(temp_dir))
+                key_filter.add(added)
+                if self.normalize:
+                    # the rows are scanned again for every dictionary
+                    df.collect(streaming=True).write_parquet(unique)
+                    df = pl.scan_parquet(unique)
+            else:
+                df, added = self._merge_all(dfs, existing, Path(temp_dir))
+                if self.key_filters:
+                    key_filter = self.key_filters.build(df, self._keys(df.collect_schema()))
+            if self.delta:
+                self.delta.add(self.parser.identify_type(self.output_path), added)
+            rollup = None
+            if self.rollup:
+                # the new rows are told apart by the existing output, which is about to be replaced
+                rollup_frame = self.rollups.update(self.output_path, df, added)
+                record_plan(f"rollup -> {str(self.output_path)}", rollup_frame)
+                rollup = rollup_frame.collect(streaming=True)
+            # until the table is written, the old rollup would be out of step with it. once gone, a
+            # run that fails in between builds it anew from the table next time, and a table
+            # written without its rollup has none rather than a wrong one
+            self.rollups.rollup_path(self.output_path).unlink(missing_ok=True)
+            if self.key_filters and key_filter is not None:
+                # written before the table, so the filter never lacks keys that the table has
+                self.key_filters.write(self.output_path, key_filter)
+            else:
+                KeyFilterService(self.parser).remove(self.output_path)
+            if self.normalize:
+                df = write_normalized(
+                    df,
+                    self.output_path,
+                    self.dictionaries,
+                    self.output_format,
+                    self.ipc_compression,
+                )
+            if unique.exists() and not self.normalize and self.output_format == DataFormat.PARQUET:
+                # the unique rows on disk already are the output
+                shutil.move(unique, self.output_path)
+            else:
+                write_frame(df, self.output_path, self.output_format, self.ipc_compression)
+            if rollup is not None:
+                write_rollup(rollup.lazy(), self.output_path, self.rollups, self.ipc_compression)
+        invalidate_table(self.index, self.output_path, self.rollups)
 
+    def _merge_all(
+        self, dfs: list[pl.LazyFrame], existing: pl.LazyFrame | None, temp_dir: Path
+    ) -> tuple[pl.LazyFrame, pl.LazyFrame]:
+        """Return the unique rows of the inputs and the existing output, and the new ones."""
+        if existing is not None:
+            dfs = [*dfs, existing]
         # when the dataset is very large, we run out of memory checking for uniques. a trick to get
         # around this is to write the whole dataset to disk, read the unique values in, then write
         # the unique values back to disk. because parquet will take up less disk space, we write
         # the whole dataset to parquet first, then read that and write to the requested format.
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp = Path(temp_dir) / "temp.parquet"
-            pl.concat(dfs, how="diagonal_relaxed").collect(streaming=True).write_parquet(temp)
-            df = pl.scan_parquet(temp).unique(self.unique_by)
-            if self.output_format == DataFormat.CSV:
-                df.collect(streaming=True).write_csv(self.output_path)
-            elif self.output_format == DataFormat.PARQUET:
-                df.collect(streaming=True).write_parquet(self.output_path)
-            else:
-                raise ValueError(f"Unsupported output format: {self.output_format}")
+        temp = temp_dir / "temp.parquet"
+        combined = pl.concat(dfs, how="diagonal_relaxed")
+        record_plan(f"MergeFiles concat -> {str(self.output_path)}", combined)
+        combined.collect(streaming=True).write_parquet(temp)
+        df = pl.scan_parquet(temp).unique(self.unique_by)
+        record_plan(f"MergeFiles unique -> {str(self.output_path)}", df)
+        if self.normalize or self.delta or self.rollup or self.key_filters:
+            # the rows are scanned again for the dictionaries, the delta, the rollup and the key
+            # filter, so they are kept on disk rather than deduplicated again for every scan
+            unique = temp_dir / "unique.parquet"
+            df.collect(streaming=True).write_parquet(unique)
+            df = pl.scan_parquet(unique)
+        # the existing output is still unchanged here, so it tells which rows are new
+        added = self._added(df, existing)
+        if self.delta and self.rollup:
+            new = temp_dir / "added.parquet"
+            added.collect(streaming=True).write_parquet(new)
+            added = pl.scan_parquet(new)
+        return df, added
+
+    def _merge_new(
+        self,
+        dfs: list[pl.LazyFrame],
+        existing: pl.LazyFrame,
+        key_filter: KeyFilter,
+        temp_dir: Path,
+    ) -> tuple[pl.LazyFrame, pl.LazyFrame]:
+        """Return the existing output with the new rows of the inputs appended, and the new ones.
+
+        Only the inputs are deduplicated. The rows whose keys the filter rules out are new, so
+        only the others are compared with the keys of the existing output.
+        """
+        inputs = temp_dir / "inputs.parquet"
+        combined = pl.concat(dfs, how="diagonal_relaxed").unique(self.unique_by)
+        record_plan(f"MergeFiles inputs -> {str(self.output_path)}", combined)
+        combined.collect(streaming=True).write_parquet(inputs)
+        rows = pl.scan_parquet(inputs)
+        candidates = rows.filter(key_filter.might_contain())
+        new = rows.filter(~key_filter.might_contain())
+        if candidates.select(pl.len()).collect().item():
+            new = pl.concat([new, self._added(candidates, existing)])
+        added = temp_dir / "added.parquet"
+        new.collect(streaming=True).write_parquet(added)
+        df = pl.concat([existing, pl.scan_parquet(added)], how="diagonal_relaxed")
+        return df, pl.scan_parquet(added)
+
+    def _keys(self, schema: pl.Schema) -> list[str]:
+        if self.unique_by is None:
+            return schema.names()
+        if isinstance(self.unique_by, str):
+            return [self.unique_by]
+        return self.unique_by
+
+    def _added(self, df: pl.LazyFrame, existing: pl.LazyFrame | None) -> pl.LazyFrame:
+        """Return the rows of `df` whose keys are not in the `existing` output."""
+        if existing is None:
+            return df
+        schema = df.collect_schema()
+        keys = self._keys(schema)
+        # unique() treats nulls as equal, so the keys are compared the same way
+        existing_keys = existing.select(pl.col(key).cast(schema[key]) for key in keys)
+        return df.join(existing_keys, on=keys, how="anti", join_nulls=True)
+
+    def _parse(self, metadata: FileMetadata) -> pl.LazyFrame:
+        df = self.dictionaries.load(metadata.path)
+        if self.shard and metadata.class_id == MULTIPLE_CLASSES:
+            # merged data holds the classes of every shard, so only this shard's rows are kept
+            class_ids = (
+                df.select(pl.col("class_id").cast(pl.Utf8).drop_nulls().unique())
+                .collect()
+                .get_column("class_id")
+            )
+            keep = [class_id for class_id in class_ids if self.shard.contains(class_id)]
+            df = df.filter(pl.col("class_id").cast(pl.Utf8).is_in(keep))
+        return df
+
+    def describe(self) -> str:
+        normalized = " (normalized)" if self.normalize else ""
+        rollup = " with its rollup" if self.rollup else ""
+        return f"Merging {len(self.metadatas)} files to {str(self.output_path)}{normalized}{rollup}"
+
+
+class ConcatFiles(PlannedAction):
+    """Combine files whose rows cannot collide, like the outputs of disjoint shards.
+
+    Unlike `MergeFiles`, there is no unique pass over the combined rows, so nothing but the output
+    has to be materialized. An existing output may hold the same rows, so it is refused; `mo
+    merge-shards` merges into one with `MergeFiles` instead.
+    """
+
+    def __init__(
+        self,
+        metadatas: list[FileMetadata],
+        output_path: Path,
+        parser: DataParsingService | None = None,
+        output_format: DataFormat = DataFormat.PARQUET,
+        ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED,
+        normalize: bool = False,
+        rollup: bool = False,
+        index: FileIndex | None = None,
+    ) -> None:
+        self.metadatas = metadatas
+        self.output_path = output_path
+        self.parser = parser or DataParsingService()
+        self.dictionaries = DictionaryService(self.parser)
+        self.rollups = RollupService(self.parser)
+        self.output_format = output_format
+        self.ipc_compression = ipc_compression
+        self.normalize = normalize
+        self.rollup = rollup and self.rollups.supports(output_path)
+        self.index = index or FileIndex()
+
+    def execute(self) -> None:
+        if self.index.exists(self.output_path):
+            raise FileExistsError(f"Not concatenating into an existing file: {self.output_path}")
+        self.index.make_dir(self.output_path.parent)
+        # normalized inputs each have their own IDs, so their values are joined back in
+        dfs = [self.dictionaries.load(metadata.path) for metadata in self.metadatas]
+        combined = pl.concat(dfs, how="diagonal_relaxed")
+        record_plan(f"ConcatFiles -> {str(self.output_path)}", combined)
+        # a rollup or key filter left without its table is of other rows
+        self.rollups.rollup_path(self.output_path).unlink(missing_ok=True)
+        KeyFilterService(self.parser).remove(self.output_path)
+        if not self.normalize:
+            write_frame(combined, self.output_path, self.output_format, self.ipc_compression)
+        else:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp = Path(temp_dir) / "temp.parquet"
+                combined.collect(streaming=True).write_parquet(temp)
+                df = write_normalized(
+                    pl.scan_parquet(temp),
+                    self.output_path,
+                    self.dictionaries,
+                    self.output_format,
+                    self.ipc_compression,
+                )
+                write_frame(df, self.output_path, self.output_format, self.ipc_compression)
+        if self.rollup:
+            rollup = self.rollups.aggregate(combined, self.output_path)
+            write_rollup(rollup, self.output_path, self.rollups, self.ipc_compression)
+        invalidate_table(self.index, self.output_path, self.rollups)
 
     def describe(self) -> str:
-        return f"Merging {len(self.metadatas)} files to {str(self.output_path)}"
+        normalized = " (normalized)" if self.normalize else ""
+        rollup = " with its rollup" if self.rollup else ""
+        return (
+            f"Concatenating {len(self.metadatas)} files to {str(self.output_path)}"
+            f"{normalized}{rollup}"
+        )
 
 
 class FileActionBase(PlannedAction):
+    # each file action touches its own input and output paths only
+    concurrent_safe = True
+
+    def __init__(self, index: FileIndex | None = None) -> None:
+        # file system metadata is looked up in the run's index, so it is only stat-ed once per run
+        self.index = index or FileIndex()
+
     def _move(self, src: Path, dst: Path) -> None:
-        shutil.move(src, dst)
+        self.index.make_dir(dst.parent)
+        try:
+            # a rename is a single call; shutil would stat both paths first
+            os.rename(src, dst)
+        except OSError:
+            # across file systems, or onto an existing directory
+            shutil.move(src, dst)
+        self.index.invalidate(src)
+        self.index.invalidate(dst)
 
     def _copy(self, src: Path, dst: Path) -> None:
-        if src.is_dir():
+        self.index.make_dir(dst.parent)
+        if self.index.stat(src).is_dir:
             shutil.copytree(src, dst)
         else:
-            shutil.copy(src, dst)
+            # shutil.copy stats both paths several times over; the index already knows them
+            with open(src, "rb") as infile, open(dst, "wb") as outfile:
+                shutil.copyfileobj(infile, outfile, 1024 * 1024)
+            shutil.copymode(src, dst)
+        self.index.invalidate(dst)
 
     def _remove(self, path: Path) -> None:
-        if path.is_dir():
+        if self.index.stat(path).is_dir:
             shutil.rmtree(path)
         else:
             path.unlink()
+        self.index.invalidate(path)
 
 
 class MoveCopyBase(FileActionBase):
@@ -74,16 +373,21 @@ class MoveCopyBase(FileActionBase):
         metadata: FileMetadata,
         output_path: Path,
         ignore_duplicates: bool = False,
+        index: FileIndex | None = None,
     ) -> None:
+        super().__init__(index)
         self.metadata = metadata
         self.output_path = output_path
         self.ignore_duplicates = ignore_duplicates
 
     def _output_is_newer(self) -> bool:
-        return (
-            self.output_path.exists()
-            and self.metadata.path.stat().st_mtime <= self.output_path.stat().st_mtime
-        )
+        if (output := self.index.get(self.output_path)) is None:
+            return False
+        # archive members carry their own timestamps; their extracted copies are always new
+        mtime = self.metadata.mtime
+        if mtime is None:
+            mtime = self.index.stat(self.metadata.path).mtime
+        return mtime <= output.mtime
 
 
 class MoveFile(MoveCopyBase):
@@ -91,8 +395,7 @@ class MoveFile(MoveCopyBase):
         if self._output_is_newer() and not self.ignore_duplicates:
             self._remove(self.metadata.path)
         else:
-            self.output_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(self.metadata.path, self.output_path)
+            self._move(self.metadata.path, self.output_path)
 
     def describe(self) -> str:
         if self._output_is_newer():
@@ -103,7 +406,6 @@ class MoveFile(MoveCopyBase):
 class CopyFile(MoveCopyBase):
     def execute(self) -> None:
         if not self._output_is_newer():
-            self.output_path.parent.mkdir(parents=True, exist_ok=True)
             self._copy(self.metadata.path, self.output_path)
 
     def describe(self) -> str:
@@ -112,8 +414,67 @@ class CopyFile(MoveCopyBase):
         return f"Copying {self.metadata.name} to {str(self.output_path)}"
 
 
+class TransferSupplementary(MoveCopyBase):
+    """Copy or move a supplementary folder through a `BlobStore`, so repeated files are linked."""
+
+    def __init__(
+        self,
+        metadata: FileMetadata,
+        output_path: Path,
+        store: BlobStore,
+        move: bool = False,
+        ignore_duplicates: bool = False,
+        index: FileIndex | None = None,
+    ) -> None:
+        super().__init__(metadata, output_path, ignore_duplicates, index)
+        self.store = store
+        self.move = move
+
+    def execute(self) -> None:
+        if not self._output_is_newer():
+            self.store.place_tree(self.metadata.path, self.output_path, self.move)
+        elif self.move and not self.ignore_duplicates:
+            self._remove(self.metadata.path)
+
+    def describe(self) -> str:
+        if self._output_is_newer():
+            return f"Skipping older {self.metadata.name}"
+        verb = "Moving" if self.move else "Copying"
+        return f"{verb} {self.metadata.name} to {str(self.output_path)}"
+
+
+class CompressFile(MoveCopyBase):
+    def __init__(
+        self,
+        metadata: FileMetadata,
+        output_path: Path,
+        compression: Compression,
+        move: bool = False,
+        ignore_duplicates: bool = False,
+        index: FileIndex | None = None,
+    ) -> None:
+        super().__init__(metadata, output_path, ignore_duplicates, index)
+        self.compression = compression
+        self.move = move
+
+    def execute(self) -> None:
+        output_is_newer = self._output_is_newer()
+        if not output_is_newer:
+            self.index.make_dir(self.output_path.parent)
+            compress_file(self.metadata.path, self.output_path, self.compression)
+            self.index.invalidate(self.output_path)
+        if self.move and not (output_is_newer and self.ignore_duplicates):
+            self._remove(self.metadata.path)
+
+    def describe(self) -> str:
+        if self._output_is_newer():
+            return f"Skipping older {self.metadata.name}"
+        return f"Compressing {self.metadata.name} to {str(self.output_path)}"
+
+
 class DeleteFile(FileActionBase):
-    def __init__(self, metadata: FileMetadata) -> None:
+    def __init__(self, metadata: FileMetadata, index: FileIndex | None = None) -> None:
+        super().__init__(index)
         self.metadata = metadata
 
     def execute(self) -> None:
@@ -124,6 +485,8 @@ class DeleteFile(FileActionBase):
 
 
 class IgnoreLegacyFile(PlannedAction):
+    concurrent_safe = True
+
     def __init__(self, metadata: FileMetadata) -> None:
         self.metadata = metadata
 
@@ -0,0 +1,52 @@
+import shutil
+from collections.abc import Iterable
+from typing import final
+
+from pydantic import FilePath
+
+from mo.domain.config import Config
+from mo.domain.observer import Observer, ProgressEvent
+from mo.usecases.compress_usecase import CompressUseCase
+from mo.usecases.organize_usecase import OrganizeUseCase
+from mo.usecases.plan_file import PlanFile, extraction_dir
+from mo.usecases.usecase import UseCase
+
+COMMANDS = {"organize": OrganizeUseCase, "compress": CompressUseCase}
+
+
+class Input(Config):
+    plan: FilePath
+
+
+@final
+class ApplyUseCase(UseCase):
+    """Run a plan written by `mo organize --plan-out` or `mo compress --plan-out`.
+
+    The plan's command is set up with the settings it was planned with, and then runs the plan's
+    actions instead of discovering the files again, once the files they read are found unchanged.
+    The archive members extracted next to the plan are deleted once it ran, and kept if it failed,
+    to apply it again.
+    """
+
+    Input = Input
+
+    def __init__(
+        self, config: Input, observers: Iterable[Observer[ProgressEvent]] | None = None
+    ) -> None:
+        super().__init__()
+        self.config = config
+        self.observers = observers or []
+
+    def execute(self) -> None:
+        plan_file = PlanFile.read(self.config.plan)
+        if plan_file.command not in COMMANDS:
+            raise ValueError(f"Unknown command in plan file: {plan_file.command}")
+        usecase_type = COMMANDS[plan_file.command]
+        config = usecase_type.Input(**plan_file.config).model_copy(
+            update={"dry_run": False, "plan_out": None}
+        )
+        usecase = usecase_type(config, self.observers)
+        plan = usecase.load_plan(plan_file)
+        self.log.info(f"Applying a plan of {len(plan.actions)} actions from {self.config.plan}")
+        usecase.apply(plan)
+        shutil.rmtree(extraction_dir(self.config.plan), ignore_errors=True)
@@ -3,66 +3,154 @@ from collections.abc import Iterable
 from pathlib import Path
 from typing import final
 
-from pydantic import DirectoryPath
+from pydantic import DirectoryPath, FilePath
 
-from mo.domain.config import Config
-from mo.domain.data_format import DataFormat
-from mo.domain.data_types import AnyData, DataType
+from mo.domain.data_format import DataFormat, IpcCompression
+from mo.domain.data_types import UNIQUE_KEYS, AnyData, DataType
 from mo.domain.file_metadata import FileMetadata
 from mo.domain.observer import Observer, ProgressEvent
 from mo.domain.plan import Plan, PlannedAction
+from mo.services.blob_store import BlobStore
+from mo.services.delta import DeltaBatch
+from mo.services.file_access import FileAccessService, FileInfoCache
 from mo.services.file_discovery import FileDiscoveryService
+from mo.services.file_index import FileIndex
+from mo.services.key_filter import KeyFilterSettings
 from mo.services.parsing import DataParsingService
 from mo.services.validation import FastValidationService, ValidationService
-from mo.usecases.actions import CopyFile, DeleteFile, MergeFiles, MoveFile
-from mo.usecases.usecase import UseCase
+from mo.usecases.actions import (
+    CopyFile,
+    DeleteFile,
+    MergeFiles,
+    MoveFile,
+    TransferSupplementary,
+)
+from mo.usecases.plan_file import PlanFile, extraction_dir
+from mo.usecases.usecase import DiscoveryInput, DiscoveryUseCase
 
 
-class Input(Config):
-    inputs: list[DirectoryPath]
-    output: Path
+class Input(DiscoveryInput):
+    inputs: list[DirectoryPath | FilePath]
     move: bool = False
     skip_validation: bool = False
     dry_run: bool = False
+    output_format: DataFormat = DataFormat.PARQUET
+    ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED
+    dedup_supplementary: bool = False
+    normalize: bool = False
+    emit_delta: Path | None = None
+    rollups: bool = False
+    key_filter: bool = False
+    key_filter_fp_rate: float = 0.01
+    key_filter_max_mb: float | None = None
+    plan_out: Path | None = None
 
 
 @final
-class CompressUseCase(UseCase):
+class CompressUseCase(DiscoveryUseCase):
     Input = Input
 
     def __init__(
-        self, config: Input, observers: Iterable[Observer[ProgressEvent]] | None = None
+        self,
+        config: Input,
+        observers: Iterable[Observer[ProgressEvent]] | None = None,
+        cache: FileInfoCache | None = None,
     ) -> None:
         super().__init__()
         self.config = config
         self.observers = observers or []
+        self.cache = cache
+        self.index = FileIndex(config.io_backend, config.io_concurrency)
+        self.blobs = BlobStore(self.index, config.io_concurrency)
+        self.delta = DeltaBatch(config.emit_delta) if config.emit_delta else None
+        self.key_filter = (
+            KeyFilterSettings(
+                false_positive_rate=config.key_filter_fp_rate,
+                max_bytes=(
+                    int(config.key_filter_max_mb * 2**20) if config.key_filter_max_mb else None
+                ),
+            )
+            if config.key_filter
+            else None
+        )
 
     def execute(self) -> None:
         with tempfile.TemporaryDirectory() as temp_dir:
-            plan = self.prepare_plan(Path(temp_dir))
+            # archives of a plan that is written out are extracted next to it, to be there when the
+            # plan is applied
+            plan_out = self.config.plan_out
+            plan = self.prepare_plan(extraction_dir(plan_out) if plan_out else Path(temp_dir))
+            if plan_out:
+                PlanFile.create("compress", self.config, plan.actions, self.index).write(plan_out)
+                self.log.info(f"Wrote a plan of {len(plan.actions)} actions to {str(plan_out)}")
             if self.config.dry_run:
                 plan.describe()
-            else:
-                plan.execute()
+            elif not plan_out:
+                self.apply(plan)
 
-    def prepare_plan(self, extraction_directory: Path) -> Plan:
-        # discover files to process
-        discovery_service = FileDiscoveryService(
-            self.config.inputs,
-            DataParsingService(),
-            FastValidationService() if self.config.skip_validation else ValidationService(),
-            extraction_directory,
+    def load_plan(self, plan_file: PlanFile) -> Plan:
+        """Return the plan in `plan_file`, after checking that the files it reads did not change."""
+        plan_file.check(self.index)
+        actions = plan_file.load_actions(self.index, self.blobs, self.delta)
+        self.blobs.expect(
+            action.metadata.path for action in actions if isinstance(action, TransferSupplementary)
         )
-        discovery_service.register(self.observers)
+        if self.index.exists(self.config.output):
+            self.index.walk([self.config.output])
+        plan = Plan(actions)
+        plan.register(self.observers)
+        return plan
+
+    def apply(self, plan: Plan) -> None:
+        """Execute a plan of this use case, made now or read from a plan file, and report on it."""
+        plan.execute(self.config.io_backend, self.config.io_concurrency)
+        if self.blobs.report.files:
+            self.log.info(str(self.blobs.report))
+        if self.delta and self.delta.commit():
+            self.log.info(
+                f"Wrote delta batch {self.delta.batch_id} to {str(self.delta.path)}: "
+                f"{self.delta.rows}"
+            )
+        self.check_consistency()
+
+    def prepare_plan(self, extraction_directory: Path) -> Plan:
+        # discover files to process; files are only mapped for validation, so they are released
+        # before the plan touches them
+        with FileAccessService(self.cache) as files:
+            validation_service = (
+                FastValidationService(files)
+                if self.config.skip_validation
+                else ValidationService(files)
+            )
+            discovery_service = FileDiscoveryService(
+                self.config.inputs,
+                DataParsingService(),
+                validation_service,
+                extraction_directory,
+                self.class_id_resolver(),
+                self.index,
+                self.config.shard,
+            )
+            discovery_service.register(self.observers)
+            metadatas = list(discovery_service.discover())
+
+        if self.config.dedup_supplementary:
+            self.blobs.expect(
+                metadata.path for metadata in metadatas if metadata.type == "supplementary"
+            )
+
+        # index the existing output too, so the actions can compare against it without stat-ing
+        if self.index.exists(self.config.output):
+            self.index.walk([self.config.output])
 
         # organize by type because we will compress each type to a single file
-        metadatas = discovery_service.discover()
         metadatas_by_type: dict[AnyData, list[FileMetadata]] = {}
         for metadata in metadatas:
             metadatas_by_type.setdefault(metadata.type, []).append(metadata)
 
         counts = {str(k): len(v) for k, v in metadatas_by_type.items()}
-        self.log.info(f"Found files to compress: {counts}")
+        shard = f" in shard {self.config.shard}" if self.config.shard else ""
+        self.log.info(f"Found files to compress{shard}: {counts}")
 
         # plan what to do with the files
         plan = Plan(list(self.make_plan_actions(metadatas_by_type)))
@@ -75,50 +163,50 @@ class CompressUseCase(UseCase):
         def merge_and_delete(
             data_type: DataType, metadata_list: list[FileMetadata], unique_by: list[str]
         ) -> Iterable[PlannedAction]:
+            output = self.config.output / f"{data_type.value}.{self.config.output_format.value}"
+            # the existing output is merged anyway, and must not be deleted as an input when the
+            # output directory is inside an input directory
+            metadata_list = [
+                metadata
+                for metadata in metadata_list
+                if metadata.path.resolve() != output.resolve()
+            ]
+            if not metadata_list:
+                return
             yield MergeFiles(
                 metadata_list,
-                self.config.output / f"{data_type.value}.parquet",
+                output,
                 unique_by=unique_by,
-                output_format=DataFormat.PARQUET,
+                output_format=self.config.output_format,
+                ipc_compression=self.config.ipc_compression,
+                shard=self.config.shard,
+                normalize=self.config.normalize,
+                delta=self.delta,
+                rollup=self.config.rollups,
+                key_filter=self.key_filter,
+                index=self.index,
             )
             if self.config.move:
                 for metadata in metadata_list:
-                    yield DeleteFile(metadata)
+                    # the other shards' workers need the files with every class, too
+                    if not (self.config.shard and metadata.multi_class):
+                        yield DeleteFile(metadata, self.index)
 
         for data_type, metadata_list in metadatas_by_type.items():
-            if data_type in {DataType.RESPONSES}:
-                yield from merge_and_delete(
-                    data_type,
-                    metadata_list,
-                    ["student_id", "item_id", "lrn_question_position", "dt_submitted"],
-                )
-            elif data_type in {DataType.PAGE_VIEWS}:
-                yield from merge_and_delete(
-                    data_type,
-                    metadata_list,
-                    ["class_id", "student_id", "chapter", "page", "dt_accessed"],
-                )
-            elif data_type in {DataType.MEDIA_VIEWS}:
-                yield from merge_and_delete(
-                    data_type,
-                    metadata_list,
-                    ["class_id", "student_id", "chapter", "page", "media_id"],
-                )
-            elif data_type in {DataType.CLASSES, DataType.MANIFEST}:
-                yield from merge_and_delete(
-                    data_type,
-                    metadata_list,
-                    ["class_id"],
-                )
+            if data_type in UNIQUE_KEYS:
+                yield from merge_and_delete(data_type, metadata_list, UNIQUE_KEYS[data_type])
             elif data_type == "supplementary":
                 supp_dir = self.config.output / "supplementary"
                 for metadata in metadata_list:
                     if not metadata.class_id:
                         self.log.warning(f"Skipping file missing class_id: {metadata}")
                         continue
-                    output = supp_dir / metadata.class_id / metadata.path.name
-                    yield (
-                        MoveFile(metadata, output)
-                        if self.config.move
-                        else CopyFile(metadata, output)
-                    )
+                    output = supp_dir / metadata.class_id
+                    if self.config.dedup_supplementary:
+                        yield TransferSupplementary(
+                            metadata, output, self.blobs, move=self.config.move, index=self.index
+                        )
+                    elif self.config.move:
+                        yield MoveFile(metadata, output, index=self.index)
+                    else:
+                        yield CopyFile(metadata, output, index=self.index)
@@ -0,0 +1,169 @@
+from collections.abc import Iterable
+from pathlib import Path
+from typing import final
+
+from pydantic import DirectoryPath
+
+from mo.domain.config import Config
+from mo.domain.data_format import Compression, DataFormat, IpcCompression
+from mo.domain.data_types import UNIQUE_KEYS, DataType
+from mo.domain.file_metadata import FileMetadata
+from mo.domain.plan import Plan, PlannedAction
+from mo.services.consistency import ConsistencyService
+from mo.services.dictionaries import DICTIONARY_DIR
+from mo.services.file_index import FileIndex
+from mo.services.key_filter import KEY_FILTER_DIR
+from mo.services.parsing import DataParsingService
+from mo.services.rollups import ROLLUP_SUFFIX
+from mo.usecases.actions import ConcatFiles, CopyFile, DeleteFile, MergeFiles, MoveFile
+from mo.usecases.usecase import UseCase
+
+
+class Input(Config):
+    shards: list[DirectoryPath]
+    output: Path
+    move: bool = False
+    dry_run: bool = False
+    ipc_compression: IpcCompression = IpcCompression.UNCOMPRESSED
+
+
+@final
+class MergeShardsUseCase(UseCase):
+    """Combine the outputs of `mo organize --shard` or `mo compress --shard` workers.
+
+    Every class was handled by exactly one worker, so the data of the shards cannot overlap: each
+    type's files are concatenated without another unique pass, and class folders are moved over
+    as they are. Only the `classes` and `manifest` files, which every worker wrote in full, are
+    merged by `class_id`, and so are the tables that the output already has, on the keys of their
+    type like `mo compress` does. Organized files keep their compression.
+    """
+
+    Input = Input
+
+    def __init__(self, config: Input) -> None:
+        super().__init__()
+        self.config = config
+        self.parser = DataParsingService()
+        self.index = FileIndex()
+
+    def execute(self) -> None:
+        plan = Plan(list(self.make_plan_actions()))
+        if self.config.dry_run:
+            plan.describe()
+            return
+        plan.execute()
+        report = ConsistencyService().check(self.config.output)
+        report.log(self.log)
+
+    def make_plan_actions(self) -> Iterable[PlannedAction]:
+        tables: dict[DataType, list[FileMetadata]] = {}
+        transfers: list[tuple[FileMetadata, Path]] = []
+        # the dictionaries of normalized shards, which are read along with the shards' tables
+        dictionaries: dict[DataType, list[FileMetadata]] = {}
+        # the rollups of shards compressed with --rollups, which are built anew from the tables
+        rollups: dict[DataType, list[FileMetadata]] = {}
+        # the key filters of shards compressed with --key-filter, which only suit their own tables
+        key_filters: dict[DataType, list[FileMetadata]] = {}
+        for shard in self.config.shards:
+            for entry in self.index.walk([shard]):
+                path = entry.path
+                parent = path.parent
+                if parent == shard and not entry.is_dir:
+                    # a merged table of a compressed shard
+                    data_type = self.parser.identify_type(path)
+                    if data_type in DataType:
+                        tables.setdefault(data_type, []).append(
+                            FileMetadata(path=path, type=data_type)
+                        )
+                    elif path.stem.endswith(ROLLUP_SUFFIX):
+                        data_type = self.parser.identify_type(path.stem.removesuffix(ROLLUP_SUFFIX))
+                        if data_type in DataType:
+                            rollups.setdefault(data_type, []).append(
+                                FileMetadata(path=path, type=data_type)
+                            )
+                elif parent.parent == shard and parent.name == DICTIONARY_DIR:
+                    # <type>.<column>.parquet of a normalized shard
+                    data_type = self.parser.identify_type(path.name.partition(".")[0])
+                    if data_type in DataType:
+                        dictionaries.setdefault(data_type, []).append(
+                            FileMetadata(path=path, type=data_type)
+                        )
+                elif parent.parent == shard and parent.name == KEY_FILTER_DIR:
+                    # <type>.bloom.parquet and <type>.bloom.json of a shard
+                    data_type = self.parser.identify_type(path.name.partition(".")[0])
+                    if data_type in DataType:
+                        key_filters.setdefault(data_type, []).append(
+                            FileMetadata(path=path, type=data_type)
+                        )
+                elif parent.parent == shard and parent.name == "supplementary":
+                    # supplementary/<class_id> of a compressed shard
+                    metadata = FileMetadata(path=path, type="supplementary", class_id=path.name)
+                    transfers.append((metadata, self.config.output / "supplementary"))
+                elif parent.parent == shard and (
+                    path.name == "supplementary"
+                    if entry.is_dir
+                    else self.parser.identify_type(path) in DataType
+                ):
+                    # <class_id>/<type>.csv and <class_id>/supplementary of an organized shard
+                    data_type = self.parser.identify_type(path) or "supplementary"
+                    metadata = FileMetadata(path=path, type=data_type, class_id=parent.name)
+                    transfers.append((metadata, self.config.output / parent.name))
+
+        counts = {str(k): len(v) for k, v in tables.items()}
+        self.log.info(f"Found files to merge from {len(self.config.shards)} shards: {counts}")
+        for data_type, metadatas in tables.items():
+            # shards are written by the same command, so the first one's format is everyone's
+            data_format = self.parser.identify_format(metadatas[0].path) or DataFormat.PARQUET
+            # and the compression of organized shards' CSV files
+            compression = Compression.from_path(metadatas[0].path)
+            suffix = compression.suffix if compression else ""
+            output = self.config.output / f"{data_type.value}.{data_format.value}{suffix}"
+            if data_type in (DataType.CLASSES, DataType.MANIFEST):
+                yield MergeFiles(
+                    metadatas,
+                    output,
+                    unique_by=UNIQUE_KEYS[data_type],
+                    output_format=data_format,
+                    ipc_compression=self.config.ipc_compression,
+                    index=self.index,
+                )
+            elif self.index.exists(output):
+                # the rows of an earlier merge may be in the shards again, so they are merged in,
+                # deduplicated like `mo compress` does
+                yield MergeFiles(
+                    metadatas,
+                    output,
+                    unique_by=UNIQUE_KEYS.get(data_type),
+                    output_format=data_format,
+                    ipc_compression=self.config.ipc_compression,
+                    normalize=data_type in dictionaries,
+                    rollup=data_type in rollups,
+                    index=self.index,
+                )
+            else:
+                yield ConcatFiles(
+                    metadatas,
+                    output,
+                    output_format=data_format,
+                    ipc_compression=self.config.ipc_compression,
+                    # each shard numbered its values on its own, so the values are numbered anew
+                    normalize=data_type in dictionaries,
+                    rollup=data_type in rollups,
+                    index=self.index,
+                )
+            if self.config.move:
+                derived = (
+                    dictionaries.get(data_type, [])
+                    + rollups.get(data_type, [])
+                    + key_filters.get(data_type, [])
+                )
+                for metadata in metadatas + derived:
+                    yield DeleteFile(metadata, self.index)
+
+        for metadata, output_dir in transfers:
+            output = output_dir / metadata.path.name
+            yield (
+                MoveFile(metadata, output, index=self.index)
+                if self.config.move
+                else CopyFile(metadata, output, index=self.index)
+            )
@@ -3,60 +3,125 @@ from collections.abc import Iterable
 from pathlib import Path
 from typing import final
 
-from pydantic import DirectoryPath
+from pydantic import DirectoryPath, FilePath
 
-from mo.domain.config import Config
+from mo.domain.data_format import Compression
 from mo.domain.data_types import DataType, LegacyDataType
-from mo.domain.file_metadata import FileMetadata
+from mo.domain.file_metadata import MULTIPLE_CLASSES, FileMetadata
 from mo.domain.observer import Observer, ProgressEvent
 from mo.domain.plan import Plan, PlannedAction
+from mo.services.blob_store import BlobStore
+from mo.services.compression import check_compression
+from mo.services.file_access import FileAccessService, FileInfoCache
 from mo.services.file_discovery import FileDiscoveryService
+from mo.services.file_index import FileIndex
 from mo.services.parsing import DataParsingService
 from mo.services.validation import ValidationService
-from mo.usecases.actions import CopyFile, DeleteFile, IgnoreLegacyFile, MergeFiles, MoveFile
-from mo.usecases.usecase import UseCase
+from mo.usecases.actions import (
+    CompressFile,
+    CopyFile,
+    DeleteFile,
+    IgnoreLegacyFile,
+    MergeFiles,
+    MoveFile,
+    TransferSupplementary,
+)
+from mo.usecases.plan_file import PlanFile, extraction_dir
+from mo.usecases.usecase import DiscoveryInput, DiscoveryUseCase
 
 
-class Input(Config):
-    inputs: list[DirectoryPath]
-    output: Path
+class Input(DiscoveryInput):
+    inputs: list[DirectoryPath | FilePath]
     move: bool = True
     ignore_legacy: bool = False
     ignore_duplicates: bool = False
     dry_run: bool = False
+    compression: Compression | None = None
+    dedup_supplementary: bool = False
+    plan_out: Path | None = None
 
 
 @final
-class OrganizeUseCase(UseCase):
+class OrganizeUseCase(DiscoveryUseCase):
     Input = Input
 
     def __init__(
-        self, config: Input, observers: Iterable[Observer[ProgressEvent]] | None = None
+        self,
+        config: Input,
+        observers: Iterable[Observer[ProgressEvent]] | None = None,
+        cache: FileInfoCache | None = None,
     ) -> None:
         super().__init__()
         self.config = config
         self.observers = observers or []
+        self.cache = cache
+        if config.compression:
+            # refused before any action runs, rather than partway through the plan
+            check_compression(config.compression)
+        self.index = FileIndex(config.io_backend, config.io_concurrency)
+        self.blobs = BlobStore(self.index, config.io_concurrency)
 
     def execute(self) -> None:
         with tempfile.TemporaryDirectory() as temp_dir:
-            plan = self.prepare_plan(Path(temp_dir))
+            # archives of a plan that is written out are extracted next to it, to be there when the
+            # plan is applied
+            plan_out = self.config.plan_out
+            plan = self.prepare_plan(extraction_dir(plan_out) if plan_out else Path(temp_dir))
+            if plan_out:
+                PlanFile.create("organize", self.config, plan.actions, self.index).write(plan_out)
+                self.log.info(f"Wrote a plan of {len(plan.actions)} actions to {str(plan_out)}")
             if self.config.dry_run:
                 plan.describe()
-            else:
-                plan.execute()
+            elif not plan_out:
+                self.apply(plan)
 
-    def prepare_plan(self, extraction_directory: Path) -> Plan:
-        self.log.info(f"Planning how to organize into {str(self.config.output)}")
-
-        # discover files to process
-        discovery_service = FileDiscoveryService(
-            self.config.inputs,
-            DataParsingService(),
-            ValidationService(),
-            extraction_directory,
+    def load_plan(self, plan_file: PlanFile) -> Plan:
+        """Return the plan in `plan_file`, after checking that the files it reads did not change."""
+        plan_file.check(self.index)
+        actions = plan_file.load_actions(self.index, self.blobs)
+        self.blobs.expect(
+            action.metadata.path for action in actions if isinstance(action, TransferSupplementary)
         )
-        discovery_service.register(self.observers)
-        file_metadata_list = discovery_service.discover()
+        if self.index.exists(self.config.output):
+            self.index.walk([self.config.output])
+        plan = Plan(actions)
+        plan.register(self.observers)
+        return plan
+
+    def apply(self, plan: Plan) -> None:
+        """Execute a plan of this use case, made now or read from a plan file, and report on it."""
+        plan.execute(self.config.io_backend, self.config.io_concurrency)
+        if self.blobs.report.files:
+            self.log.info(str(self.blobs.report))
+        self.check_consistency()
+
+    def prepare_plan(self, extraction_directory: Path) -> Plan:
+        shard = f" (shard {self.config.shard})" if self.config.shard else ""
+        self.log.info(f"Planning how to organize into {str(self.config.output)}{shard}")
+
+        # discover files to process; files are only mapped for validation, so they are released
+        # before the plan touches them
+        with FileAccessService(self.cache) as files:
+            discovery_service = FileDiscoveryService(
+                self.config.inputs,
+                DataParsingService(),
+                ValidationService(files),
+                extraction_directory,
+                self.class_id_resolver(),
+                self.index,
+                self.config.shard,
+            )
+            discovery_service.register(self.observers)
+            file_metadata_list = list(discovery_service.discover())
+
+        if self.config.dedup_supplementary:
+            self.blobs.expect(
+                metadata.path for metadata in file_metadata_list if metadata.type == "supplementary"
+            )
+
+        # index the existing output too, so the actions can compare against it without stat-ing
+        if self.index.exists(self.config.output):
+            self.index.walk([self.config.output])
 
         # plan what to do with the files
         plan = Plan(list(self.make_plan_actions(file_metadata_list)))
@@ -75,7 +140,7 @@ class OrganizeUseCase(UseCase):
                 yield (
                     IgnoreLegacyFile(metadata)
                     if self.config.ignore_legacy
-                    else DeleteFile(metadata)
+                    else DeleteFile(metadata, self.index)
                 )
             elif metadata.type == DataType.CLASSES:
                 manifests.append(metadata)
@@ -85,19 +150,61 @@ class OrganizeUseCase(UseCase):
                 if not metadata.class_id:
                     self.log.warning(f"File {metadata.name} has no class ID and will be ignored.")
                     continue
-                output = self.config.output / metadata.class_id / metadata.path.name
-                yield (
-                    MoveFile(metadata, output, self.config.ignore_duplicates)
-                    if self.config.move
-                    else CopyFile(metadata, output)
-                )
+                if metadata.class_id == MULTIPLE_CLASSES:
+                    self.log.warning(
+                        f"File {metadata.name} has the data of several classes and will be "
+                        "ignored. Use `mo compress` to merge it instead."
+                    )
+                    continue
+                output_dir = self.config.output / metadata.class_id
+                yield self.transfer(metadata, output_dir, self.config.ignore_duplicates)
 
         # merge manifests and classes into single files
         for lst in [manifests, classes]:
             if not lst:
                 continue
-            output = self.config.output / lst[0].path.name
             if len(lst) == 1:
-                yield MoveFile(lst[0], output) if self.config.move else CopyFile(lst[0], output)
+                yield self.transfer(lst[0], self.config.output)
             elif len(lst) > 1:
-                yield MergeFiles(lst, output, "class_id")
+                output = self.config.output / self.output_name(lst[0])
+                yield MergeFiles(lst, output, "class_id", index=self.index)
+
+    def transfer(
+        self, metadata: FileMetadata, output_dir: Path, ignore_duplicates: bool = False
+    ) -> PlannedAction:
+        output = output_dir / self.output_name(metadata)
+        # the other shards' workers need the files that list every class, too
+        move = self.config.move and not (self.config.shard and metadata.multi_class)
+        if self.should_compress(metadata) and self.config.compression:
+            return CompressFile(
+                metadata,
+                output,
+                self.config.compression,
+                move=move,
+                ignore_duplicates=ignore_duplicates,
+                index=self.index,
+            )
+        if metadata.type == "supplementary" and self.config.dedup_supplementary:
+            return TransferSupplementary(
+                metadata,
+                output,
+                self.blobs,
+                move=move,
+                ignore_duplicates=ignore_duplicates,
+                index=self.index,
+            )
+        if move:
+            return MoveFile(metadata, output, ignore_duplicates, self.index)
+        return CopyFile(metadata, output, index=self.index)
+
+    def output_name(self, metadata: FileMetadata) -> str:
+        if self.should_compress(metadata) and self.config.compression:
+            return f"{metadata.path.name}{self.config.compression.suffix}"
+        return metadata.path.name
+
+    def should_compress(self, metadata: FileMetadata) -> bool:
+        return (
+            self.config.compression is not None
+            and metadata.type != "supplementary"
+            and Compression.from_path(metadata.path) is None
+        )
@@ -0,0 +1,270 @@
+"""Plans written to a file by `--plan-out`, to be reviewed and then run by `mo apply`.
+
+A plan file is JSON with the command and its settings, the actions, and the size and modification
+time of every path the actions read (their sources), and of every file under the folders among
+them. Applying a plan only compares the sources
+with the file system instead of discovering and validating the files again, and refuses to run if
+any of them changed.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from mo.domain.config import Config
+from mo.domain.data_format import Compression, DataFormat, IpcCompression
+from mo.domain.data_types import DataType, LegacyDataType
+from mo.domain.file_metadata import FileMetadata, ZipFileMetadata
+from mo.domain.plan import PlannedAction
+from mo.domain.shard import Shard
+from mo.services.blob_store import BlobStore
+from mo.services.delta import DeltaBatch
+from mo.services.file_index import FileIndex
+from mo.services.key_filter import KeyFilterSettings
+from mo.usecases.actions import (
+    CompressFile,
+    ConcatFiles,
+    CopyFile,
+    DeleteFile,
+    IgnoreLegacyFile,
+    MergeFiles,
+    MoveFile,
+    TransferSupplementary,
+)
+
+PLAN_VERSION = 1
+# the actions that read a single file and write it somewhere else
+TRANSFERS = MoveFile | CopyFile | TransferSupplementary | CompressFile
+
+
+class StalePlanError(Exception):
+    """Raised when files that a plan reads changed after it was made."""
+
+
+def extraction_dir(plan_path: Path) -> Path:
+    """Return where archives are extracted for the plan at `plan_path`, so they outlive the run."""
+    return plan_path.with_name(f"{plan_path.name}.files")
+
+
+@dataclass(slots=True, kw_only=True)
+class PlanFile:
+    command: str
+    config: dict[str, Any]
+    actions: list[dict[str, Any]]
+    # path -> [size, mtime] when the plan was made
+    sources: dict[str, list[float]] = field(default_factory=dict)
+
+    @classmethod
+    def create(
+        cls, command: str, config: Config, actions: list[PlannedAction], index: FileIndex
+    ) -> "PlanFile":
+        sources: dict[str, list[float]] = {}
+        for action in actions:
+            for path in _sources(action):
+                if str(path.absolute()) in sources or (entry := index.get(path)) is None:
+                    continue
+                # a folder's own mtime only changes when its entries do, so the files inside a
+                # folder, like a class's supplementary files, are recorded one by one as well
+                entries = [entry, *index.walk([path])] if entry.is_dir else [entry]
+                for entry in entries:
+                    sources[str(entry.path.absolute())] = [entry.size, entry.mtime]
+        # paths are made absolute, so the plan can be applied from any directory
+        absolute = {name: _absolute(value) for name, value in config}
+        return cls(
+            command=command,
+            config=config.model_copy(update=absolute).model_dump(mode="json"),
+            actions=[_dump_action(action) for action in actions],
+            sources=sources,
+        )
+
+    @classmethod
+    def read(cls, path: Path) -> "PlanFile":
+        data = json.loads(path.read_text())
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported plan version in {str(path)}: {data.get('version')}")
+        return cls(
+            command=data["command"],
+            config=data["config"],
+            actions=data["actions"],
+            sources=data["sources"],
+        )
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": PLAN_VERSION,
+            "command": self.command,
+            "config": self.config,
+            "sources": self.sources,
+            "actions": self.actions,
+        }
+        path.write_text(json.dumps(data, separators=(",", ":")))
+
+    def stale_sources(self, index: FileIndex) -> list[str]:
+        """Return the sources that are missing or have a different size or modification time."""
+        stale: list[str] = []
+        for path, (size, mtime) in self.sources.items():
+            entry = index.get(Path(path))
+            if entry is None or entry.size != size or entry.mtime != mtime:
+                stale.append(path)
+        return stale
+
+    def check(self, index: FileIndex) -> None:
+        """Raise a `StalePlanError` if any of the sources changed."""
+        if stale := self.stale_sources(index):
+            shown = ", ".join(stale[:10])
+            if len(stale) > 10:
+                shown += f" and {len(stale) - 10} more"
+            raise StalePlanError(
+                f"{len(stale)} files changed since the plan was made, make a new one: {shown}"
+            )
+
+    def load_actions(
+        self, index: FileIndex, blobs: BlobStore, delta: DeltaBatch | None = None
+    ) -> list[PlannedAction]:
+        return [_load_action(data, index, blobs, delta) for data in self.actions]
+
+
+def _sources(action: PlannedAction) -> list[Path]:
+    metadatas: list[FileMetadata]
+    if isinstance(action, MergeFiles | ConcatFiles):
+        metadatas = action.metadatas
+    elif isinstance(action, DeleteFile | TRANSFERS):
+        metadatas = [action.metadata]
+    else:
+        return []
+    paths = [metadata.path for metadata in metadatas]
+    # an archive that changed may have different members than the ones extracted
+    paths += [m.archive_path for m in metadatas if isinstance(m, ZipFileMetadata)]
+    return paths
+
+
+def _absolute(value: Any) -> Any:
+    if isinstance(value, Path):
+        return value.absolute()
+    if isinstance(value, list):
+        return [_absolute(item) for item in value]
+    return value
+
+
+def _dump_action(action: PlannedAction) -> dict[str, Any]:
+    data: dict[str, Any] = {"action": type(action).__name__}
+    if isinstance(action, MergeFiles | ConcatFiles):
+        data["metadatas"] = [_dump_metadata(metadata) for metadata in action.metadatas]
+        data["output_path"] = str(action.output_path.absolute())
+        data["output_format"] = str(action.output_format)
+        data["ipc_compression"] = str(action.ipc_compression)
+        data["normalize"] = action.normalize
+        data["rollup"] = action.rollup
+    if isinstance(action, MergeFiles):
+        data["unique_by"] = action.unique_by
+        data["shard"] = str(action.shard) if action.shard else None
+        data["delta"] = action.delta is not None
+        data["key_filter"] = asdict(action.key_filter) if action.key_filter else None
+    if isinstance(action, IgnoreLegacyFile | DeleteFile | TRANSFERS):
+        data["metadata"] = _dump_metadata(action.metadata)
+    if isinstance(action, TRANSFERS):
+        data["output_path"] = str(action.output_path.absolute())
+        data["ignore_duplicates"] = action.ignore_duplicates
+    if isinstance(action, TransferSupplementary | CompressFile):
+        data["move"] = action.move
+    if isinstance(action, CompressFile):
+        data["compression"] = str(action.compression)
+    if len(data) == 1:
+        raise ValueError(f"Cannot write {type(action).__name__} to a plan file")
+    return data
+
+
+def _load_action(
+    data: dict[str, Any], index: FileIndex, blobs: BlobStore, delta: DeltaBatch | None
+) -> PlannedAction:
+    match data["action"]:
+        case "MergeFiles":
+            return MergeFiles(
+                [_load_metadata(metadata) for metadata in data["metadatas"]],
+                Path(data["output_path"]),
+                unique_by=data["unique_by"],
+                output_format=DataFormat(data["output_format"]),
+                ipc_compression=IpcCompression(data["ipc_compression"]),
+                shard=Shard.parse(data["shard"]) if data["shard"] else None,
+                normalize=data["normalize"],
+                delta=delta if data["delta"] else None,
+                rollup=data["rollup"],
+                key_filter=KeyFilterSettings(**data["key_filter"]) if data["key_filter"] else None,
+                index=index,
+            )
+        case "ConcatFiles":
+            return ConcatFiles(
+                [_load_metadata(metadata) for metadata in data["metadatas"]],
+                Path(data["output_path"]),
+                output_format=DataFormat(data["output_format"]),
+                ipc_compression=IpcCompression(data["ipc_compression"]),
+                normalize=data["normalize"],
+                rollup=data["rollup"],
+                index=index,
+            )
+        case "MoveFile":
+            metadata = _load_metadata(data["metadata"])
+            output = Path(data["output_path"])
+            return MoveFile(metadata, output, data["ignore_duplicates"], index)
+        case "CopyFile":
+            metadata = _load_metadata(data["metadata"])
+            output = Path(data["output_path"])
+            return CopyFile(metadata, output, data["ignore_duplicates"], index)
+        case "TransferSupplementary":
+            return TransferSupplementary(
+                _load_metadata(data["metadata"]),
+                Path(data["output_path"]),
+                blobs,
+                move=data["move"],
+                ignore_duplicates=data["ignore_duplicates"],
+                index=index,
+            )
+        case "CompressFile":
+            return CompressFile(
+                _load_metadata(data["metadata"]),
+                Path(data["output_path"]),
+                Compression(data["compression"]),
+                move=data["move"],
+                ignore_duplicates=data["ignore_duplicates"],
+                index=index,
+            )
+        case "DeleteFile":
+            return DeleteFile(_load_metadata(data["metadata"]), index)
+        case "IgnoreLegacyFile":
+            return IgnoreLegacyFile(_load_metadata(data["metadata"]))
+    raise ValueError(f"Unknown action in plan file: {data['action']}")
+
+
+def _dump_metadata(metadata: FileMetadata) -> dict[str, Any]:
+    data: dict[str, Any] = {"path": str(metadata.path.absolute()), "type": str(metadata.type)}
+    for name in ("class_id", "size", "mtime"):
+        if (value := getattr(metadata, name)) is not None:
+            data[name] = value
+    if isinstance(metadata, ZipFileMetadata):
+        data["archive_path"] = str(metadata.archive_path.absolute())
+        data["member_path"] = metadata.member_path
+    return data
+
+
+def _load_metadata(data: dict[str, Any]) -> FileMetadata:
+    kind = data["type"]
+    fields = {
+        "path": Path(data["path"]),
+        "type": (
+            DataType(kind)
+            if kind in DataType
+            else LegacyDataType(kind)
+            if kind in LegacyDataType
+            else "supplementary"
+        ),
+        "class_id": data.get("class_id"),
+        "size": data.get("size"),
+        "mtime": data.get("mtime"),
+    }
+    if "archive_path" in data:
+        return ZipFileMetadata(
+            **fields, archive_path=Path(data["archive_path"]), member_path=data["member_path"]
+        )
+    return FileMetadata(**fields)
@@ -0,0 +1,40 @@
+from typing import Any, final
+
+import polars as pl
+from pydantic import DirectoryPath, FilePath
+
+from mo.domain.config import Config
+from mo.domain.data_format import DataFormat
+from mo.domain.data_types import DataType
+from mo.usecases.usecase import DataReadingUseCase
+
+
+class Input(Config):
+    inputs: list[DirectoryPath | FilePath]
+    data_type: DataType
+    sql: str = "SELECT * FROM data"
+    limit: int = 1000
+
+
+@final
+class QueryUseCase(DataReadingUseCase):
+    """Run a SQL query over the organized or compressed data of one type.
+
+    The newest file of the type in each input directory is loaded lazily and exposed to the query
+    as the table `data`.
+    """
+
+    Input = Input
+
+    def __init__(self, config: Input) -> None:
+        super().__init__()
+        self.config = config
+
+    def execute(self) -> list[dict[str, Any]]:
+        paths = self._find_data(self.config.inputs, self.config.data_type, list(DataFormat))
+        if not paths:
+            return []
+        data = self._load_data(self.config.data_type, paths)
+        with pl.SQLContext({"data": data}) as context:
+            result = context.execute(self.config.sql)
+        return result.limit(self.config.limit).collect().to_dicts()
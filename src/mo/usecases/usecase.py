@@ -8,8 +8,18 @@ from zipfile import ZipFile
 
 import polars as pl
 
+from mo.domain.config import Config
 from mo.domain.data_format import DataFormat
 from mo.domain.data_types import SCHEMAS, DataType, SchemaDict
+from mo.domain.file_names import FILE_NAMES
+from mo.domain.io_backend import IoBackend
+from mo.domain.shard import Shard
+from mo.profiling import record_plan
+from mo.services.class_ids import DEFAULT_CLASS_ID_PATTERN, ClassIdResolver
+from mo.services.compression import write_csv
+from mo.services.consistency import ConsistencyService
+from mo.services.dictionaries import DictionaryService
+from mo.services.file_index import FileIndex, keep_newest
 
 
 class UseCase(ABC):
@@ -21,24 +31,62 @@ class UseCase(ABC):
         """Executes the use case."""
 
 
+class DiscoveryInput(Config):
+    output: Path
+    class_id_pattern: str | None = DEFAULT_CLASS_ID_PATTERN
+    class_id_check_every: int = 20
+    io_backend: IoBackend = IoBackend.SYNC
+    io_concurrency: int = 32
+    consistency_report: Path | None = None
+    shard: Shard | None = None
+
+
+class DiscoveryUseCase(UseCase):
+    """A use case that discovers the data files of classes in its inputs."""
+
+    config: DiscoveryInput
+
+    def class_id_resolver(self) -> ClassIdResolver | None:
+        if self.config.class_id_pattern is None:
+            return None
+        return ClassIdResolver(self.config.class_id_pattern, self.config.class_id_check_every)
+
+    def check_consistency(self) -> None:
+        """Compare the classes listed in the output with the classes that have data in it."""
+        # a shard has every class listed but only some of their data; `mo merge-shards` checks
+        if not self.config.output.exists() or self.config.shard:
+            return
+        # the plan changed the output, so it is walked afresh
+        index = FileIndex(self.config.io_backend, self.config.io_concurrency)
+        report = ConsistencyService(index).check(self.config.output)
+        report.log(self.log)
+        if self.config.consistency_report:
+            report.write(self.config.consistency_report)
+
+
 class DataReadingUseCase(UseCase):
     def _find_data(
-        self, input_dirs: list[Path], data_type: DataType, formats: list[DataFormat]
+        self,
+        input_dirs: list[Path],
+        data_type: DataType,
+        formats: list[DataFormat],
+        index: FileIndex | None = None,
     ) -> list[Path]:
-        seen: dict[Path, Path] = {}
-        dtype_targets = self._targets([data_type], formats)
-        for input_dir in input_dirs:
-            for pattern in dtype_targets:
-                for target in input_dir.rglob(pattern):
-                    if (
-                        target.parent not in seen
-                        or target.stat().st_mtime > seen[target.parent].stat().st_mtime
-                    ):
-                        seen[target.parent] = target
-        return list(seen.values())
+        """Find the newest file of `data_type` in each directory under `input_dirs`."""
+        index = index or FileIndex()
+        names = set(self._targets([data_type], formats))
+        candidates = [
+            entry
+            for entry in index.walk(input_dirs)
+            if not entry.is_dir and entry.path.name in names
+        ]
+        newest = keep_newest(
+            candidates, key=lambda entry: entry.path.parent, mtime=lambda entry: entry.mtime
+        )
+        return [entry.path for entry in newest]
 
     def _targets(self, dtypes: list[DataType], formats: list[DataFormat]) -> list[str]:
-        return [f"{dtype.value}.{format.value}" for dtype in dtypes for format in formats]
+        return FILE_NAMES.file_names(dtypes, formats)
 
     def _unpack_targets(self, zip_file: Path, targets: list[str]) -> None:
         self.log.debug(f"Unpacking {str(zip_file)} for {targets}")
@@ -51,19 +99,24 @@ class DataReadingUseCase(UseCase):
 
     def _load_data(self, dtype: DataType, inputs: list[Path]) -> pl.LazyFrame:
         self.log.debug(f"Loading {dtype} data from {[str(i) for i in inputs]}")
-        return self._concat_data(self._read_data(input, dtype) for input in inputs)
+        data = self._concat_data(self._read_data(input, dtype) for input in inputs)
+        record_plan(f"{self.__class__.__name__} load {dtype}", data)
+        return data
 
     def _concat_data(self, dfs: Iterable[pl.LazyFrame]) -> pl.LazyFrame:
         return reduce(lambda x, y: pl.concat([x, y], how="diagonal_relaxed"), dfs)
 
     def _read_data(self, input: Path, dtype: DataType) -> pl.LazyFrame:
         self.log.debug(f"Reading {str(input)}")
-        format = DataFormat(input.suffix[1:])
+        format = FILE_NAMES.identify_format(input)
         if format is DataFormat.CSV:
             return self._read_csv(input, SCHEMAS.get(dtype, {}))
         elif format is DataFormat.PARQUET:
-            return self._read_parquet(input)
-        raise ValueError(f"Unsupported data format: {format}")
+            # a normalized table has its dictionary values joined back in
+            return DictionaryService().decode(self._read_parquet(input), input)
+        elif format is DataFormat.ARROW:
+            return DictionaryService().decode(self._read_arrow(input), input)
+        raise ValueError(f"Unsupported data format: {str(input)}")
 
     def _read_csv(self, input: Path, schema: SchemaDict) -> pl.LazyFrame:
         try:
@@ -81,9 +134,15 @@ class DataReadingUseCase(UseCase):
     def _read_parquet(self, input: Path) -> pl.LazyFrame:
         return pl.scan_parquet(input).unique()
 
+    def _read_arrow(self, input: Path) -> pl.LazyFrame:
+        return pl.read_ipc(input, memory_map=True).lazy().unique()
+
     def _write_data(self, data: pl.LazyFrame, output_path: Path, output_format: DataFormat) -> None:
         self.log.debug(f"Writing data to {str(output_path)}")
+        record_plan(f"{self.__class__.__name__} write -> {str(output_path)}", data)
         if output_format is DataFormat.PARQUET:
             data.collect(streaming=True).write_parquet(output_path)
         elif output_format is DataFormat.CSV:
-            data.collect(streaming=True).write_csv(output_path)
+            write_csv(data.collect(streaming=True), output_path)
+        elif output_format is DataFormat.ARROW:
+            data.collect(streaming=True).write_ipc(output_path)
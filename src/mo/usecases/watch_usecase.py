@@ -0,0 +1,112 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import final
+
+from pydantic import DirectoryPath, FilePath
+
+from mo.domain.config import Config
+from mo.domain.data_types import DataType
+from mo.domain.file_names import FILE_NAMES
+from mo.services.archives import is_archive
+from mo.services.watcher import make_watcher
+from mo.usecases.usecase import UseCase
+
+
+class Input(Config):
+    inputs: list[DirectoryPath | FilePath]
+    output: Path
+    settle: float = 2.0
+    poll_interval: float = 1.0
+    polling: bool = False
+
+
+@final
+class WatchUseCase(UseCase):
+    """Process the inputs once, then keep processing whatever lands in them.
+
+    Changed files are grouped into the smallest input that can be processed on its own: an
+    archive, a `classes.csv`, the class folder containing a data file or `supplementary` folder,
+    or a data file given as an input or lying directly in one. A group is processed once none of
+    its files has changed for `settle` seconds, so downloads that are still being written are left
+    alone, and only the affected groups are handed to `run` instead of the whole input
+    directories.
+    """
+
+    Input = Input
+
+    def __init__(self, config: Input, run: Callable[[list[Path]], None]) -> None:
+        super().__init__()
+        self.config = config
+        self.run = run
+        self.output = config.output.resolve()
+
+    def execute(self) -> None:
+        # start watching before the first run, so that nothing landing during it is missed
+        watcher = make_watcher(
+            self.config.inputs,
+            ignore=self.is_output,
+            polling=self.config.polling,
+            interval=self.config.poll_interval,
+        )
+        try:
+            self.run(list(self.config.inputs))
+            self.log.info(f"Watching {[str(i) for i in self.config.inputs]} for new files")
+            self.watch(watcher.poll)
+        except KeyboardInterrupt:
+            self.log.info("Stopped watching")
+        finally:
+            watcher.close()
+
+    def watch(self, poll: Callable[[float], set[Path]]) -> None:
+        pending: dict[Path, float] = {}
+        while True:
+            timeout = self.config.settle
+            if pending:
+                timeout = max(0.0, min(pending.values()) + self.config.settle - time.monotonic())
+            changed = poll(timeout)
+
+            now = time.monotonic()
+            for path in changed:
+                if unit := self.unit_of(path):
+                    pending[unit] = now
+
+            settled = [unit for unit, last in pending.items() if now - last >= self.config.settle]
+            for unit in settled:
+                del pending[unit]
+            if units := self.outermost([unit for unit in settled if unit.exists()]):
+                self.log.info(f"Processing {[str(unit) for unit in units]}")
+                try:
+                    self.run(units)
+                except Exception:
+                    # one bad download must not stop the watch
+                    self.log.exception(f"Failed to process {[str(unit) for unit in units]}")
+
+    def unit_of(self, path: Path) -> Path | None:
+        """Return the smallest input that `path` can be processed as part of, if any."""
+        if is_archive(path):
+            return path
+        parts = path.parts
+        if "supplementary" in parts[:-1]:
+            index = len(parts) - 1 - parts[::-1].index("supplementary")
+            return Path(*parts[:index])
+        data_type = FILE_NAMES.identify_type(path)
+        if data_type is None:
+            return None
+        if data_type in (DataType.CLASSES, DataType.MANIFEST) or path in self.config.inputs:
+            return path
+        if path.parent in self.config.inputs:
+            # the parent is the whole inbox rather than a class folder
+            return path
+        return path.parent
+
+    def is_output(self, path: Path) -> bool:
+        return path.resolve().is_relative_to(self.output)
+
+    def outermost(self, units: list[Path]) -> list[Path]:
+        """Drop the units that are inside another unit, which processes them already."""
+        return [
+            unit
+            for unit in units
+            if not any(other != unit and unit.is_relative_to(other) for other in units)
+        ]
@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.domain.data_types import DataType
+
+from .samples import sample_data, write_class
+
+
+@pytest.fixture
+def exports(tmp_path: Path) -> Path:
+    """A download of the classes `c1` and `c2`, with a class list."""
+    root = tmp_path / "exports"
+    for class_id in ("c1", "c2"):
+        write_class(root, class_id)
+    pl.concat(sample_data(DataType.CLASSES, class_id, 1) for class_id in ("c1", "c2")).write_csv(
+        root / "classes.csv"
+    )
+    return root
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import polars as pl
+
+from mo.domain.data_types import SCHEMAS, DataType
+
+INTERACTIONS = [DataType.RESPONSES, DataType.PAGE_VIEWS, DataType.MEDIA_VIEWS]
+
+
+def sample_data(data_type: DataType, class_id: str | None, rows: int = 3) -> pl.DataFrame:
+    """Return `rows` rows of `data_type` for the class `class_id`, with every column filled."""
+    columns = {}
+    for column, dtype in SCHEMAS[data_type].items():
+        if column == "class_id":
+            columns[column] = pl.Series([class_id] * rows, dtype=pl.Utf8)
+        elif dtype == pl.Int64:
+            columns[column] = pl.Series(range(rows), dtype=dtype)
+        elif dtype == pl.Float64:
+            columns[column] = pl.Series([0.5] * rows, dtype=dtype)
+        elif dtype == pl.Boolean:
+            columns[column] = pl.Series([True] * rows, dtype=dtype)
+        else:
+            columns[column] = pl.Series([f"{column}-{class_id}-{i}" for i in range(rows)])
+    return pl.DataFrame(columns)
+
+
+def write_class(root: Path, class_id: str, data_types: list[DataType] = INTERACTIONS) -> Path:
+    """Write an export of the class `class_id` to its folder in `root` and return the folder."""
+    folder = root / class_id
+    folder.mkdir(parents=True, exist_ok=True)
+    for data_type in data_types:
+        sample_data(data_type, class_id).write_csv(folder / f"{data_type.value}.csv")
+    return folder
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.domain.data_types import DataType
+from mo.domain.shard import Shard
+from mo.services.class_ids import ClassIdResolver
+from mo.services.file_access import FileAccessService
+from mo.services.file_discovery import FileDiscoveryService
+from mo.services.parsing import DataParsingService
+from mo.services.validation import ValidationService
+
+from .samples import sample_data
+
+
+def write_responses(folder: Path, *class_ids: str) -> Path:
+    """Write responses of `class_ids` to `folder`, whose name may say they're of another class."""
+    path = folder / "responses.csv"
+    folder.mkdir(parents=True)
+    pl.concat(sample_data(DataType.RESPONSES, class_id) for class_id in class_ids).write_csv(path)
+    return path
+
+
+@pytest.fixture
+def discovery(tmp_path: Path):
+    with FileAccessService() as files:
+        yield FileDiscoveryService(
+            [],
+            DataParsingService(),
+            ValidationService(files),
+            tmp_path / "extracted",
+            ClassIdResolver(r"class-\d", check_every=2),
+        )
+
+
+def test_failed_check_revalidates_files_resolved_since_the_last_pass(tmp_path, discovery):
+    passing = discovery.process_data_file(write_responses(tmp_path / "class-1", "class-1"))
+    trusted = discovery.process_data_file(write_responses(tmp_path / "class-2", "other-2"))
+    assert trusted and trusted.class_id == "class-2"
+
+    failing = discovery.process_data_file(write_responses(tmp_path / "class-3", "other-3"))
+
+    assert passing and passing.class_id == "class-1"
+    assert trusted.class_id == "other-2"
+    assert failing and failing.class_id == "other-3"
+    assert not discovery.class_id_resolver.trusted
+
+
+def test_revalidation_drops_files_of_several_classes(tmp_path, discovery):
+    discovery.process_data_file(write_responses(tmp_path / "class-1", "class-1"))
+    trusted = discovery.process_data_file(write_responses(tmp_path / "class-2", "class-2", "c9"))
+    assert trusted and trusted.class_id == "class-2"
+
+    discovery.process_data_file(write_responses(tmp_path / "class-3", "other-3"))
+
+    # without a class ID, discovery drops it with the other unidentifiable files
+    assert trusted.class_id is None
+
+
+def test_check_rejects_a_file_of_several_classes(tmp_path, discovery):
+    several = write_responses(tmp_path / "class-1", "class-1", "class-2")
+
+    assert discovery.process_data_file(several) is None
+    assert not discovery.class_id_resolver.trusted
+
+
+def test_shard_keeps_a_file_whose_folder_puts_it_in_another_shard(tmp_path: Path):
+    # class-1 is in shard 1/2 and other-1 in shard 2/2
+    misplaced = write_responses(tmp_path / "inputs" / "class-1", "other-1")
+    with FileAccessService() as files:
+        discovery = FileDiscoveryService(
+            [tmp_path / "inputs"],
+            DataParsingService(),
+            ValidationService(files),
+            tmp_path / "extracted",
+            ClassIdResolver(r"class-\d", check_every=None),
+            shard=Shard(2, 2),
+        )
+
+        discovered = list(discovery.discover())
+
+    assert [(metadata.path, metadata.class_id) for metadata in discovered] == [
+        (misplaced, "other-1")
+    ]
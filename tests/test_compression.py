@@ -0,0 +1,51 @@
+import gzip
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.domain.data_format import Compression
+from mo.domain.data_types import DataType
+from mo.services import compression
+from mo.services.file_access import FileAccessService
+from mo.usecases.organize_usecase import OrganizeUseCase
+
+from .samples import sample_data
+
+
+def test_header_of_a_compressed_file_is_read_from_its_first_line(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    path = tmp_path / "responses.csv.gz"
+    data = sample_data(DataType.RESPONSES, "c1")
+    with gzip.open(path, "wb") as file:
+        data.write_csv(file)
+    monkeypatch.setattr(pl, "read_csv", None)
+
+    with FileAccessService() as files:
+        assert files.header(path) == data.columns
+
+
+def test_organize_refuses_zstd_it_cannot_write(
+    exports: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(compression, "zstd_module", lambda: None)
+    config = OrganizeUseCase.Input(
+        inputs=[exports], output=tmp_path / "organized", compression=Compression.ZSTD
+    )
+
+    with pytest.raises(ValueError, match="zstandard"):
+        OrganizeUseCase(config).execute()
+
+    assert not (tmp_path / "organized").exists()
+
+
+def test_organize_compresses_with_gzip(exports: Path, tmp_path: Path):
+    config = OrganizeUseCase.Input(
+        inputs=[exports], output=tmp_path / "organized", move=False, compression=Compression.GZIP
+    )
+
+    OrganizeUseCase(config).execute()
+
+    organized = pl.read_csv(tmp_path / "organized" / "c1" / "responses.csv.gz")
+    assert organized.get_column("class_id").to_list() == ["c1"] * 3
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import pytest
+
+from mo.usecases.organize_usecase import OrganizeUseCase
+
+
+@pytest.fixture
+def handouts(exports: Path) -> Path:
+    """The same handout in the supplementary folders of both classes."""
+    for class_id in ("c1", "c2"):
+        folder = exports / class_id / "supplementary"
+        folder.mkdir()
+        (folder / "handout.txt").write_text("the same handout")
+    return exports
+
+
+def organize(inputs: Path, output: Path, **config) -> tuple[Path, Path]:
+    OrganizeUseCase(
+        OrganizeUseCase.Input(inputs=[inputs], output=output, move=False, **config)
+    ).execute()
+    return tuple(output / class_id / "supplementary" / "handout.txt" for class_id in ("c1", "c2"))
+
+
+def test_copies_are_separate_by_default(handouts: Path, tmp_path: Path):
+    first, second = organize(handouts, tmp_path / "organized")
+
+    assert first.stat().st_ino != second.stat().st_ino
+    first.write_text("edited")
+    assert second.read_text() == "the same handout"
+
+
+def test_dedup_hardlinks_identical_files(handouts: Path, tmp_path: Path):
+    first, second = organize(handouts, tmp_path / "organized", dedup_supplementary=True)
+
+    assert first.stat().st_ino == second.stat().st_ino
@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.domain.data_types import DataType
+from mo.services.delta import LOG_NAME, DeltaBatch
+from mo.usecases.actions import MergeFiles
+from mo.usecases.compress_usecase import CompressUseCase
+
+from .samples import INTERACTIONS, sample_data
+
+
+def committed(directory: Path, data_type: DataType) -> pl.DataFrame:
+    """Return the rows of `data_type` in every committed batch."""
+    lines = (directory / LOG_NAME).read_text().splitlines()
+    paths = [directory / json.loads(line)["path"] / f"{data_type.value}.parquet" for line in lines]
+    return pl.concat(pl.read_parquet(path) for path in paths if path.exists())
+
+
+def test_next_batch_takes_over_uncommitted_rows(tmp_path: Path):
+    failed = DeltaBatch(tmp_path)
+    failed.add(DataType.RESPONSES, sample_data(DataType.RESPONSES, "c1").lazy())
+
+    batch = DeltaBatch(tmp_path)
+    batch.add(DataType.RESPONSES, sample_data(DataType.RESPONSES, "c2").lazy())
+    batch.add(DataType.PAGE_VIEWS, sample_data(DataType.PAGE_VIEWS, "c2").lazy())
+
+    assert batch.commit()
+    assert batch.batch_id == 1
+    assert batch.rows == {"responses": 6, "page_views": 3}
+    assert committed(tmp_path, DataType.RESPONSES).get_column("class_id").unique().len() == 2
+
+
+def test_rows_of_a_failed_compress_are_delivered_by_the_next(
+    exports: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    output, delta = tmp_path / "output", tmp_path / "delta"
+    config = CompressUseCase.Input(inputs=[exports], output=output, emit_delta=delta)
+    execute = MergeFiles.execute
+
+    def fail_after_first(action: MergeFiles) -> None:
+        if any((output / f"{data_type.value}.parquet").exists() for data_type in INTERACTIONS):
+            raise OSError("disk full")
+        execute(action)
+
+    monkeypatch.setattr(MergeFiles, "execute", fail_after_first)
+    with pytest.raises(OSError):
+        CompressUseCase(config).execute()
+    monkeypatch.undo()
+
+    CompressUseCase(config).execute()
+
+    for data_type in INTERACTIONS:
+        table = output / f"{data_type.value}.parquet"
+        delivered = committed(delta, data_type).unique()
+        assert delivered.sort(pl.all()).equals(pl.read_parquet(table).sort(pl.all()))
@@ -0,0 +1,70 @@
+import gzip
+from collections import Counter
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.services import file_access
+from mo.usecases.compress_usecase import CompressUseCase
+
+
+@pytest.fixture
+def reads(monkeypatch: pytest.MonkeyPatch) -> tuple[Counter[str], Counter[str]]:
+    """Count the opens of FileAccessService and the CSV parses of polars, by file name."""
+    opens: Counter[str] = Counter()
+    parses: Counter[str] = Counter()
+    real_open, real_scan_csv, real_read_csv = open, pl.scan_csv, pl.read_csv
+
+    def count_open(path, *args, **kwargs):
+        opens[Path(path).name] += 1
+        return real_open(path, *args, **kwargs)
+
+    def count_scan_csv(source, *args, **kwargs):
+        parses[Path(source).name] += 1
+        return real_scan_csv(source, *args, **kwargs)
+
+    def count_read_csv(source, *args, **kwargs):
+        parses[Path(source).name] += 1
+        return real_read_csv(source, *args, **kwargs)
+
+    monkeypatch.setattr(file_access, "open", count_open, raising=False)
+    monkeypatch.setattr(pl, "scan_csv", count_scan_csv)
+    monkeypatch.setattr(pl, "read_csv", count_read_csv)
+    return opens, parses
+
+
+def test_compress_reads_each_file_once(exports: Path, tmp_path: Path, reads):
+    opens, parses = reads
+    output = tmp_path / "compressed"
+
+    CompressUseCase(CompressUseCase.Input(inputs=[exports], output=output)).execute()
+
+    assert pl.read_parquet(output / "responses.parquet").height == 6
+    # every file is mapped once for its header, the interaction files have their class IDs parsed
+    # once during validation, and every file is parsed in full once by the merge
+    for data_type in ("responses", "page_views", "media_views"):
+        assert opens[f"{data_type}.csv"] == 2  # one per class
+        assert parses[f"{data_type}.csv"] == 4
+    assert opens["classes.csv"] == 1
+    assert parses["classes.csv"] == 1
+
+
+def test_compress_reads_each_compressed_file_once(exports: Path, tmp_path: Path, reads):
+    opens, parses = reads
+    for path in list(exports.rglob("*.csv")):
+        with gzip.open(path.with_name(f"{path.name}.gz"), "wb") as file:
+            file.write(path.read_bytes())
+        path.unlink()
+    output = tmp_path / "compressed"
+
+    CompressUseCase(CompressUseCase.Input(inputs=[exports], output=output)).execute()
+
+    assert pl.read_parquet(output / "responses.parquet").height == 6
+    # the header comes from the first line of a streaming decompressor, and the files are
+    # decompressed in full once for their class IDs and once by the merge, like plain files
+    for data_type in ("responses", "page_views", "media_views"):
+        assert opens[f"{data_type}.csv.gz"] == 2  # one per class
+        assert parses[f"{data_type}.csv.gz"] == 4
+    assert opens["classes.csv.gz"] == 1
+    assert parses["classes.csv.gz"] == 1
@@ -0,0 +1,83 @@
+import os
+import stat
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from mo.services.file_index import FileIndex
+from mo.usecases.organize_usecase import OrganizeUseCase
+
+from .samples import INTERACTIONS
+
+
+@pytest.fixture
+def stats(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Counter[str]:
+    """Count the calls of os.stat and os.lstat on the paths of the test, relative to its root."""
+    calls: Counter[str] = Counter()
+    real_stat, real_lstat = os.stat, os.lstat
+
+    def count(path) -> None:
+        if (name := os.fspath(path)).startswith(f"{tmp_path}{os.sep}"):
+            calls[os.path.relpath(name, tmp_path)] += 1
+
+    def count_stat(path, *args, **kwargs):
+        count(path)
+        return real_stat(path, *args, **kwargs)
+
+    def count_lstat(path, *args, **kwargs):
+        count(path)
+        return real_lstat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", count_stat)
+    monkeypatch.setattr(os, "lstat", count_lstat)
+    return calls
+
+
+def organize(inputs: Path, output: Path) -> None:
+    OrganizeUseCase(OrganizeUseCase.Input(inputs=[inputs], output=output, move=False)).execute()
+
+
+def test_organize_stats_each_path_at_most_twice(exports: Path, tmp_path: Path, stats):
+    output = tmp_path / "organized"
+
+    organize(exports, output)
+
+    assert (output / "c1" / "responses.csv").exists()
+    # the roots are looked up by every stage, but the walks list the files, and the copies only
+    # stat their sources to copy their permissions
+    roots = {"exports", "organized"}
+    assert {path: count for path, count in stats.items() if count > 2}.keys() <= roots
+    assert all(stats[f"exports/c1/{data_type}.csv"] == 1 for data_type in INTERACTIONS)
+
+
+def test_organize_again_only_stats_the_roots(exports: Path, tmp_path: Path, stats):
+    output = tmp_path / "organized"
+    organize(exports, output)
+    stats.clear()
+
+    organize(exports, output)
+
+    # nothing is copied again, and everything else is answered by the walks
+    assert stats.keys() <= {"exports", "organized"}
+
+
+def test_copy_keeps_permissions(exports: Path, tmp_path: Path):
+    source = exports / "c1" / "responses.csv"
+    source.chmod(0o640)
+
+    organize(exports, tmp_path / "organized")
+
+    copied = tmp_path / "organized" / "c1" / "responses.csv"
+    assert stat.S_IMODE(copied.stat().st_mode) == 0o640
+
+
+def test_index_forgets_invalidated_paths(tmp_path: Path):
+    index = FileIndex()
+    index.walk([tmp_path])
+    assert not index.exists(tmp_path / "new.csv")
+
+    (tmp_path / "new.csv").write_text("class_id\n")
+    index.invalidate(tmp_path / "new.csv")
+
+    assert index.exists(tmp_path / "new.csv")
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import polars as pl
+
+from mo.services.key_filter import KeyFilterService
+from mo.usecases.compress_usecase import CompressUseCase
+
+from .samples import write_class
+
+
+def compress(inputs: Path, output: Path, key_filter: bool) -> None:
+    config = CompressUseCase.Input(inputs=[inputs], output=output, key_filter=key_filter)
+    CompressUseCase(config).execute()
+
+
+def test_compress_without_key_filter_drops_the_stale_filter(exports: Path, tmp_path: Path):
+    output = tmp_path / "output"
+    table = output / "responses.parquet"
+    filter_path = KeyFilterService().filter_path(table)
+    more = write_class(tmp_path / "more", "c3").parent
+    compress(exports, output, key_filter=True)
+    assert filter_path.exists()
+
+    compress(more, output, key_filter=False)
+
+    assert not filter_path.exists()
+    assert not filter_path.with_suffix(".json").exists()
+
+    compress(more, output, key_filter=True)
+
+    responses = pl.read_parquet(table)
+    assert responses.height == responses.unique().height == 9
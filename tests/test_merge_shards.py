@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.domain.data_types import DataType
+from mo.domain.file_metadata import FileMetadata
+from mo.services.compression import write_csv
+from mo.services.key_filter import KEY_FILTER_DIR
+from mo.usecases.actions import ConcatFiles
+from mo.usecases.merge_shards_usecase import MergeShardsUseCase
+
+from .samples import sample_data
+
+
+def write_shard(root: Path, class_id: str) -> Path:
+    """Write the merged responses of a compressed shard that handled `class_id`."""
+    root.mkdir(parents=True)
+    sample_data(DataType.RESPONSES, class_id).write_parquet(root / "responses.parquet")
+    return root
+
+
+def merge_shards(shards: list[Path], output: Path, move: bool = False) -> None:
+    MergeShardsUseCase(MergeShardsUseCase.Input(shards=shards, output=output, move=move)).execute()
+
+
+def test_merge_into_an_existing_output_keeps_its_rows(tmp_path: Path):
+    output = tmp_path / "output"
+    merge_shards([write_shard(tmp_path / "a", "c1"), write_shard(tmp_path / "b", "c2")], output)
+
+    merge_shards([write_shard(tmp_path / "c", "c3"), tmp_path / "b"], output)
+
+    responses = pl.read_parquet(output / "responses.parquet")
+    assert responses.height == 9
+    assert sorted(responses.get_column("class_id").unique()) == ["c1", "c2", "c3"]
+
+
+def test_merge_into_an_existing_output_deduplicates_on_the_keys_of_the_type(tmp_path: Path):
+    output = tmp_path / "output"
+    merge_shards([write_shard(tmp_path / "a", "c1")], output)
+    # the same responses again, with a column outside of the keys changed
+    shard = tmp_path / "b"
+    shard.mkdir()
+    changed = sample_data(DataType.RESPONSES, "c1").with_columns(pl.lit("changed").alias("prompt"))
+    changed.write_parquet(shard / "responses.parquet")
+
+    merge_shards([shard], output)
+
+    assert pl.read_parquet(output / "responses.parquet").height == 3
+
+
+def test_move_deletes_the_shards_key_filters(tmp_path: Path):
+    shard = write_shard(tmp_path / "a", "c1")
+    key_filters = shard / KEY_FILTER_DIR
+    key_filters.mkdir()
+    for name in ("responses.bloom.parquet", "responses.bloom.json"):
+        (key_filters / name).write_text("")
+
+    merge_shards([shard], tmp_path / "output", move=True)
+
+    assert not any(key_filters.iterdir())
+    assert (tmp_path / "output" / "responses.parquet").exists()
+
+
+def test_merge_keeps_the_compression_of_organized_shards(tmp_path: Path):
+    shards = []
+    for class_id in ("c1", "c2"):
+        shard = tmp_path / class_id
+        shard.mkdir()
+        write_csv(sample_data(DataType.CLASSES, class_id, 1), shard / "classes.csv.gz")
+        shards.append(shard)
+
+    merge_shards(shards, tmp_path / "output")
+
+    assert not (tmp_path / "output" / "classes.csv").exists()
+    classes = pl.read_csv(tmp_path / "output" / "classes.csv.gz")
+    assert sorted(classes.get_column("class_id")) == ["c1", "c2"]
+
+
+def test_concat_refuses_an_existing_output(tmp_path: Path):
+    shard = write_shard(tmp_path / "a", "c1")
+    output = write_shard(tmp_path / "output", "c2") / "responses.parquet"
+    action = ConcatFiles(
+        [FileMetadata(path=shard / "responses.parquet", type=DataType.RESPONSES)], output
+    )
+
+    with pytest.raises(FileExistsError):
+        action.execute()
+
+    assert pl.read_parquet(output).get_column("class_id").unique().to_list() == ["c2"]
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from mo.services.parquet_footer import ROW_GROUPS, column_values, read_footer
+
+# FileMetaData.num_rows and RowGroup.num_rows
+NUM_ROWS = 3
+
+
+def write(path: Path, class_ids: list[str | None], **kwargs) -> Path:
+    """Write `class_ids` to `path` in row groups of two rows, unless told otherwise."""
+    frame = pl.DataFrame({"class_id": class_ids, "row": range(len(class_ids))})
+    frame.write_parquet(path, **{"row_group_size": 2, **kwargs})
+    return path
+
+
+def test_footer_counts_rows_and_row_groups(tmp_path: Path):
+    footer = read_footer(write(tmp_path / "c.parquet", ["c1"] * 6))
+
+    assert footer[NUM_ROWS] == 6
+    assert [row_group[NUM_ROWS] for row_group in footer[ROW_GROUPS]] == [2, 2, 2]
+
+
+def test_one_class(tmp_path: Path):
+    assert column_values(write(tmp_path / "c.parquet", ["c1"] * 4), "class_id") == ["c1"]
+
+
+def test_one_class_per_row_group(tmp_path: Path):
+    path = write(tmp_path / "c.parquet", ["c2", "c2", "c1", "c1", "c3", "c3"])
+
+    assert column_values(path, "class_id") == ["c1", "c2", "c3"]
+
+
+def test_row_group_of_several_classes_needs_the_data(tmp_path: Path):
+    assert column_values(write(tmp_path / "c.parquet", ["c1", "c2"]), "class_id") is None
+
+
+@pytest.mark.parametrize(
+    ("class_ids", "expected"),
+    [
+        # a row group of nulls only is skipped
+        (["c1", "c1", None, None], ["c1"]),
+        # a null beside a class leaves the minimum and maximum to that class
+        (["c1", None], ["c1"]),
+    ],
+)
+def test_null_class_ids(tmp_path: Path, class_ids: list[str | None], expected: list[str]):
+    assert column_values(write(tmp_path / "c.parquet", class_ids), "class_id") == expected
+
+
+def test_missing_statistics_need_the_data(tmp_path: Path):
+    path = write(tmp_path / "c.parquet", ["c1"] * 4, statistics=False)
+
+    assert column_values(path, "class_id") is None
+
+
+def test_unknown_column_needs_the_data(tmp_path: Path):
+    assert column_values(write(tmp_path / "c.parquet", ["c1"]), "missing") is None
+
+
+def test_not_parquet(tmp_path: Path):
+    path = tmp_path / "c.parquet"
+    path.write_text("class_id\nc1\n")
+
+    with pytest.raises(ValueError, match="Not a Parquet file"):
+        read_footer(path)
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from mo.domain.io_backend import IoBackend
+from mo.domain.plan import Plan, PlannedAction
+
+
+class Action(PlannedAction):
+    concurrent_safe = True
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception | None = None) -> None:
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.finished = threading.Event()
+
+    def execute(self) -> None:
+        time.sleep(self.delay)
+        self.finished.set()
+        if self.error:
+            raise self.error
+
+    def describe(self) -> str:
+        return self.name
+
+
+def test_failed_concurrent_action_waits_for_the_others_and_reports_them():
+    failing = Action("failing", error=OSError("first"))
+    slow = Action("slow", delay=0.3)
+    also_failing = Action("also failing", delay=0.1, error=ValueError("second"))
+
+    with pytest.raises(OSError, match="first") as raised:
+        Plan([failing, slow, also_failing]).execute(IoBackend.ASYNC)
+
+    assert slow.finished.is_set()
+    assert any("ValueError('second')" in note for note in raised.value.__notes__)
+
+
+def test_actions_after_a_failed_run_are_not_started():
+    after = Action("after")
+    after.concurrent_safe = False
+
+    with pytest.raises(OSError):
+        Plan([Action("failing", error=OSError("first")), after]).execute(IoBackend.ASYNC)
+
+    assert not after.finished.is_set()
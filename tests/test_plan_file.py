@@ -0,0 +1,91 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from mo.usecases.actions import MergeFiles
+from mo.usecases.apply_usecase import ApplyUseCase
+from mo.usecases.compress_usecase import CompressUseCase
+from mo.usecases.plan_file import PlanFile, StalePlanError, extraction_dir
+
+
+@pytest.fixture
+def supplementary(exports: Path) -> Path:
+    """A file in the supplementary folder of the class `c1`."""
+    path = exports / "c1" / "supplementary" / "notes.txt"
+    path.parent.mkdir()
+    path.write_text("first")
+    return path
+
+
+def plan(inputs: Path, output: Path, plan_out: Path) -> PlanFile:
+    config = CompressUseCase.Input(inputs=[inputs], output=output, plan_out=plan_out)
+    CompressUseCase(config).execute()
+    return PlanFile.read(plan_out)
+
+
+def test_files_in_supplementary_folders_are_sources(exports: Path, tmp_path: Path, supplementary):
+    plan_out = tmp_path / "plan.json"
+    sources = plan(exports, tmp_path / "output", plan_out).sources
+
+    assert str(supplementary) in sources
+    assert str(supplementary.parent) in sources
+
+
+def test_editing_a_supplementary_file_makes_the_plan_stale(
+    exports: Path, tmp_path: Path, supplementary
+):
+    plan_out = tmp_path / "plan.json"
+    plan(exports, tmp_path / "output", plan_out)
+    # the folder's own size and modification time stay the same
+    stat = supplementary.parent.stat()
+    supplementary.write_text("second")
+    os.utime(supplementary.parent, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    with pytest.raises(StalePlanError, match="notes.txt"):
+        ApplyUseCase(ApplyUseCase.Input(plan=plan_out)).execute()
+
+
+def test_sources_of_relative_inputs_are_absolute(
+    exports: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+
+    sources = plan(Path("exports"), Path("output"), tmp_path / "plan.json").sources
+
+    assert sources
+    assert all(Path(path).is_absolute() for path in sources)
+
+
+@pytest.fixture
+def download(exports: Path, tmp_path: Path) -> Path:
+    """The exports as a zip archive, whose members are extracted next to a plan."""
+    return Path(shutil.make_archive(str(tmp_path / "inbox" / "download"), "zip", exports)).parent
+
+
+def test_apply_deletes_the_extracted_files(download: Path, tmp_path: Path):
+    plan_out = tmp_path / "plan.json"
+    plan(download, tmp_path / "output", plan_out)
+    assert any(extraction_dir(plan_out).iterdir())
+
+    ApplyUseCase(ApplyUseCase.Input(plan=plan_out)).execute()
+
+    assert (tmp_path / "output" / "responses.parquet").exists()
+    assert not extraction_dir(plan_out).exists()
+
+
+def test_failed_apply_keeps_the_extracted_files(
+    download: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    plan_out = tmp_path / "plan.json"
+    plan(download, tmp_path / "output", plan_out)
+
+    def fail(action: MergeFiles) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(MergeFiles, "execute", fail)
+    with pytest.raises(OSError):
+        ApplyUseCase(ApplyUseCase.Input(plan=plan_out)).execute()
+
+    assert any(extraction_dir(plan_out).iterdir())
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import polars as pl
+
+from mo.services.rollups import RollupService
+from mo.usecases.compress_usecase import CompressUseCase
+
+from .samples import write_class
+
+
+def compress(inputs: Path, output: Path, rollups: bool) -> None:
+    config = CompressUseCase.Input(inputs=[inputs], output=output, rollups=rollups)
+    CompressUseCase(config).execute()
+
+
+def test_compress_without_rollups_drops_the_stale_rollup(exports: Path, tmp_path: Path):
+    output = tmp_path / "output"
+    table = output / "responses.parquet"
+    rollups = RollupService()
+    compress(exports, output, rollups=True)
+    assert rollups.rollup_path(table).exists()
+
+    compress(write_class(tmp_path / "more", "c3").parent, output, rollups=False)
+
+    assert not rollups.rollup_path(table).exists()
+
+    compress(exports, output, rollups=True)
+
+    expected = rollups.aggregate(pl.scan_parquet(table), table).collect()
+    rollup = pl.read_parquet(rollups.rollup_path(table))
+    assert rollup.sort(pl.all()).equals(expected.select(rollup.columns).sort(pl.all()))
+    assert set(rollup.get_column("class_id")) == {"c1", "c2", "c3"}
@@ -0,0 +1,85 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mo.server import Job, JobCommand, JobQueue, JobStatus, UnixJobServer
+from mo.usecases.compress_usecase import CompressUseCase
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(concurrency=1, keep_finished=2)
+    yield queue
+    queue.shutdown()
+
+
+def wait(job: Job) -> None:
+    with job.changed:
+        assert job.changed.wait_for(lambda: job.done, timeout=30)
+
+
+def test_queue_keeps_only_the_last_finished_jobs(queue: JobQueue, exports: Path):
+    config = {"inputs": [str(exports / "c1")], "data_type": "responses"}
+    jobs = [queue.submit(JobCommand.QUERY, config) for _ in range(3)]
+    for job in jobs:
+        wait(job)
+    # the queue forgets a job right after it's marked done
+    queue.shutdown()
+
+    assert all(job.result for job in jobs)
+    assert list(queue.jobs) == [job.id for job in jobs[1:]]
+    assert all(job.events == [] for job in jobs)
+
+
+@pytest.fixture
+def running(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Make compress jobs take a while, and record how many ran at once whenever one started."""
+    active: list[int] = []
+    at_start: list[int] = []
+    lock = threading.Lock()
+
+    def execute(usecase: CompressUseCase) -> None:
+        with lock:
+            active.append(1)
+            at_start.append(len(active))
+        time.sleep(0.2)
+        with lock:
+            active.pop()
+
+    monkeypatch.setattr(CompressUseCase, "execute", execute)
+    return at_start
+
+
+@pytest.mark.parametrize(("outputs", "most"), [(["out", "out"], 1), (["a", "b"], 2)])
+def test_jobs_writing_the_same_output_run_one_at_a_time(
+    exports: Path, tmp_path: Path, running: list[int], outputs: list[str], most: int
+):
+    queue = JobQueue(concurrency=2)
+    configs = [{"inputs": [str(exports)], "output": str(tmp_path / output)} for output in outputs]
+    jobs = [queue.submit(JobCommand.COMPRESS, config) for config in configs]
+    for job in jobs:
+        wait(job)
+    queue.shutdown()
+
+    assert all(job.status == JobStatus.SUCCEEDED for job in jobs)
+    assert max(running) == most
+
+
+def test_unix_server_only_replaces_a_socket(tmp_path: Path, queue: JobQueue):
+    path = tmp_path / "mo.sock"
+    path.write_text("not a socket")
+
+    with pytest.raises(FileExistsError):
+        UnixJobServer(path, queue)
+
+    assert path.read_text() == "not a socket"
+
+
+def test_unix_server_replaces_a_stale_socket(tmp_path: Path, queue: JobQueue):
+    path = tmp_path / "mo.sock"
+    # closing the server leaves its socket file behind, like a server that was killed
+    UnixJobServer(path, queue).server_close()
+
+    UnixJobServer(path, queue).server_close()
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import time
+
+from mo import __version__
+
+# `mo --version` has to answer within this many seconds
+VERSION_BUDGET = 0.1
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-c", code, *args], capture_output=True, text=True, check=True
+    )
+
+
+def test_version_is_within_budget():
+    # the same call as the `mo` entry point, timed at its best so a busy machine doesn't fail it
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        result = run_python("from mo.__main__ import main; main()", "--version")
+        timings.append(time.perf_counter() - start)
+
+    assert result.stdout.strip() == f"mo v{__version__}"
+    assert min(timings) < VERSION_BUDGET, f"mo --version took {min(timings) * 1000:.0f} ms"
+
+
+def test_cli_does_not_import_command_dependencies():
+    result = run_python(
+        "import sys, mo.cli; print(*sorted({m.split('.')[0] for m in sys.modules}))"
+    )
+
+    loaded = set(result.stdout.split())
+    assert not loaded & {"polars", "pydantic", "pydantic_settings", "rich"}
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from mo.services.watcher import InotifyWatcher, PollingWatcher
+from mo.usecases.watch_usecase import WatchUseCase
+
+
+def watch_usecase(inputs: list[Path], output: Path) -> WatchUseCase:
+    return WatchUseCase(WatchUseCase.Input(inputs=inputs, output=output), lambda units: None)
+
+
+def test_data_file_in_the_inbox_root_is_its_own_unit(exports: Path, tmp_path: Path):
+    usecase = watch_usecase([exports], tmp_path / "output")
+
+    assert usecase.unit_of(exports / "responses.csv") == exports / "responses.csv"
+    assert usecase.unit_of(exports / "c1" / "responses.csv") == exports / "c1"
+
+
+def test_file_input_is_its_own_unit(exports: Path, tmp_path: Path):
+    path = exports / "c1" / "responses.csv"
+
+    usecase = watch_usecase([path], tmp_path / "output")
+
+    assert usecase.unit_of(path) == path
+
+
+@pytest.mark.parametrize(
+    "watcher_type",
+    [
+        PollingWatcher,
+        pytest.param(
+            InotifyWatcher,
+            marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only"),
+        ),
+    ],
+)
+def test_watcher_reports_changes_of_a_file_input(exports: Path, watcher_type):
+    path = exports / "c1" / "responses.csv"
+    watcher = watcher_type([path])
+    try:
+        with open(path, "a") as file:
+            file.write("more\n")
+
+        assert watcher.poll(1.0) == {path}
+    finally:
+        watcher.close()